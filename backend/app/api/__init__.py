@@ -4,6 +4,8 @@ from app.api.books import router as books_router
 from app.api.categories import router as categories_router
 from app.api.borrows import router as borrows_router
 from app.api.users import router as users_router
+from app.api.jobs import router as jobs_router
+from app.api.changes import router as changes_router
 
 __all__ = [
     "auth_router",
@@ -11,4 +13,6 @@ __all__ = [
     "categories_router",
     "borrows_router",
     "users_router",
+    "jobs_router",
+    "changes_router",
 ]
@@ -1,52 +1,70 @@
 """认证API路由"""
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from jwt import InvalidTokenError
 import jwt
-import bcrypt
 
 from app.database import get_db
 from app.models.user import User, UserRole, UserStatus
-from app.schemas.user import UserLogin, UserCreate
+from app.schemas.user import UserLogin, UserCreate, UserPrincipal
 from app.schemas.common import Token, TokenData, ResponseModel
 from app.config import settings
+from app.services.principal import PrincipalService
+from app.services.password import PasswordService
+from app.services.revocation import TokenRevocationService
+from app.services.conditional import ConditionalRequestService
 
 router = APIRouter(prefix="/auth", tags=["认证"])
 security = HTTPBearer()
 
+# 已验证Token缓存：sha256(token) -> (TokenData, exp时间戳)，LRU淘汰
+_token_cache: "OrderedDict[str, Tuple[TokenData, float]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
-    return bcrypt.checkpw(
-        plain_password.encode('utf-8'),
-        hashed_password.encode('utf-8')
-    )
+    """验证密码（同步，异步接口请使用PasswordService.verify）"""
+    return PasswordService.verify_sync(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """加密密码"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    """加密密码（同步，异步接口请使用PasswordService.hash）"""
+    return PasswordService.hash_sync(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """创建JWT Token"""
+    """创建JWT Token（jti用于单个吊销，iat精确到微秒用于按用户吊销）"""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
 def decode_token(token: str) -> Optional[TokenData]:
-    """解码JWT Token"""
+    """解码JWT Token（命中已验证缓存时跳过签名校验）"""
+    cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+        if cached is not None:
+            if cached[1] > now:
+                _token_cache.move_to_end(cache_key)
+                return cached[0]
+            del _token_cache[cache_key]
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: int = payload.get("sub")
@@ -54,12 +72,31 @@ def decode_token(token: str) -> Optional[TokenData]:
         role: str = payload.get("role")
         if user_id is None:
             return None
-        return TokenData(user_id=user_id, username=username, role=role)
+        token_data = TokenData(
+            user_id=user_id,
+            username=username,
+            role=role,
+            jti=payload.get("jti"),
+            iat=payload.get("iat"),
+            exp=payload.get("exp"),
+        )
     except InvalidTokenError:
         return None
 
+    exp = payload.get("exp")
+    if exp is not None and settings.TOKEN_CACHE_SIZE > 0:
+        with _token_cache_lock:
+            _token_cache[cache_key] = (token_data, float(exp))
+            _token_cache.move_to_end(cache_key)
+            while len(_token_cache) > settings.TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return token_data
+
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenData:
+def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> TokenData:
     """获取当前用户依赖"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -69,18 +106,23 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     if credentials is None:
         raise credentials_exception
 
+    # 复用认证中间件已验证的结果
+    token_data = getattr(request.state, "user", None)
+    if isinstance(token_data, TokenData):
+        return token_data
+
     token_data = decode_token(credentials.credentials)
     if token_data is None:
         raise credentials_exception
     return token_data
 
 
-def get_current_active_user(
+async def get_current_active_user(
     current_user: TokenData = Depends(get_current_user),
     db: Session = Depends(get_db)
-) -> User:
-    """获取当前活跃用户"""
-    user = db.query(User).filter(User.id == current_user.user_id).first()
+) -> UserPrincipal:
+    """获取当前活跃用户（优先读取用户主体缓存）"""
+    user = await PrincipalService.get(current_user.user_id, db)
     if user is None:
         raise HTTPException(status_code=404, detail="用户不存在")
     if user.status != UserStatus.ACTIVE:
@@ -88,7 +130,7 @@ def get_current_active_user(
     return user
 
 
-def require_admin(current_user: User = Depends(get_current_active_user)) -> User:
+def require_admin(current_user: UserPrincipal = Depends(get_current_active_user)) -> UserPrincipal:
     """要求管理员权限"""
     if current_user.role not in [UserRole.ADMIN, UserRole.LIBRARIAN]:
         raise HTTPException(status_code=403, detail="需要管理员权限")
@@ -99,8 +141,10 @@ def require_admin(current_user: User = Depends(get_current_active_user)) -> User
 async def login(login_data: UserLogin, db: Session = Depends(get_db)):
     """用户登录"""
     user = db.query(User).filter(User.username == login_data.username).first()
+    # 释放数据库连接，等待bcrypt期间不占用连接池
+    db.close()
 
-    if user is None or not verify_password(login_data.password, user.hashed_password):
+    if user is None or not await PasswordService.verify(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误"
@@ -109,12 +153,19 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)):
     if user.status != UserStatus.ACTIVE:
         raise HTTPException(status_code=400, detail="用户已被禁用")
 
-    user.last_login_at = datetime.utcnow()
+    # 批量UPDATE不经过ORM版本控制，手动递增版本号
+    values = {"last_login_at": datetime.utcnow(), "version": User.version + 1}
+    # bcrypt强度配置变更后透明升级
+    if PasswordService.needs_rehash(user.hashed_password):
+        values["hashed_password"] = await PasswordService.hash(login_data.password)
+
+    db.query(User).filter(User.id == user.id).update(values)
     db.commit()
+    await ConditionalRequestService.invalidate("user", user.id)
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.id, "username": user.username, "role": user.role.value},
+        data={"sub": str(user.id), "username": user.username, "role": user.role.value},
         expires_delta=access_token_expires
     )
 
@@ -136,11 +187,15 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     if db.query(User).filter(User.email == user_data.email).first():
         raise HTTPException(status_code=400, detail="邮箱已被注册")
 
+    # 释放数据库连接，等待bcrypt期间不占用连接池
+    db.close()
+    hashed_password = await PasswordService.hash(user_data.password)
+
     user = User(
         username=user_data.username,
         email=user_data.email,
         phone=user_data.phone,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=hashed_password,
         full_name=user_data.full_name,
         role=user_data.role,
         max_borrow_count=user_data.max_borrow_count,
@@ -152,8 +207,24 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return ResponseModel(message="注册成功")
 
 
+@router.post("/logout")
+async def logout(current_user: TokenData = Depends(get_current_user)):
+    """退出登录（吊销当前Token）"""
+    if current_user.jti is None or current_user.exp is None:
+        raise HTTPException(status_code=400, detail="该令牌不支持注销，请重新登录")
+    await TokenRevocationService.revoke(current_user.jti, current_user.exp)
+    return ResponseModel(message="已退出登录")
+
+
+@router.post("/logout-all")
+async def logout_all(current_user: TokenData = Depends(get_current_user)):
+    """退出全部设备（吊销当前用户的全部Token）"""
+    await TokenRevocationService.revoke_user(current_user.user_id)
+    return ResponseModel(message="已退出全部设备")
+
+
 @router.get("/me")
-async def get_me(current_user: User = Depends(get_current_active_user)):
+async def get_me(current_user: UserPrincipal = Depends(get_current_active_user)):
     """获取当前用户信息"""
     return ResponseModel(data={
         "id": current_user.id,
@@ -1,45 +1,89 @@
 """图书API路由"""
-from typing import Optional, List
+import time
+import json
+import asyncio
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, null
 
-from app.database import get_db
-from app.models.user import User, UserRole
+from app.database import get_db, get_db_context, SessionLocal
+from app.models.user import UserRole
 from app.models.book import Book, Category
-from app.schemas.book import BookCreate, BookUpdate, BookResponse, BookQuery
-from app.schemas.common import ResponseModel, PaginatedResponse
-from app.api.auth import get_current_active_user, require_admin
+from app.schemas.book import BookCreate, BookUpdate, BookResponse, BookQuery, BookSearchHit
+from app.schemas.common import ResponseModel, PaginatedResponse, SearchResponse
+from app.schemas.user import UserPrincipal
+from app.schemas.serializers import RowSerializer
+from app.api.auth import get_current_user, get_current_active_user, require_admin
+from app.config import settings
+from app.schemas.common import TokenData
 from app.services.search import SearchService
+from app.services.suggest import SuggestService
+from app.services.metrics import MetricsService
+from app.services.search_cache import SearchCacheService
+from app.services.excel import ExcelService, EXPORT_MEDIA_TYPES
+from app.services.storage import CoverStorageService
+from app.services.thumbnails import ThumbnailService
+from app.services.conditional import ConditionalRequestService
+from app.services.response_cache import ResponseCacheService
+from app.utils.constants import CACHE_KEY_BOOK_ISBN
+from app.utils.isbn import normalize_isbn
 from app.services.redis import RedisService
 
 router = APIRouter(prefix="/books", tags=["图书管理"])
 
+BOOK_LIST_SERIALIZER = RowSerializer(BookResponse, Book, category_name=Category.name)
+SEARCH_HIT_SERIALIZER = RowSerializer(
+    BookSearchHit, Book, category_name=Category.name, score=null(), highlights=null()
+)
+
 redis_service = RedisService()
 
 
 @router.get("", response_model=PaginatedResponse[BookResponse])
 async def get_books(
     query: BookQuery = Depends(),
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """获取图书列表"""
-    # 构建查询
+    query_builder = _build_book_query(db, query)
+
+    # 计算总数
+    total = query_builder.count()
+
+    # 分页（只查询响应字段，分类名称由关联查询取得，行直接序列化）
+    offset = (query.page - 1) * query.page_size
+    rows = query_builder.with_entities(*BOOK_LIST_SERIALIZER.columns).order_by(
+        Book.created_at.desc()
+    ).offset(offset).limit(query.page_size).all()
+
+    return BOOK_LIST_SERIALIZER.page(rows, total, query.page, query.page_size)
+
+
+def _build_book_query(db: Session, query: BookQuery):
+    """构建图书列表查询"""
     query_builder = db.query(Book).join(Category, Book.category_id == Category.id, isouter=True)
 
     # 关键词搜索
     if query.keyword:
-        search_pattern = f"%{query.keyword}%"
-        query_builder = query_builder.filter(
-            or_(
-                Book.title.ilike(search_pattern),
-                Book.author.ilike(search_pattern),
-                Book.isbn.ilike(search_pattern)
+        isbn13 = normalize_isbn(query.keyword)
+        if isbn13:
+            # 完整ISBN走唯一索引精确匹配
+            query_builder = query_builder.filter(Book.isbn13 == isbn13)
+        else:
+            search_pattern = f"%{query.keyword}%"
+            query_builder = query_builder.filter(
+                or_(
+                    Book.title.ilike(search_pattern),
+                    Book.author.ilike(search_pattern),
+                    Book.isbn.ilike(search_pattern)
+                )
             )
-        )
 
     # 分类筛选
     if query.category_id:
@@ -57,68 +101,108 @@ async def get_books(
     if query.is_active is not None:
         query_builder = query_builder.filter(Book.is_active == query.is_active)
 
-    # 计算总数
-    total = query_builder.count()
-
-    # 分页
-    offset = (query.page - 1) * query.page_size
-    books = query_builder.order_by(Book.created_at.desc()).offset(offset).limit(query.page_size).all()
-
-    # 构建响应
-    items = []
-    for book in books:
-        book_dict = {
-            **book.__dict__,
-            "category_name": book.category.name if book.category else None
-        }
-        items.append(book_dict)
-
-    return PaginatedResponse(
-        items=items,
-        total=total,
-        page=query.page,
-        page_size=query.page_size,
-        total_pages=(total + query.page_size - 1) // query.page_size
-    )
+    return query_builder
 
 
-@router.get("/{book_id}")
-async def get_book(
-    book_id: int,
-    current_user: User = Depends(get_current_active_user),
+@router.get("/isbn/{isbn}", response_model=ResponseModel[BookResponse])
+async def get_book_by_isbn(
+    isbn: str,
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取图书详情"""
-    # 尝试从缓存获取
-    cache_key = f"book:{book_id}"
+    """按ISBN精确查询（扫码枪使用，支持ISBN-10/13及带分隔符格式）"""
+    isbn13 = normalize_isbn(isbn)
+    if not isbn13:
+        raise HTTPException(status_code=400, detail="ISBN格式或校验位错误")
+
+    cache_key = f"{CACHE_KEY_BOOK_ISBN}{isbn13}"
     cached_data = await redis_service.get(cache_key)
     if cached_data:
         return ResponseModel(data=cached_data)
 
-    book = db.query(Book).filter(Book.id == book_id, Book.is_active == True).first()
+    book = db.query(Book).filter(Book.isbn13 == isbn13, Book.is_active == True).first()
     if not book:
         raise HTTPException(status_code=404, detail="图书不存在")
 
-    book_dict = {
-        **book.__dict__,
-        "category_name": book.category.name if book.category else None
-    }
+    book_dict = BookResponse.model_validate(book).model_dump(mode="json")
+    book_dict["category_name"] = book.category.name if book.category else None
 
-    # 缓存数据
     await redis_service.set(cache_key, book_dict, expire=300)
 
     return ResponseModel(data=book_dict)
 
 
-@router.post("")
+@router.get("/export")
+async def export_books(
+    file_format: str = Query("xlsx", alias="format", pattern="^(xlsx|csv)$", description="导出格式"),
+    fields: Optional[List[str]] = Query(None, description="导出字段（列名），默认全部"),
+    category_id: Optional[int] = None,
+    status: Optional[str] = None,
+    current_user: UserPrincipal = Depends(require_admin)
+):
+    """导出图书（流式下载）"""
+    try:
+        content = ExcelService.export_books(fields, file_format, category_id, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"books_{datetime.now().strftime('%Y%m%d%H%M%S')}.{file_format}"
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/{book_id}", response_model=ResponseModel[BookResponse])
+async def get_book(
+    book_id: int,
+    request: Request,
+    response: Response,
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取图书详情（支持ETag协商缓存）"""
+    not_modified = await ConditionalRequestService.check(request, "book", book_id)
+    if not_modified:
+        return not_modified
+
+    # 尝试从缓存获取
+    cache_key = f"book:{book_id}"
+    book_dict = await redis_service.get(cache_key)
+    if not book_dict or "version" not in book_dict:  # 旧缓存不含版本号
+        book = db.query(Book).filter(Book.id == book_id, Book.is_active == True).first()
+        if not book:
+            raise HTTPException(status_code=404, detail="图书不存在")
+
+        book_dict = BookResponse.model_validate(book).model_dump(mode="json")
+        book_dict["category_name"] = book.category.name if book.category else None
+
+        # 缓存数据
+        await redis_service.set(cache_key, book_dict, expire=300)
+
+    # 响应内嵌分类名称，ETag同时包含分类名
+    stamp = ConditionalRequestService.make_stamp(
+        ConditionalRequestService.version_etag(book_dict["id"], book_dict["version"], book_dict["category_name"]),
+        book_dict["updated_at"]
+    )
+    await ConditionalRequestService.save("book", book_id, stamp)
+    not_modified = ConditionalRequestService.conclude(request, response, stamp, "book")
+    if not_modified:
+        return not_modified
+    return ResponseModel(data=book_dict)
+
+
+@router.post("", response_model=ResponseModel[BookResponse])
 async def create_book(
     book_data: BookCreate,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """创建图书"""
-    # 检查ISBN唯一性
-    if db.query(Book).filter(Book.isbn == book_data.isbn).first():
+    # 检查ISBN唯一性（按标准化ISBN-13比较）
+    isbn13 = normalize_isbn(book_data.isbn)
+    if db.query(Book).filter(Book.isbn13 == isbn13).first():
         raise HTTPException(status_code=400, detail="ISBN已存在")
 
     # 检查分类
@@ -130,6 +214,7 @@ async def create_book(
     # 创建图书
     book = Book(
         isbn=book_data.isbn,
+        isbn13=isbn13,
         title=book_data.title,
         author=book_data.author,
         publisher=book_data.publisher,
@@ -151,33 +236,89 @@ async def create_book(
 
     # 清除缓存
     await redis_service.delete_pattern("books:*")
+    await ResponseCacheService.invalidate("books")
+    await SearchCacheService.bump_version()
 
     return ResponseModel(data=book, message="创建成功")
 
 
-@router.put("/{book_id}")
+@router.post("/import")
+async def import_books(
+    file: UploadFile = File(...),
+    category_id: Optional[int] = None,
+    current_user: UserPrincipal = Depends(require_admin)
+):
+    """批量导入图书（xlsx/csv流式读取）
+
+    响应为NDJSON：每导入一批输出一行progress事件，最后输出done或error事件。
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: Optional[Dict[str, Any]]) -> None:
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def run() -> None:
+        try:
+            with get_db_context() as db:
+                result = ExcelService.import_file(
+                    file.file, file.filename or "", db, category_id,
+                    progress=lambda p: emit({"event": "progress", **p})
+                )
+            emit({"event": "done", **result})
+        except ValueError as e:
+            emit({"event": "error", "message": str(e)})
+        except Exception as e:
+            print(f"Book import failed: {e}")
+            emit({"event": "error", "message": "导入失败"})
+        finally:
+            emit(None)
+
+    async def stream():
+        task = asyncio.ensure_future(run_in_threadpool(run))
+        try:
+            while (event := await events.get()) is not None:
+                if event["event"] == "done" and event["success_count"]:
+                    await redis_service.delete_pattern("books:*")
+                    await ResponseCacheService.invalidate("books")
+                    await SearchCacheService.bump_version()
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            await task
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.put("/{book_id}", response_model=ResponseModel[BookResponse])
 async def update_book(
     book_id: int,
     book_data: BookUpdate,
-    current_user: User = Depends(require_admin),
+    request: Request,
+    response: Response,
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """更新图书"""
+    """更新图书（支持If-Match乐观并发控制）"""
+    expected = ConditionalRequestService.expected_versions(request, book_id)
     book = db.query(Book).filter(Book.id == book_id).first()
     if not book:
         raise HTTPException(status_code=404, detail="图书不存在")
+    ConditionalRequestService.check_version(book.version, expected)
 
-    # 检查ISBN唯一性
+    # 检查ISBN唯一性（按标准化ISBN-13比较）
+    old_isbn13 = book.isbn13
     if book_data.isbn and book_data.isbn != book.isbn:
-        if db.query(Book).filter(Book.isbn == book_data.isbn, Book.id != book_id).first():
+        isbn13 = normalize_isbn(book_data.isbn)
+        if db.query(Book).filter(Book.isbn13 == isbn13, Book.id != book_id).first():
             raise HTTPException(status_code=400, detail="ISBN已存在")
+        book.isbn13 = isbn13
 
     # 更新字段
     update_data = book_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(book, field, value)
 
-    db.commit()
+    ConditionalRequestService.commit(db, expected)
     db.refresh(book)
 
     # 同步到Elasticsearch
@@ -185,7 +326,14 @@ async def update_book(
 
     # 清除缓存
     await redis_service.delete(f"book:{book_id}")
+    await redis_service.delete(f"{CACHE_KEY_BOOK_ISBN}{old_isbn13}")
+    await ConditionalRequestService.invalidate("book", book_id)
+    await ResponseCacheService.invalidate("books", f"book:{book_id}")
     await redis_service.delete_pattern("books:*")
+    await SearchCacheService.bump_version()
+    response.headers["ETag"] = ConditionalRequestService.version_etag(
+        book.id, book.version, book.category.name if book.category else None
+    )
 
     return ResponseModel(data=book, message="更新成功")
 
@@ -193,7 +341,7 @@ async def update_book(
 @router.delete("/{book_id}")
 async def delete_book(
     book_id: int,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """删除图书（软删除）"""
@@ -209,65 +357,224 @@ async def delete_book(
 
     # 清除缓存
     await redis_service.delete(f"book:{book_id}")
+    await redis_service.delete(f"{CACHE_KEY_BOOK_ISBN}{book.isbn13}")
+    await ConditionalRequestService.invalidate("book", book_id)
+    await ResponseCacheService.invalidate("books", f"book:{book_id}")
     await redis_service.delete_pattern("books:*")
+    await SearchCacheService.bump_version()
 
     return ResponseModel(message="删除成功")
 
 
-@router.get("/search/elasticsearch", response_model=PaginatedResponse[BookResponse])
+def _search_books_sql(
+    keyword: str,
+    category_id: Optional[int],
+    status: Optional[str],
+    page: int,
+    page_size: int
+) -> Dict[str, Any]:
+    """MySQL关键词搜索（对冲请求使用，在线程池中以独立Session执行）"""
+    query = BookQuery(
+        keyword=keyword,
+        category_id=category_id,
+        status=status,
+        is_active=True,
+        page=page,
+        page_size=page_size,
+    )
+    db = SessionLocal()
+    try:
+        query_builder = _build_book_query(db, query)
+        total = query_builder.count()
+        offset = (page - 1) * page_size
+        rows = query_builder.with_entities(*SEARCH_HIT_SERIALIZER.columns).order_by(
+            Book.created_at.desc()
+        ).offset(offset).limit(page_size).all()
+        return {"hits": SEARCH_HIT_SERIALIZER.items(rows), "total": total, "backend": "mysql"}
+    finally:
+        db.close()
+
+
+async def _timed_search(backend: str, func, *args) -> Dict[str, Any]:
+    """在线程池中执行搜索并记录耗时
+
+    耗时按实际返回结果的后端记录（ES失败降级到内嵌引擎时记为embedded），
+    对冲延迟只由真实的ES耗时决定。
+    """
+    start = time.perf_counter()
+    try:
+        result = await run_in_threadpool(func, *args)
+    except Exception:
+        MetricsService.incr(f"search.errors.{backend}")
+        raise
+    MetricsService.observe(
+        f"search.latency.{result.get('backend', backend)}", (time.perf_counter() - start) * 1000
+    )
+    return result
+
+
+def _hedge_delay() -> float:
+    """对冲延迟（秒）：ES最近耗时的分位数，限制在配置范围内"""
+    observed = MetricsService.percentile("search.latency.elasticsearch", settings.SEARCH_HEDGE_PERCENTILE)
+    delay_ms = settings.SEARCH_HEDGE_MAX_MS if observed is None else observed
+    delay_ms = min(max(delay_ms, settings.SEARCH_HEDGE_MIN_MS), settings.SEARCH_HEDGE_MAX_MS)
+    return delay_ms / 1000
+
+
+def _discard_result(task: asyncio.Task) -> None:
+    """丢弃落败请求的结果，避免未读取异常告警"""
+    if not task.cancelled():
+        task.exception()
+
+
+async def hedged_search(
+    keyword: str,
+    category_id: Optional[int] = None,
+    status: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 10
+) -> Dict[str, Any]:
+    """对冲搜索：ES超过延迟阈值未返回时并发查询MySQL，取先完成者
+
+    线程中的ES请求无法取消，因此ES请求超时设为SEARCH_BUDGET_MS：
+    落败的ES请求最多占用线程池该时长，ES变慢时不会耗尽get_db等同步依赖共用的线程池。
+    """
+    args = (keyword, category_id, status, page, page_size)
+    MetricsService.incr("search.requests")
+    es_task = asyncio.ensure_future(_timed_search(
+        "elasticsearch", SearchService.search, *args, settings.SEARCH_BUDGET_MS / 1000
+    ))
+
+    if not settings.SEARCH_HEDGE_ENABLED:
+        result = await es_task
+        result["hedged"] = False
+        MetricsService.incr(f"search.served.{result.get('backend', 'elasticsearch')}")
+        return result
+
+    done, _ = await asyncio.wait({es_task}, timeout=_hedge_delay())
+    if done and es_task.exception() is None:
+        result = es_task.result()
+        result["hedged"] = False
+        MetricsService.incr(f"search.served.{result.get('backend', 'elasticsearch')}")
+        return result
+
+    MetricsService.incr("search.hedged")
+    sql_task = asyncio.ensure_future(_timed_search("mysql", _search_books_sql, *args))
+    pending = {task for task in (es_task, sql_task) if not task.done()}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                for other in pending:
+                    other.add_done_callback(_discard_result)
+                result = task.result()
+                result["hedged"] = True
+                MetricsService.incr(f"search.served.{result.get('backend', 'elasticsearch')}")
+                return result
+            error = task.exception()
+
+    raise error
+
+
+@router.get("/search/elasticsearch", response_model=SearchResponse[BookSearchHit])
 async def search_books_es(
     keyword: str = Query(..., description="搜索关键词"),
     category_id: Optional[int] = Query(None, description="分类ID"),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
-    """使用Elasticsearch搜索图书"""
-    result = SearchService.search(
+    """使用Elasticsearch搜索图书（超时对冲到MySQL，结果按目录版本缓存）"""
+    version = await SearchCacheService.get_version()
+    cache_key = SearchCacheService.make_key(version, keyword, category_id, None, page, page_size)
+    query_class = SearchCacheService.query_class(category_id, None, page)
+    cached_data = await SearchCacheService.get(cache_key, query_class)
+    if cached_data:
+        return cached_data
+
+    result = await hedged_search(
         keyword=keyword,
         category_id=category_id,
         page=page,
         page_size=page_size
     )
-    return PaginatedResponse(
+    response = SearchResponse[BookSearchHit](
         items=result["hits"],
         total=result["total"],
         page=page,
         page_size=page_size,
-        total_pages=(result["total"] + page_size - 1) // page_size
+        total_pages=(result["total"] + page_size - 1) // page_size,
+        backend=result.get("backend", "elasticsearch"),
+        hedged=result["hedged"],
     )
+    await SearchCacheService.set(cache_key, response.model_dump(mode="json"))
+    return response
+
+
+@router.get("/search/metrics")
+async def get_search_metrics(current_user: UserPrincipal = Depends(require_admin)):
+    """搜索指标：对冲比例与各后端耗时分布"""
+    data = MetricsService.snapshot("search.")
+    requests = MetricsService.get_counter("search.requests")
+    data["hedge_rate"] = (
+        round(MetricsService.get_counter("search.hedged") / requests, 4) if requests else 0.0
+    )
+    data["hedge_delay_ms"] = round(_hedge_delay() * 1000, 3)
+    data["cache_hit_rates"] = SearchCacheService.hit_rates()
+    return ResponseModel(data=data)
+
+
+@router.get("/search/suggest")
+async def suggest_books(
+    prefix: str = Query(..., min_length=1, max_length=50, description="输入前缀"),
+    limit: int = Query(10, ge=1, le=settings.SUGGEST_MAX_LIMIT),
+    current_user: TokenData = Depends(get_current_user)
+):
+    """搜索建议（输入即搜）
+
+    只校验Token不查用户表，热门前缀由本地前缀树直接返回；
+    前缀树过期时在后台刷新，本次请求仍使用旧前缀树
+    """
+    if SuggestService.is_stale():
+        SuggestService.schedule_refresh()
+
+    local = SuggestService.local_suggest(prefix, limit)
+    if local is not None and len(local) >= limit:
+        return ResponseModel(data={"items": local, "source": "local"})
+
+    result = await run_in_threadpool(SuggestService.suggest, prefix, limit)
+    return ResponseModel(data=result)
 
 
 @router.post("/{book_id}/cover")
 async def upload_cover(
     book_id: int,
     file: UploadFile = File(...),
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """上传图书封面"""
+    """上传图书封面（流式写入，按内容哈希存储，相同图片共用一个文件）
+
+    各尺寸缩略图生成后可通过 cover_url?size=small|medium|large 访问。
+    """
     book = db.query(Book).filter(Book.id == book_id).first()
     if not book:
         raise HTTPException(status_code=404, detail="图书不存在")
 
-    # 简化的文件保存逻辑
-    # 实际项目中需要验证文件类型、保存到存储服务等
-    import os
-    from app.config import settings
-
-    file_ext = os.path.splitext(file.filename)[1] if file.filename else ".jpg"
-    filename = f"book_{book_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}{file_ext}"
-    filepath = os.path.join(settings.UPLOAD_DIR, filename)
-
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-
-    content = await file.read()
-    with open(filepath, "wb") as f:
-        f.write(content)
+    relative_path = await CoverStorageService.save_cover(file)
+    # 缩略图在进程池中异步生成，不阻塞响应
+    ThumbnailService.enqueue(relative_path)
 
     # 更新封面URL
-    cover_url = f"/uploads/{filename}"
+    cover_url = f"/uploads/{relative_path}"
     book.cover_url = cover_url
     db.commit()
 
+    # 清除缓存
+    await redis_service.delete(f"book:{book_id}")
+    await redis_service.delete(f"{CACHE_KEY_BOOK_ISBN}{book.isbn13}")
+    await ConditionalRequestService.invalidate("book", book_id)
+    await ResponseCacheService.invalidate("books", f"book:{book_id}")
+
     return ResponseModel(data={"cover_url": cover_url}, message="上传成功")
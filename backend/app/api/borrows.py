@@ -1,8 +1,9 @@
 """借阅API路由"""
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 
@@ -10,22 +11,33 @@ from app.database import get_db
 from app.models.user import User, UserStatus, UserRole
 from app.models.book import Book, BookStatus
 from app.models.borrow import BorrowRecord
+from app.schemas.user import UserPrincipal
 from app.schemas.borrow import (
     BorrowCreate, BorrowResponse, BorrowQuery, ReturnBook, RenewBook
 )
 from app.schemas.common import ResponseModel, PaginatedResponse
+from app.schemas.serializers import RowSerializer
 from app.api.auth import get_current_active_user, require_admin
 from app.services.redis import RedisService
+from app.services.search_cache import SearchCacheService
+from app.services.conditional import ConditionalRequestService
+from app.services.response_cache import ResponseCacheService
+from app.services.excel import ExcelService, EXPORT_MEDIA_TYPES
+from app.utils.constants import CACHE_KEY_BOOK_ISBN
 
 router = APIRouter(prefix="/borrows", tags=["借阅管理"])
 
 redis_service = RedisService()
 
+BORROW_LIST_SERIALIZER = RowSerializer(
+    BorrowResponse, BorrowRecord, user_name=User.username, book_title=Book.title, book_isbn=Book.isbn
+)
+
 
-@router.post("")
+@router.post("", response_model=ResponseModel[BorrowResponse])
 async def create_borrow(
     borrow_data: BorrowCreate,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """借书"""
@@ -78,16 +90,21 @@ async def create_borrow(
     db.commit()
     db.refresh(record)
 
-    # 清除缓存
+    # 清除缓存（库存与状态变化影响搜索结果）
     await redis_service.delete(f"book:{book.id}")
+    await redis_service.delete(f"{CACHE_KEY_BOOK_ISBN}{book.isbn13}")
+    await ConditionalRequestService.invalidate("book", book.id)
+    await ConditionalRequestService.invalidate("user", user.id)
+    await ResponseCacheService.invalidate("books", f"book:{book.id}")
+    await SearchCacheService.bump_version()
 
     return ResponseModel(data=record, message="借书成功")
 
 
-@router.post("/return")
+@router.post("/return", response_model=ResponseModel[BorrowResponse])
 async def return_book(
     return_data: ReturnBook,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """还书"""
@@ -129,6 +146,11 @@ async def return_book(
     # 清除缓存
     if book:
         await redis_service.delete(f"book:{book.id}")
+        await redis_service.delete(f"{CACHE_KEY_BOOK_ISBN}{book.isbn13}")
+        await ConditionalRequestService.invalidate("book", book.id)
+        await ResponseCacheService.invalidate("books", f"book:{book.id}")
+        await SearchCacheService.bump_version()
+    await ConditionalRequestService.invalidate("user", record.user_id)
 
     return ResponseModel(data=record, message="还书成功")
 
@@ -136,7 +158,7 @@ async def return_book(
 @router.post("/renew", response_model=ResponseModel[BorrowResponse])
 async def renew_book(
     renew_data: RenewBook,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """续借"""
@@ -159,7 +181,7 @@ async def renew_book(
 @router.get("", response_model=PaginatedResponse[BorrowResponse])
 async def get_borrows(
     query: BorrowQuery = Depends(),
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """获取借阅记录列表"""
@@ -191,25 +213,37 @@ async def get_borrows(
 
     total = query_builder.count()
     offset = (query.page - 1) * query.page_size
-    records = query_builder.order_by(BorrowRecord.created_at.desc()).offset(offset).limit(query.page_size).all()
-
-    # 构建响应，添加扩展字段
-    items = []
-    for record in records:
-        item = {
-            **record.__dict__,
-            "user_name": record.user.username if record.user else None,
-            "book_title": record.book.title if record.book else None,
-            "book_isbn": record.book.isbn if record.book else None,
-        }
-        items.append(item)
+    # 扩展字段（用户名、书名、ISBN）由关联查询取得，行直接序列化
+    rows = query_builder.with_entities(*BORROW_LIST_SERIALIZER.columns).order_by(
+        BorrowRecord.created_at.desc()
+    ).offset(offset).limit(query.page_size).all()
 
-    return PaginatedResponse(
-        items=items,
-        total=total,
-        page=query.page,
-        page_size=query.page_size,
-        total_pages=(total + query.page_size - 1) // query.page_size
+    return BORROW_LIST_SERIALIZER.page(rows, total, query.page, query.page_size)
+
+
+@router.get("/export")
+async def export_borrows(
+    file_format: str = Query("xlsx", alias="format", pattern="^(xlsx|csv)$", description="导出格式"),
+    fields: Optional[List[str]] = Query(None, description="导出字段（列名），默认全部"),
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: UserPrincipal = Depends(require_admin)
+):
+    """导出借阅记录（流式下载）"""
+    try:
+        content = ExcelService.export_borrow_records(
+            fields, file_format, user_id, status, start_date, end_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"borrows_{datetime.now().strftime('%Y%m%d%H%M%S')}.{file_format}"
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
@@ -218,7 +252,7 @@ async def get_my_borrows(
     status: Optional[str] = None,
     page: int = 1,
     page_size: int = 10,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """获取当前用户的借阅记录"""
@@ -246,7 +280,7 @@ async def get_user_borrows(
     status: Optional[str] = None,
     page: int = 1,
     page_size: int = 10,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """获取用户借阅记录"""
@@ -276,7 +310,7 @@ async def get_user_borrows(
 async def get_overdue_borrows(
     page: int = 1,
     page_size: int = 10,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """获取逾期记录"""
@@ -299,7 +333,7 @@ async def get_overdue_borrows(
 
 @router.get("/statistics")
 async def get_statistics(
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """获取借阅统计"""
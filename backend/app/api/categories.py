@@ -1,23 +1,33 @@
 """分类API路由"""
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models.user import User
+from app.schemas.user import UserPrincipal
 from app.models.book import Category
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse, CategoryQuery
 from app.schemas.common import ResponseModel, PaginatedResponse
 from app.api.auth import get_current_active_user, require_admin
+from app.services.conditional import ConditionalRequestService
+from app.services.response_cache import ResponseCacheService
 
 router = APIRouter(prefix="/categories", tags=["分类管理"])
 
 
+async def _invalidate_category(category_id: int) -> None:
+    """分类变更后使版本戳失效（图书响应内嵌分类名称，一并失效）"""
+    await ConditionalRequestService.invalidate("category", category_id)
+    await ConditionalRequestService.invalidate("categories", "all")
+    await ConditionalRequestService.invalidate("book")
+    await ResponseCacheService.invalidate("categories")
+
+
 @router.get("", response_model=PaginatedResponse[CategoryResponse])
 async def get_categories(
     query: CategoryQuery = Depends(),
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """获取分类列表"""
@@ -50,31 +60,62 @@ async def get_categories(
 
 @router.get("/all", response_model=ResponseModel[List[CategoryResponse]])
 async def get_all_categories(
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取所有分类（下拉选择用）"""
+    """获取所有分类（下拉选择用，支持ETag协商缓存）"""
+    not_modified = await ConditionalRequestService.check(request, "categories", "all")
+    if not_modified:
+        return not_modified
+
     categories = db.query(Category).filter(Category.is_active == True).order_by(Category.sort_order).all()
-    return ResponseModel(data=categories)
+    data = [CategoryResponse.model_validate(category).model_dump(mode="json") for category in categories]
+
+    stamp = ConditionalRequestService.make_stamp(
+        ConditionalRequestService.content_etag(data),
+        max((category.updated_at for category in categories if category.updated_at), default=None)
+    )
+    await ConditionalRequestService.save("categories", "all", stamp)
+    not_modified = ConditionalRequestService.conclude(request, response, stamp, "categories")
+    if not_modified:
+        return not_modified
+    return ResponseModel(data=data)
 
 
 @router.get("/{category_id}", response_model=ResponseModel[CategoryResponse])
 async def get_category(
     category_id: int,
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取分类详情"""
+    """获取分类详情（支持ETag协商缓存）"""
+    not_modified = await ConditionalRequestService.check(request, "category", category_id)
+    if not_modified:
+        return not_modified
+
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
         raise HTTPException(status_code=404, detail="分类不存在")
+
+    stamp = ConditionalRequestService.make_stamp(
+        ConditionalRequestService.version_etag(category.id, category.version),
+        category.updated_at
+    )
+    await ConditionalRequestService.save("category", category_id, stamp)
+    not_modified = ConditionalRequestService.conclude(request, response, stamp, "category")
+    if not_modified:
+        return not_modified
     return ResponseModel(data=category)
 
 
 @router.post("", response_model=ResponseModel[CategoryResponse])
 async def create_category(
     category_data: CategoryCreate,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """创建分类"""
@@ -93,6 +134,9 @@ async def create_category(
     db.commit()
     db.refresh(category)
 
+    await ConditionalRequestService.invalidate("categories", "all")
+    await ResponseCacheService.invalidate("categories")
+
     return ResponseModel(data=category, message="创建成功")
 
 
@@ -100,13 +144,17 @@ async def create_category(
 async def update_category(
     category_id: int,
     category_data: CategoryUpdate,
-    current_user: User = Depends(require_admin),
+    request: Request,
+    response: Response,
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """更新分类"""
+    """更新分类（支持If-Match乐观并发控制）"""
+    expected = ConditionalRequestService.expected_versions(request, category_id)
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
         raise HTTPException(status_code=404, detail="分类不存在")
+    ConditionalRequestService.check_version(category.version, expected)
 
     # 检查名称唯一性
     if category_data.name and category_data.name != category.name:
@@ -126,16 +174,19 @@ async def update_category(
     for field, value in update_data.items():
         setattr(category, field, value)
 
-    db.commit()
+    ConditionalRequestService.commit(db, expected)
     db.refresh(category)
 
+    await _invalidate_category(category_id)
+    response.headers["ETag"] = ConditionalRequestService.version_etag(category.id, category.version)
+
     return ResponseModel(data=category, message="更新成功")
 
 
 @router.delete("/{category_id}")
 async def delete_category(
     category_id: int,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """删除分类"""
@@ -154,4 +205,6 @@ async def delete_category(
     category.is_active = False
     db.commit()
 
+    await _invalidate_category(category_id)
+
     return ResponseModel(message="删除成功")
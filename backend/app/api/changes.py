@@ -0,0 +1,41 @@
+"""增量变更订阅API路由"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas.user import UserPrincipal
+from app.schemas.change import ChangeFeed
+from app.schemas.common import ResponseModel
+from app.api.auth import require_admin
+from app.services.changes import ChangeFeedService, CHANGE_ENTITIES
+
+router = APIRouter(prefix="/changes", tags=["变更订阅"])
+
+
+@router.get("", response_model=ResponseModel[ChangeFeed])
+async def get_changes(
+    since: Optional[str] = Query(None, description="上次返回的cursor，为空时从头开始"),
+    limit: int = Query(500, ge=1, le=1000, description="每页最大条数"),
+    entities: Optional[str] = Query(None, description="实体类型（逗号分隔）: book,category,loan"),
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """获取增量变更（图书、分类、借阅状态）
+
+    按提交顺序返回since之后新增/更新/软删除的记录；has_more为false时表示已追平，
+    保存cursor并在下次轮询时作为since传入。
+    """
+    selected = None
+    if entities:
+        selected = [entity.strip() for entity in entities.split(",") if entity.strip()]
+        unknown = [entity for entity in selected if entity not in CHANGE_ENTITIES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知实体类型: {', '.join(unknown)}")
+
+    try:
+        feed = ChangeFeedService.fetch(db, since, limit, selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ResponseModel(data=feed)
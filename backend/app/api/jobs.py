@@ -0,0 +1,218 @@
+"""后台任务API路由"""
+import os
+import shutil
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models.job import Job, JobStatus
+from app.schemas.user import UserPrincipal
+from app.schemas.job import (
+    JobResponse, JobQuery, BookExportJob, BorrowExportJob, BookAnalyticsJob, BorrowAnalyticsJob,
+)
+from app.schemas.common import ResponseModel, PaginatedResponse
+from app.api.auth import require_admin
+from app.services.excel import ExcelService, EXPORT_MEDIA_TYPES
+from app.services.jobs import JobService
+
+router = APIRouter(prefix="/jobs", tags=["后台任务"])
+
+IMPORT_EXTENSIONS = (".xlsx", ".xlsm", ".csv")
+
+
+def _to_response(job: Job) -> JobResponse:
+    response = JobResponse.model_validate(job)
+    if job.result_file and job.status == JobStatus.SUCCEEDED.value:
+        response.download_url = f"/api/v1/jobs/{job.id}/download"
+    return response
+
+
+def _get_job(db: Session, job_id: str) -> Job:
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@router.get("", response_model=PaginatedResponse[JobResponse])
+async def get_jobs(
+    query: JobQuery = Depends(),
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """获取任务列表"""
+    query_builder = db.query(Job)
+
+    if query.job_type:
+        query_builder = query_builder.filter(Job.job_type == query.job_type)
+    if query.status:
+        query_builder = query_builder.filter(Job.status == query.status)
+
+    total = query_builder.count()
+    offset = (query.page - 1) * query.page_size
+    jobs = query_builder.order_by(Job.created_at.desc()).offset(offset).limit(query.page_size).all()
+
+    return PaginatedResponse(
+        items=[_to_response(job) for job in jobs],
+        total=total,
+        page=query.page,
+        page_size=query.page_size,
+        total_pages=(total + query.page_size - 1) // query.page_size
+    )
+
+
+@router.get("/{job_id}", response_model=ResponseModel[JobResponse])
+async def get_job(
+    job_id: str,
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """查询任务状态与进度"""
+    return ResponseModel(data=_to_response(_get_job(db, job_id)))
+
+
+@router.post("/{job_id}/cancel", response_model=ResponseModel[JobResponse])
+async def cancel_job(
+    job_id: str,
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """取消任务"""
+    job = _get_job(db, job_id)
+    if job.is_finished:
+        raise HTTPException(status_code=400, detail="任务已结束")
+
+    job = JobService.cancel(db, job)
+    return ResponseModel(data=_to_response(job), message="已请求取消")
+
+
+@router.get("/{job_id}/download")
+async def download_job_result(
+    job_id: str,
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """下载任务结果文件"""
+    job = _get_job(db, job_id)
+    if job.status != JobStatus.SUCCEEDED.value or not job.result_file:
+        raise HTTPException(status_code=400, detail="任务没有可下载的结果")
+    if not os.path.exists(job.result_file):
+        raise HTTPException(status_code=404, detail="结果文件已过期")
+
+    file_format = os.path.splitext(job.result_file)[1].lstrip(".")
+    return FileResponse(
+        job.result_file,
+        media_type=EXPORT_MEDIA_TYPES.get(file_format),
+        filename=f"{job.job_type}_{job.created_at.strftime('%Y%m%d%H%M%S')}.{file_format}"
+    )
+
+
+@router.post("/import-books", response_model=ResponseModel[JobResponse])
+async def submit_import_books(
+    file: UploadFile = File(...),
+    category_id: Optional[int] = None,
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """提交图书导入任务（xlsx/csv）"""
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    if ext not in IMPORT_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="仅支持xlsx和csv文件")
+
+    # 先落盘再提交，任务执行时与本次请求无关
+    job_id = JobService.new_id()
+    workdir = JobService.workdir(job_id)
+    input_file = f"input{ext}"
+
+    def save() -> None:
+        os.makedirs(workdir, exist_ok=True)
+        with open(os.path.join(workdir, input_file), "wb") as out:
+            shutil.copyfileobj(file.file, out, 1024 * 1024)
+
+    await run_in_threadpool(save)
+
+    job = JobService.submit(
+        db, "import_books",
+        {"input_file": input_file, "filename": file.filename, "category_id": category_id},
+        user_id=current_user.id, job_id=job_id
+    )
+    return ResponseModel(data=_to_response(job), message="任务已提交")
+
+
+@router.post("/export-books", response_model=ResponseModel[JobResponse])
+async def submit_export_books(
+    request: BookExportJob,
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """提交图书导出任务"""
+    try:
+        ExcelService.select_fields(ExcelService.EXPORT_FIELDS, request.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = JobService.submit(db, "export_books", request.model_dump(mode="json"), user_id=current_user.id)
+    return ResponseModel(data=_to_response(job), message="任务已提交")
+
+
+@router.post("/export-borrows", response_model=ResponseModel[JobResponse])
+async def submit_export_borrows(
+    request: BorrowExportJob,
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """提交借阅记录导出任务"""
+    try:
+        ExcelService.select_fields(ExcelService.EXPORT_BORROW_FIELDS, request.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = JobService.submit(db, "export_borrows", request.model_dump(mode="json"), user_id=current_user.id)
+    return ResponseModel(data=_to_response(job), message="任务已提交")
+
+
+@router.post("/analytics-books", response_model=ResponseModel[JobResponse])
+async def submit_analytics_books(
+    request: BookAnalyticsJob,
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """提交图书目录分析导出任务（Parquet/Arrow）"""
+    job = JobService.submit(db, "analytics_books", request.model_dump(mode="json"), user_id=current_user.id)
+    return ResponseModel(data=_to_response(job), message="任务已提交")
+
+
+@router.post("/analytics-borrows", response_model=ResponseModel[JobResponse])
+async def submit_analytics_borrows(
+    request: BorrowAnalyticsJob,
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """提交借阅历史分析导出任务（Parquet/Arrow，按月分区打包为zip）"""
+    job = JobService.submit(db, "analytics_borrows", request.model_dump(mode="json"), user_id=current_user.id)
+    return ResponseModel(data=_to_response(job), message="任务已提交")
+
+
+@router.post("/reindex", response_model=ResponseModel[JobResponse])
+async def submit_reindex(
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """提交搜索索引重建任务"""
+    job = JobService.submit(db, "reindex", user_id=current_user.id)
+    return ResponseModel(data=_to_response(job), message="任务已提交")
+
+
+@router.post("/cover-thumbnails", response_model=ResponseModel[JobResponse])
+async def submit_cover_thumbnails(
+    force: bool = False,
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """提交封面缩略图回填任务（force=true时重新生成全部）"""
+    job = JobService.submit(db, "cover_thumbnails", {"force": force}, user_id=current_user.id)
+    return ResponseModel(data=_to_response(job), message="任务已提交")
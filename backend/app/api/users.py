@@ -1,27 +1,22 @@
 """用户API路由"""
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-import bcrypt
 
 from app.database import get_db
 from app.models.user import User, UserRole, UserStatus
-from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserPasswordUpdate
+from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserPasswordUpdate, UserPrincipal
 from app.schemas.common import ResponseModel, PaginatedResponse
-from app.api.auth import get_current_active_user, require_admin, get_password_hash
+from app.api.auth import get_current_active_user, require_admin
+from app.services.principal import PrincipalService
+from app.services.password import PasswordService
+from app.services.revocation import TokenRevocationService
+from app.services.conditional import ConditionalRequestService
 
 router = APIRouter(prefix="/users", tags=["用户管理"])
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
-    return bcrypt.checkpw(
-        plain_password.encode('utf-8'),
-        hashed_password.encode('utf-8')
-    )
-
-
 @router.get("", response_model=PaginatedResponse[UserResponse])
 async def get_users(
     keyword: Optional[str] = None,
@@ -29,7 +24,7 @@ async def get_users(
     status: Optional[UserStatus] = None,
     page: int = 1,
     page_size: int = 10,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """获取用户列表"""
@@ -64,24 +59,38 @@ async def get_users(
 @router.get("/{user_id}", response_model=ResponseModel[UserResponse])
 async def get_user(
     user_id: int,
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取用户详情"""
+    """获取用户详情（支持ETag协商缓存）"""
     if current_user.id != user_id and current_user.role not in [UserRole.ADMIN, UserRole.LIBRARIAN]:
         raise HTTPException(status_code=403, detail="无权查看")
 
+    not_modified = await ConditionalRequestService.check(request, "user", user_id)
+    if not_modified:
+        return not_modified
+
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
 
+    stamp = ConditionalRequestService.make_stamp(
+        ConditionalRequestService.version_etag(user.id, user.version),
+        user.updated_at
+    )
+    await ConditionalRequestService.save("user", user_id, stamp)
+    not_modified = ConditionalRequestService.conclude(request, response, stamp, "user")
+    if not_modified:
+        return not_modified
     return ResponseModel(data=user)
 
 
 @router.post("", response_model=ResponseModel[UserResponse])
 async def create_user(
     user_data: UserCreate,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """创建用户"""
@@ -91,11 +100,15 @@ async def create_user(
     if db.query(User).filter(User.email == user_data.email).first():
         raise HTTPException(status_code=400, detail="邮箱已被注册")
 
+    # 释放数据库连接，等待bcrypt期间不占用连接池
+    db.close()
+    hashed_password = await PasswordService.hash(user_data.password)
+
     user = User(
         username=user_data.username,
         email=user_data.email,
         phone=user_data.phone,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=hashed_password,
         full_name=user_data.full_name,
         role=user_data.role,
         max_borrow_count=user_data.max_borrow_count,
@@ -111,13 +124,17 @@ async def create_user(
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    current_user: User = Depends(require_admin),
+    request: Request,
+    response: Response,
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """更新用户"""
+    """更新用户（支持If-Match乐观并发控制）"""
+    expected = ConditionalRequestService.expected_versions(request, user_id)
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
+    ConditionalRequestService.check_version(user.version, expected)
 
     if user_data.email and user_data.email != user.email:
         if db.query(User).filter(User.email == user_data.email, User.id != user_id).first():
@@ -127,16 +144,20 @@ async def update_user(
     for field, value in update_data.items():
         setattr(user, field, value)
 
-    db.commit()
+    ConditionalRequestService.commit(db, expected)
     db.refresh(user)
 
+    await PrincipalService.invalidate(user_id)
+    await ConditionalRequestService.invalidate("user", user_id)
+    response.headers["ETag"] = ConditionalRequestService.version_etag(user.id, user.version)
+
     return ResponseModel(data=user, message="更新成功")
 
 
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """删除用户"""
@@ -150,6 +171,10 @@ async def delete_user(
     db.delete(user)
     db.commit()
 
+    await PrincipalService.invalidate(user_id)
+    await ConditionalRequestService.invalidate("user", user_id)
+    await TokenRevocationService.revoke_user(user_id)
+
     return ResponseModel(message="删除成功")
 
 
@@ -157,7 +182,7 @@ async def delete_user(
 async def update_password(
     user_id: int,
     password_data: UserPasswordUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """修改密码"""
@@ -168,12 +193,22 @@ async def update_password(
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
 
-    if not verify_password(password_data.old_password, user.hashed_password):
+    # 释放数据库连接，等待bcrypt期间不占用连接池
+    db.close()
+
+    if not await PasswordService.verify(password_data.old_password, user.hashed_password):
         raise HTTPException(status_code=400, detail="原密码错误")
 
-    user.hashed_password = get_password_hash(password_data.new_password)
+    hashed_password = await PasswordService.hash(password_data.new_password)
+    # 批量UPDATE不经过ORM版本控制，手动递增版本号
+    db.query(User).filter(User.id == user_id).update(
+        {"hashed_password": hashed_password, "version": User.version + 1}
+    )
     db.commit()
 
+    await PrincipalService.invalidate(user_id)
+    await ConditionalRequestService.invalidate("user", user_id)
+
     return ResponseModel(message="密码修改成功")
 
 
@@ -181,7 +216,7 @@ async def update_password(
 async def update_user_status(
     user_id: int,
     status: UserStatus,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """修改用户状态"""
@@ -195,14 +230,34 @@ async def update_user_status(
     user.status = status
     db.commit()
 
+    await PrincipalService.invalidate(user_id)
+    await ConditionalRequestService.invalidate("user", user_id)
+    if status != UserStatus.ACTIVE:
+        await TokenRevocationService.revoke_user(user_id)
+
     return ResponseModel(message="状态更新成功")
 
 
+@router.post("/{user_id}/revoke-sessions")
+async def revoke_user_sessions(
+    user_id: int,
+    current_user: UserPrincipal = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """强制用户下线（吊销其全部Token）"""
+    if not db.query(User.id).filter(User.id == user_id).first():
+        raise HTTPException(status_code=404, detail="用户不存在")
+
+    await TokenRevocationService.revoke_user(user_id)
+
+    return ResponseModel(message="已强制下线")
+
+
 @router.put("/{user_id}/role")
 async def update_user_role(
     user_id: int,
     role: UserRole,
-    current_user: User = Depends(require_admin),
+    current_user: UserPrincipal = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """修改用户角色"""
@@ -213,4 +268,7 @@ async def update_user_role(
     user.role = role
     db.commit()
 
+    await PrincipalService.invalidate(user_id)
+    await ConditionalRequestService.invalidate("user", user_id)
+
     return ResponseModel(message="角色更新成功")
@@ -23,10 +23,69 @@ class Settings(BaseSettings):
     ES_INDEX: str = "library_books"
     ES_TIMEOUT: int = 30
 
+    # 搜索后端: elasticsearch / embedded
+    SEARCH_BACKEND: str = "elasticsearch"
+    EMBEDDED_SEARCH_ENABLED: bool = True  # ES模式下同时维护内嵌索引用于故障降级
+    EMBEDDED_SEARCH_SNAPSHOT: str = "./data/search_snapshot.pkl"
+    EMBEDDED_SEARCH_SYNC_SECONDS: int = 5  # 按updated_at追平其他worker写入的间隔，0为关闭
+    EMBEDDED_SEARCH_SYNC_OVERLAP_SECONDS: int = 30  # 追平起点回退时间，覆盖提交较晚的事务
+
+    # 对冲搜索配置：ES超过延迟阈值未返回时并发发起MySQL查询
+    SEARCH_HEDGE_ENABLED: bool = True
+    SEARCH_HEDGE_PERCENTILE: float = 0.95
+    SEARCH_HEDGE_MIN_MS: int = 50
+    SEARCH_HEDGE_MAX_MS: int = 1000
+    SEARCH_BUDGET_MS: int = 2000  # 搜索总耗时预算，ES请求超时取该值，落败请求不会长期占用线程池
+
+    # 搜索结果缓存过期时间（秒）
+    SEARCH_CACHE_TTL: int = 60
+
+    # 条件请求配置
+    CONDITIONAL_STAMP_TTL: int = 3600  # ETag版本戳缓存时间（秒）
+    CATEGORY_CACHE_MAX_AGE: int = 60  # 分类接口允许浏览器直接复用的时间（秒）
+
+    # 搜索建议配置
+    SUGGEST_TRIE_SIZE: int = 10000  # 本地前缀树收录的热门图书数量
+    SUGGEST_MAX_LIMIT: int = 20
+    SUGGEST_REFRESH_SECONDS: int = 600
+
     # JWT配置
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24小时
+    TOKEN_CACHE_SIZE: int = 10000  # 已验证Token缓存容量
+    PRINCIPAL_CACHE_TTL: int = 30  # 进程内用户主体缓存（秒）
+    PRINCIPAL_REDIS_TTL: int = 1800  # Redis用户主体缓存（秒）
+
+    # Token吊销配置
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_REFRESH_SECONDS: int = 300  # 从Redis全量重建的间隔
+    REVOCATION_RETRY_SECONDS: int = 5  # 订阅断线重连间隔
+
+    # 密码哈希配置
+    BCRYPT_ROUNDS: int = 12  # 修改后用户下次登录时自动重新哈希
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_QUEUE_LIMIT: int = 64
+
+    # 限流配置（"次数/秒数"，令牌桶容量即次数）
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_AUTH: str = "10/60"  # 登录/注册，按IP
+    RATE_LIMIT_WRITE: str = "60/60"  # 写操作，按用户
+    RATE_LIMIT_READ: str = "600/60"  # 读操作，按用户或IP
+    RATE_LIMIT_REDIS_RETRY: int = 5  # Redis出错后使用进程内限流的秒数
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 100000
+
+    # 响应压缩配置
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # 小于该字节数的响应不压缩
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5  # 0-11，动态响应取5兼顾压缩率与CPU
+    COMPRESSION_CACHE_SIZE: int = 256  # 按ETag缓存的压缩结果条数
+
+    # 整响应缓存配置（各路由TTL见ResponseCacheMiddleware.CACHE_POLICIES）
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_BYTES: int = 512 * 1024  # 超过该大小的响应不缓存
 
     # 应用配置
     APP_HOST: str = "0.0.0.0"
@@ -36,6 +95,28 @@ class Settings(BaseSettings):
     # 文件配置
     UPLOAD_DIR: str = "./uploads"
     ALLOWED_EXTENSIONS: tuple = (".png", ".jpg", ".jpeg", ".gif")
+    MAX_COVER_SIZE: int = 5 * 1024 * 1024  # 封面文件大小上限（字节）
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024  # 上传分块读取大小
+    THUMBNAIL_SIZES: dict = {"small": 160, "medium": 320, "large": 640}  # 缩略图尺寸名 -> 宽度
+    THUMBNAIL_QUALITY: int = 80  # WebP质量
+    THUMBNAIL_WORKERS: int = 2  # 缩略图生成进程数
+    UPLOAD_CACHE_MAX_AGE: int = 3600  # 非哈希命名上传文件的缓存时间（秒）
+
+    # 导入导出配置
+    IMPORT_CHUNK_SIZE: int = 1000  # 批量校验/插入的行数
+    EXPORT_BATCH_SIZE: int = 1000  # 导出时服务端游标每批读取的行数
+    ANALYTICS_ROW_GROUP_SIZE: int = 65536  # Parquet/Arrow导出每个row group的行数
+    ANALYTICS_COMPRESSION: str = "zstd"
+
+    # 后台任务配置
+    JOB_WORKERS: int = 2
+    JOB_DIR: str = "./data/jobs"  # 任务上传文件与结果文件目录
+    JOB_PROGRESS_INTERVAL: float = 1.0  # 进度写库间隔（秒）
+    JOB_STALE_SECONDS: int = 600  # 执行中任务心跳超时后视为中断
+    JOB_RESULT_TTL_HOURS: int = 72  # 结果文件保留时间
+
+    # 增量变更订阅配置
+    CHANGES_SETTLE_SECONDS: int = 5  # 只返回该时间之前的变更，等待进行中的事务提交
 
     class Config:
         env_file = ".env"
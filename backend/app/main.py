@@ -2,21 +2,56 @@
 import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.config import settings
-from app.database import init_db
+from app.database import init_db, get_db_context
 from app.api import (
     auth_router,
     books_router,
     categories_router,
     borrows_router,
     users_router,
+    jobs_router,
+    changes_router,
 )
+from app.api.auth import require_admin
 from app.middleware.auth import AuthMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.response_cache import ResponseCacheMiddleware
 from app.services.search import SearchService
+from app.services.suggest import SuggestService
+from app.services.metrics import MetricsService
+from app.services.password import PasswordService
+from app.services.revocation import TokenRevocationService
+from app.services.jobs import JobService
+from app.services.thumbnails import ThumbnailService
+from app.models.book import Book
+from app.schemas.user import UserPrincipal
+from app.utils.isbn import normalize_isbn
+from app.utils.static_files import UploadStaticFiles
+
+
+def backfill_isbn13(batch_size: int = 1000) -> int:
+    """回填历史数据的标准化ISBN-13（重复或无效的ISBN保持为空）"""
+    count = 0
+    with get_db_context() as db:
+        seen = {isbn13 for (isbn13,) in db.query(Book.isbn13).filter(Book.isbn13.isnot(None))}
+        books = db.query(Book).filter(Book.isbn13.is_(None)).order_by(Book.id).all()
+        for book in books:
+            isbn13 = normalize_isbn(book.isbn)
+            if isbn13 is None or isbn13 in seen:
+                continue
+            book.isbn13 = isbn13
+            seen.add(isbn13)
+            count += 1
+            if count % batch_size == 0:
+                db.flush()
+    return count
 
 
 @asynccontextmanager
@@ -29,6 +64,14 @@ async def lifespan(app: FastAPI):
     init_db()
     print("Database initialized")
 
+    # 回填标准化ISBN
+    try:
+        count = backfill_isbn13()
+        if count:
+            print(f"ISBN-13 backfilled: {count} books")
+    except Exception as e:
+        print(f"ISBN backfill warning: {e}")
+
     # 初始化Elasticsearch索引
     try:
         SearchService.init_index()
@@ -36,6 +79,35 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Elasticsearch init warning: {e}")
 
+    # 加载内嵌搜索索引（快照 + 增量追平）
+    if SearchService.embedded_enabled():
+        try:
+            with get_db_context() as db:
+                count = SearchService.load_embedded(db)
+            print(f"Embedded search index loaded: {SearchService.get_embedded().size} books ({count} synced)")
+        except Exception as e:
+            print(f"Embedded search warning: {e}")
+        # 定期追平其他worker的写入
+        SearchService.start_embedded_sync()
+
+    # 预热搜索建议前缀树
+    try:
+        with get_db_context() as db:
+            count = SuggestService.refresh(db)
+        print(f"Suggest trie loaded: {count} titles")
+    except Exception as e:
+        print(f"Suggest trie warning: {e}")
+
+    # 启动后台任务服务（恢复中断任务）
+    try:
+        recovered = JobService.start()
+        print(f"Job runner started: {recovered}")
+    except Exception as e:
+        print(f"Job runner warning: {e}")
+
+    # 订阅Token吊销消息（Redis不可用时后台重试）
+    TokenRevocationService.start()
+
     # 创建上传目录
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
@@ -44,6 +116,17 @@ async def lifespan(app: FastAPI):
     # 关闭时
     print("Shutting down...")
 
+    await TokenRevocationService.stop()
+    await SearchService.stop_embedded_sync()
+    JobService.stop()
+    ThumbnailService.stop()
+
+    # 保存内嵌搜索快照，加快下次启动
+    try:
+        SearchService.save_embedded_snapshot()
+    except Exception as e:
+        print(f"Embedded search snapshot warning: {e}")
+
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -55,6 +138,9 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
+# 添加整响应缓存中间件（最内层，认证、限流、CORS照常执行，命中时跳过依赖注入与数据库访问）
+app.add_middleware(ResponseCacheMiddleware)
+
 # 添加CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -62,13 +148,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Cache"],  # 前端读取ETag用于If-Match
 )
 
+# 添加限流中间件（位于认证中间件内层，可按用户限流）
+app.add_middleware(RateLimitMiddleware)
+
 # 添加认证中间件
 app.add_middleware(AuthMiddleware)
 
-# 挂载静态文件目录
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+# 添加响应压缩中间件（最外层，认证/限流的错误响应同样压缩）
+app.add_middleware(CompressionMiddleware)
+
+# 挂载静态文件目录（目录在启动时创建）
+app.mount("/uploads", UploadStaticFiles(directory=settings.UPLOAD_DIR, check_dir=False), name="uploads")
 
 # 注册路由
 app.include_router(auth_router, prefix="/api/v1")
@@ -76,6 +169,14 @@ app.include_router(books_router, prefix="/api/v1")
 app.include_router(categories_router, prefix="/api/v1")
 app.include_router(borrows_router, prefix="/api/v1")
 app.include_router(users_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
+app.include_router(changes_router, prefix="/api/v1")
+
+
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    """版本化更新冲突（读取后被并发修改）"""
+    return JSONResponse(status_code=409, content={"detail": "数据已被其他请求修改，请重试"})
 
 
 @app.get("/")
@@ -95,6 +196,14 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def get_metrics(current_user: UserPrincipal = Depends(require_admin)):
+    """运行指标（仅管理员）"""
+    data = MetricsService.snapshot()
+    data["password_pool"] = PasswordService.stats()
+    return data
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
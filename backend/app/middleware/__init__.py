@@ -1,4 +1,7 @@
 """中间件包"""
 from app.middleware.auth import AuthMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.response_cache import ResponseCacheMiddleware
 
-__all__ = ["AuthMiddleware"]
+__all__ = ["AuthMiddleware", "RateLimitMiddleware", "CompressionMiddleware", "ResponseCacheMiddleware"]
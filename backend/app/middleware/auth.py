@@ -1,67 +1,169 @@
 """认证中间件"""
-from typing import Optional
-from fastapi import Request, HTTPException
+from dataclasses import dataclass
+from typing import Optional, Dict, FrozenSet
+from fastapi import Request
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Scope, Receive, Send
 
 from app.api.auth import decode_token
-
-
-class AuthMiddleware(BaseHTTPMiddleware):
-    """认证中间件"""
-
-    # 公开路由（不需要认证）
-    PUBLIC_PATHS = [
-        "/",
-        "/health",
-        "/api/v1/auth/login",
-        "/api/v1/auth/register",
-        "/docs",
-        "/redoc",
-        "/openapi.json",
+from app.database import SessionLocal
+from app.schemas.common import TokenData
+from app.services.principal import PrincipalService
+from app.services.revocation import TokenRevocationService
+from app.utils.constants import USER_ROLE_ADMIN, USER_ROLE_LIBRARIAN
+
+ADMIN_ROLES = frozenset({USER_ROLE_ADMIN, USER_ROLE_LIBRARIAN})
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    """路由访问策略"""
+    public: bool = False
+    roles: Optional[FrozenSet[str]] = None
+
+
+# 默认策略：需要登录，不限角色
+DEFAULT_POLICY = RoutePolicy()
+
+
+class AuthMiddleware:
+    """认证中间件（纯ASGI实现）
+
+    启动时将ROUTE_POLICIES编译为精确匹配表和前缀匹配表，请求时按
+    路径自身及其各级父路径做字典查找，在进入路由前完成公开/登录/角色判断。
+    角色以用户主体缓存（PrincipalService）为准而非Token中的角色，角色变更调用invalidate后
+    立即生效，无需重新登录；路由依赖中的权限校验仍然保留。
+    """
+
+    # (路径, 匹配方式, 请求方法, 策略)，请求方法为"*"表示全部方法
+    ROUTE_POLICIES = [
+        # 公开路由（不需要认证）
+        ("/", "exact", "*", RoutePolicy(public=True)),
+        ("/health", "exact", "*", RoutePolicy(public=True)),
+        ("/api/v1/auth/login", "exact", "*", RoutePolicy(public=True)),
+        ("/api/v1/auth/register", "exact", "*", RoutePolicy(public=True)),
+        ("/openapi.json", "exact", "*", RoutePolicy(public=True)),
+        ("/docs", "prefix", "*", RoutePolicy(public=True)),
+        ("/redoc", "prefix", "*", RoutePolicy(public=True)),
+        ("/uploads", "prefix", "*", RoutePolicy(public=True)),
+        # 管理员/图书管理员路由
+        ("/metrics", "exact", "GET", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/books", "prefix", "POST", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/books", "prefix", "PUT", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/books", "prefix", "DELETE", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/books/search/metrics", "exact", "GET", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/books/export", "exact", "GET", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/categories", "prefix", "POST", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/categories", "prefix", "PUT", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/categories", "prefix", "DELETE", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/borrows", "prefix", "POST", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/borrows/overdue", "exact", "GET", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/borrows/statistics", "exact", "GET", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/borrows/export", "exact", "GET", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/users", "exact", "GET", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/users", "prefix", "POST", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/users", "prefix", "DELETE", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/jobs", "prefix", "*", RoutePolicy(roles=ADMIN_ROLES)),
+        ("/api/v1/changes", "exact", "GET", RoutePolicy(roles=ADMIN_ROLES)),
     ]
 
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
-
-    async def dispatch(self, request: Request, call_next):
-        # 检查是否公开路由
-        path = request.url.path
-        if self._is_public_path(path):
-            return await call_next(request)
+        self.app = app
+        self._exact: Dict[str, Dict[str, RoutePolicy]] = {}
+        self._prefix: Dict[str, Dict[str, RoutePolicy]] = {}
+        for path, match, method, policy in self.ROUTE_POLICIES:
+            table = self._exact if match == "exact" else self._prefix
+            table.setdefault(path.rstrip("/") or "/", {})[method] = policy
+
+    @staticmethod
+    def _pick(methods: Optional[Dict[str, RoutePolicy]], method: str) -> Optional[RoutePolicy]:
+        if not methods:
+            return None
+        return methods.get(method) or methods.get("*")
+
+    def resolve(self, path: str, method: str) -> RoutePolicy:
+        """解析路径策略：精确匹配优先，其次由长到短匹配父路径前缀"""
+        path = path.rstrip("/") or "/"
+        policy = self._pick(self._exact.get(path), method)
+        if policy is not None:
+            return policy
+
+        candidate = path
+        while candidate:
+            policy = self._pick(self._prefix.get(candidate), method)
+            if policy is not None:
+                return policy
+            candidate = candidate[:candidate.rfind("/")]
+        return DEFAULT_POLICY
+
+    @staticmethod
+    def _get_header(scope: Scope, name: bytes) -> Optional[str]:
+        for key, value in scope["headers"]:
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+    @staticmethod
+    async def _current_role(token_data: TokenData) -> Optional[str]:
+        """当前角色（用户不存在时为None），Session仅在缓存未命中查库时才占用连接"""
+        with SessionLocal() as db:
+            principal = await PrincipalService.get(token_data.user_id, db)
+        return principal.role.value if principal is not None else None
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, status_code: int, message: str) -> None:
+        response = JSONResponse(
+            status_code=status_code,
+            content={"code": status_code, "status": "error", "message": message}
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        policy = self.resolve(scope["path"], method)
+        if policy.public:
+            await self.app(scope, receive, send)
+            return
 
         # 从Header获取Token
-        auth_header = request.headers.get("Authorization")
+        auth_header = self._get_header(scope, b"authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
             # 允许OPTIONS请求（跨域预检）
-            if request.method == "OPTIONS":
-                return await call_next(request)
-            return JSONResponse(
-                status_code=401,
-                content={"code": 401, "status": "error", "message": "缺少认证令牌"}
-            )
+            if method == "OPTIONS":
+                await self.app(scope, receive, send)
+                return
+            await self._reject(scope, receive, send, 401, "缺少认证令牌")
+            return
 
         token = auth_header.split(" ")[1]
         token_data = decode_token(token)
 
         if not token_data:
-            return JSONResponse(
-                status_code=401,
-                content={"code": 401, "status": "error", "message": "无效或已过期"}
-            )
+            await self._reject(scope, receive, send, 401, "无效或已过期")
+            return
 
-        # 将用户信息注入请求状态
-        request.state.user = token_data
+        if await TokenRevocationService.is_revoked(token_data):
+            await self._reject(scope, receive, send, 401, "令牌已失效，请重新登录")
+            return
+
+        # 旧Token中的角色可能已过时，注入请求状态前替换（响应缓存也按该角色区分）
+        role = await self._current_role(token_data)
+        if role != token_data.role:
+            token_data = token_data.model_copy(update={"role": role})
 
-        return await call_next(request)
+        if policy.roles is not None and role not in policy.roles:
+            await self._reject(scope, receive, send, 403, "需要管理员权限")
+            return
+
+        # 将用户信息注入请求状态
+        scope.setdefault("state", {})["user"] = token_data
 
-    def _is_public_path(self, path: str) -> bool:
-        """检查是否是公开路由"""
-        for public_path in self.PUBLIC_PATHS:
-            if path.startswith(public_path):
-                return True
-        return False
+        await self.app(scope, receive, send)
 
 
 class CORSMiddleware(BaseHTTPMiddleware):
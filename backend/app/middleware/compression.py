@@ -0,0 +1,228 @@
+"""响应压缩中间件"""
+import zlib
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from app.config import settings
+from app.services.metrics import MetricsService
+
+# 可压缩的内容类型（图片、xlsx、zip、parquet等本身已压缩，不再压缩）
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+})
+
+# 支持的编码，q值相同时按此顺序优先
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+# 不带响应体或只是部分内容的状态码
+SKIP_STATUS = frozenset({204, 206, 304})
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """按Accept-Encoding选择编码（q值最高者），都不可接受时返回None"""
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+
+    best, best_quality = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    """内容类型是否值得压缩"""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+def compress(coding: str, data: bytes) -> bytes:
+    """一次性压缩完整响应体"""
+    if coding == "br":
+        return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    encoder = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return encoder.compress(data) + encoder.flush()
+
+
+class StreamEncoder:
+    """流式压缩：每个分块压缩后立即flush，NDJSON进度等流式响应不会被缓冲"""
+
+    def __init__(self, coding: str):
+        self.coding = coding
+        if coding == "br":
+            self._encoder = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._encoder = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def encode(self, data: bytes, final: bool) -> bytes:
+        if self.coding == "br":
+            out = self._encoder.process(data) if data else b""
+            return out + (self._encoder.finish() if final else self._encoder.flush())
+        return self._encoder.compress(data) + self._encoder.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """响应压缩中间件（纯ASGI实现）
+
+    - 按Accept-Encoding协商br/gzip，只压缩文本类响应，小于COMPRESSION_MIN_SIZE的不压缩
+    - 一次性响应整体压缩；流式响应（导出、NDJSON导入进度）逐块压缩并flush
+    - 带ETag的GET响应（分类列表、图书详情等）缓存压缩结果，键为 (路径, ETag, 编码)，
+      同时校验响应体摘要，命中时直接复用，不必每次重新压缩
+    ETag保持不变（与未压缩表示共用，条件请求与If-Match无需区分编码），响应带Vary: Accept-Encoding。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # (路径, ETag, 编码) -> (响应体摘要, 压缩结果)
+        self._cache: "OrderedDict[Tuple[str, str, str], Tuple[bytes, bytes]]" = OrderedDict()
+
+    def compress_cached(self, key: Tuple[str, str, str], body: bytes) -> bytes:
+        """压缩响应体，命中缓存时直接返回"""
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == digest:
+            self._cache.move_to_end(key)
+            MetricsService.incr("compression.cache.hit")
+            return cached[1]
+
+        MetricsService.incr("compression.cache.miss")
+        compressed = compress(key[2], body)
+        self._cache[key] = (digest, compressed)
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.COMPRESSION_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return compressed
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        coding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(self, scope, coding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    """单个请求的压缩发送器：推迟响应头，看到第一个响应体分块后决定是否压缩"""
+
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, coding: str, send: Send):
+        self.middleware = middleware
+        self.scope = scope
+        self.coding = coding
+        self._send = send
+        self.start: Optional[Message] = None
+        self.encoder: Optional[StreamEncoder] = None
+        self.passthrough = False
+
+    def _eligible(self, headers: MutableHeaders) -> bool:
+        if self.start["status"] in SKIP_STATUS or "content-encoding" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        return is_compressible(headers.get("content-type", ""))
+
+    def _cache_key(self, headers: MutableHeaders) -> Optional[Tuple[str, str, str]]:
+        etag = headers.get("etag")
+        if self.scope["method"] != "GET" or self.start["status"] != 200 or not etag:
+            return None
+        path = self.scope["path"]
+        if self.scope.get("query_string"):
+            path += "?" + self.scope["query_string"].decode("latin-1")
+        return path, etag, self.coding
+
+    def _set_encoding(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.coding
+        MetricsService.incr(f"compression.{self.coding}")
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start = message
+            return
+
+        if self.start is not None and (self.passthrough or message_type != "http.response.body"):
+            # 未知消息类型（如pathsend）：原样发送
+            if not self.passthrough:
+                self.passthrough = True
+                await self._send(self.start)
+            await self._send(message)
+            return
+
+        if self.encoder is not None:
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            await self._send({
+                "type": "http.response.body",
+                "body": self.encoder.encode(body, final=not more_body),
+                "more_body": more_body,
+            })
+            return
+
+        await self._first_body(message)
+
+    async def _first_body(self, message: Message) -> None:
+        headers = MutableHeaders(scope=self.start)
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        eligible = self._eligible(headers)
+        if eligible:
+            headers.add_vary_header("Accept-Encoding")
+        if not more_body:
+            if not eligible or len(body) < settings.COMPRESSION_MIN_SIZE:
+                self.passthrough = True
+                await self._send(self.start)
+                await self._send(message)
+                return
+            key = self._cache_key(headers)
+            compressed = self.middleware.compress_cached(key, body) if key else compress(self.coding, body)
+            self._set_encoding(headers)
+            headers["Content-Length"] = str(len(compressed))
+            await self._send(self.start)
+            await self._send({"type": "http.response.body", "body": compressed, "more_body": False})
+            return
+
+        content_length = headers.get("content-length")
+        if not eligible or (content_length is not None and int(content_length) < settings.COMPRESSION_MIN_SIZE):
+            self.passthrough = True
+            await self._send(self.start)
+            await self._send(message)
+            return
+
+        self.encoder = StreamEncoder(self.coding)
+        self._set_encoding(headers)
+        if "content-length" in headers:
+            del headers["Content-Length"]
+        await self._send(self.start)
+        await self._send({
+            "type": "http.response.body",
+            "body": self.encoder.encode(body, final=False),
+            "more_body": True,
+        })
@@ -0,0 +1,67 @@
+"""限流中间件"""
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from app.config import settings
+from app.services.rate_limit import RateLimitService
+
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+class RateLimitMiddleware:
+    """限流中间件（纯ASGI实现）
+
+    路由分组：
+    - auth：登录/注册，按客户端IP限流（bcrypt开销大）
+    - write：/api下的写操作，按用户限流
+    - read：/api下的其他请求，按用户限流，未登录时按IP
+    需注册在AuthMiddleware内层，以便读取已认证的用户。
+    """
+
+    AUTH_PATHS = frozenset({"/api/v1/auth/login", "/api/v1/auth/register"})
+    API_PREFIX = "/api/"
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def resolve_group(self, path: str, method: str) -> Optional[str]:
+        """解析路由分组，不限流时返回None"""
+        if path in self.AUTH_PATHS:
+            return "auth"
+        if not path.startswith(self.API_PREFIX) or method == "OPTIONS":
+            return None
+        return "write" if method in WRITE_METHODS else "read"
+
+    @staticmethod
+    def identity(scope: Scope, group: str) -> str:
+        """限流主体：已登录用户优先使用用户ID"""
+        if group != "auth":
+            user = scope.get("state", {}).get("user")
+            if user is not None and user.user_id is not None:
+                return f"user:{user.user_id}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        group = self.resolve_group(scope["path"], scope["method"])
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed, retry_after = await RateLimitService.check(group, self.identity(scope, group))
+        if not allowed:
+            response = JSONResponse(
+                status_code=429,
+                content={"code": 429, "status": "error", "message": "请求过于频繁，请稍后重试"},
+                headers={"Retry-After": str(retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,184 @@
+"""整响应缓存中间件"""
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Tuple, Any
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from app.config import settings
+from app.services.conditional import ConditionalRequestService
+from app.services.response_cache import ResponseCacheService
+
+# 304响应沿用的缓存响应头
+NOT_MODIFIED_HEADERS = ("etag", "last-modified", "cache-control", "vary")
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """路由缓存策略：ttl为秒数，tags中的 {参数} 取自路径参数"""
+    ttl: int
+    tags: Tuple[str, ...]
+
+
+class ResponseCacheMiddleware:
+    """整响应缓存中间件（纯ASGI实现）
+
+    对CACHE_POLICIES中声明的GET路由，按 (方法, 路径, 标准化查询参数, 角色) 缓存完整响应，
+    命中时直接返回缓存的字节，不执行依赖注入、数据库/Redis查询与序列化。
+    只缓存对同一角色的所有用户都相同的响应；状态码非200、非JSON、带Set-Cookie、
+    no-store或超过RESPONSE_CACHE_MAX_BYTES的响应不缓存。
+    响应带 X-Cache: HIT/MISS；命中且If-None-Match匹配缓存的ETag时返回304。
+    需注册在AuthMiddleware、RateLimitMiddleware与CORS内层，认证、限流照常执行。
+    写操作通过ResponseCacheService.invalidate按标签失效。
+    """
+
+    # (路径模板, 策略)
+    CACHE_POLICIES = [
+        ("/api/v1/categories", CachePolicy(ttl=300, tags=("categories",))),
+        ("/api/v1/categories/all", CachePolicy(ttl=300, tags=("categories",))),
+        ("/api/v1/categories/{category_id:int}", CachePolicy(ttl=300, tags=("categories",))),
+        ("/api/v1/books", CachePolicy(ttl=30, tags=("books", "categories"))),
+        ("/api/v1/books/isbn/{isbn}", CachePolicy(ttl=60, tags=("books", "categories"))),
+        ("/api/v1/books/{book_id:int}", CachePolicy(ttl=60, tags=("book:{book_id}", "categories"))),
+    ]
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._exact: Dict[str, CachePolicy] = {}
+        self._patterns: List[Tuple[Any, CachePolicy]] = []
+        for path, policy in self.CACHE_POLICIES:
+            if "{" in path:
+                self._patterns.append((compile_path(path)[0], policy))
+            else:
+                self._exact[path] = policy
+
+    def resolve(self, path: str) -> Optional[Tuple[CachePolicy, Tuple[str, ...]]]:
+        """解析路径的缓存策略及展开后的标签，不缓存时返回None"""
+        policy = self._exact.get(path)
+        if policy is not None:
+            return policy, policy.tags
+        for regex, policy in self._patterns:
+            match = regex.match(path)
+            if match:
+                params = match.groupdict()
+                return policy, tuple(tag.format(**params) for tag in policy.tags)
+        return None
+
+    @staticmethod
+    def normalize_query(query_string: bytes) -> str:
+        """标准化查询参数：按参数名、值排序"""
+        return urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+
+    @staticmethod
+    def role(scope: Scope) -> str:
+        """缓存区分的角色，未登录为anonymous"""
+        user = scope.get("state", {}).get("user")
+        if user is None or user.role is None:
+            return "anonymous"
+        return str(user.role)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.RESPONSE_CACHE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        resolved = self.resolve(scope["path"])
+        if resolved is None:
+            await self.app(scope, receive, send)
+            return
+        policy, tags = resolved
+
+        versions = await ResponseCacheService.tag_versions(tags)
+        if versions is None:
+            # Redis不可用
+            await self.app(scope, receive, send)
+            return
+
+        key = ResponseCacheService.make_key(
+            scope["method"], scope["path"], self.normalize_query(scope.get("query_string", b"")),
+            self.role(scope), versions
+        )
+        entry = await ResponseCacheService.get(key)
+        if entry is not None:
+            await self._send_cached(scope, entry, send)
+            return
+
+        recorder = ResponseRecorder(send)
+        await self.app(scope, receive, recorder.send)
+        if recorder.cacheable:
+            await ResponseCacheService.set(key, recorder.entry(), policy.ttl)
+
+    @staticmethod
+    async def _send_cached(scope: Scope, entry: Dict[str, Any], send: Send) -> None:
+        """发送缓存的响应"""
+        headers = Headers(raw=[(k.encode("latin-1"), v.encode("latin-1")) for k, v in entry["headers"]])
+        extra = [
+            (b"x-cache", b"HIT"),
+            (b"age", str(max(0, int(time.time() - entry["created_at"]))).encode("latin-1")),
+        ]
+
+        etag = headers.get("etag")
+        if etag:
+            stamp = ConditionalRequestService.make_stamp(etag)
+            if headers.get("last-modified"):
+                stamp["last_modified"] = headers["last-modified"]
+            if ConditionalRequestService.is_not_modified(Request(scope), stamp):
+                raw = [(k, v) for k, v in headers.raw if k.decode("latin-1") in NOT_MODIFIED_HEADERS]
+                await send({"type": "http.response.start", "status": 304, "headers": raw + extra})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        await send({"type": "http.response.start", "status": entry["status"], "headers": headers.raw + extra})
+        await send({"type": "http.response.body", "body": entry["body"].encode("utf-8")})
+
+
+class ResponseRecorder:
+    """未命中时照常发送响应，同时记录响应用于写入缓存"""
+
+    def __init__(self, send: Send):
+        self._send = send
+        self.status = 0
+        self.headers: List[Tuple[str, str]] = []
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.cacheable = False
+
+    @staticmethod
+    def _storable(status: int, headers: MutableHeaders) -> bool:
+        if status != 200 or "set-cookie" in headers:
+            return False
+        if "no-store" in headers.get("cache-control", ""):
+            return False
+        return headers.get("content-type", "").startswith("application/json")
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(scope=message)
+            self.status = message["status"]
+            self.cacheable = self._storable(self.status, headers)
+            self.headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in headers.raw]
+            headers["X-Cache"] = "MISS"
+        elif message["type"] == "http.response.body" and self.cacheable:
+            body = message.get("body", b"")
+            self.size += len(body)
+            if self.size > settings.RESPONSE_CACHE_MAX_BYTES:
+                self.cacheable = False
+                self.chunks = []
+            else:
+                self.chunks.append(body)
+        else:
+            self.cacheable = False
+        await self._send(message)
+
+    def entry(self) -> Dict[str, Any]:
+        """缓存条目（Redis为文本模式，响应体按UTF-8文本保存）"""
+        return {
+            "status": self.status,
+            "headers": self.headers,
+            "body": b"".join(self.chunks).decode("utf-8"),
+            "created_at": time.time(),
+        }
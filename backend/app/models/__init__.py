@@ -2,5 +2,6 @@
 from app.models.book import Book, Category
 from app.models.user import User
 from app.models.borrow import BorrowRecord
+from app.models.job import Job
 
-__all__ = ["Book", "Category", "User", "BorrowRecord"]
+__all__ = ["Book", "Category", "User", "BorrowRecord", "Job"]
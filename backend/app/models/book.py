@@ -25,7 +25,11 @@ class Category(Base):
     sort_order = Column(Integer, default=0, comment="排序")
     is_active = Column(Boolean, default=True, comment="是否启用")
     created_at = Column(DateTime, default=datetime.utcnow, comment="创建时间")
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment="更新时间")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True, comment="更新时间")
+    version = Column(Integer, nullable=False, default=1, server_default="1", comment="版本号（乐观锁）")
+
+    # ORM更新带版本条件：UPDATE ... WHERE id=? AND version=?，并递增版本号
+    __mapper_args__ = {"version_id_col": version}
 
     # 关系
     parent = relationship("Category", remote_side=[id], backref="children")
@@ -44,6 +48,7 @@ class Book(Base):
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     isbn = Column(String(20), unique=True, nullable=False, index=True, comment="ISBN")
+    isbn13 = Column(String(13), unique=True, nullable=True, index=True, comment="标准化ISBN-13")
     title = Column(String(200), nullable=False, comment="书名")
     author = Column(String(100), nullable=False, comment="作者")
     publisher = Column(String(100), nullable=True, comment="出版社")
@@ -63,7 +68,11 @@ class Book(Base):
 
     is_active = Column(Boolean, default=True, comment="是否启用")
     created_at = Column(DateTime, default=datetime.utcnow, comment="创建时间")
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment="更新时间")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True, comment="更新时间")
+    version = Column(Integer, nullable=False, default=1, server_default="1", comment="版本号（乐观锁）")
+
+    # ORM更新带版本条件：UPDATE ... WHERE id=? AND version=?，并递增版本号
+    __mapper_args__ = {"version_id_col": version}
 
     # 关系
     category = relationship("Category", back_populates="books")
@@ -41,7 +41,7 @@ class BorrowRecord(Base):
     remark = Column(Text, nullable=True, comment="备注")
 
     created_at = Column(DateTime, default=datetime.utcnow, comment="创建时间")
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment="更新时间")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True, comment="更新时间")
 
     # 关系
     user = relationship("User", back_populates="borrow_records", foreign_keys=[user_id])
@@ -0,0 +1,47 @@
+"""后台任务数据模型"""
+from datetime import datetime
+from enum import Enum as PyEnum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey
+from app.database import Base
+
+
+class JobStatus(str, PyEnum):
+    """任务状态枚举"""
+    PENDING = "pending"         # 排队中
+    RUNNING = "running"         # 执行中
+    SUCCEEDED = "succeeded"     # 已完成
+    FAILED = "failed"           # 失败
+    CANCELLED = "cancelled"     # 已取消
+
+
+class Job(Base):
+    """后台任务模型"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        {"comment": "后台任务表"},
+    )
+
+    id = Column(String(32), primary_key=True, comment="任务ID")
+    job_type = Column(String(50), nullable=False, index=True, comment="任务类型")
+    status = Column(String(20), default=JobStatus.PENDING.value, nullable=False, index=True, comment="状态")
+
+    params = Column(JSON, nullable=True, comment="任务参数")
+    progress = Column(JSON, nullable=True, comment="进度")
+    result = Column(JSON, nullable=True, comment="结果摘要")
+    result_file = Column(String(500), nullable=True, comment="结果文件路径")
+    error = Column(Text, nullable=True, comment="错误信息")
+    cancel_requested = Column(Boolean, default=False, comment="是否已请求取消")
+
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True, comment="提交人ID")
+    created_at = Column(DateTime, default=datetime.utcnow, comment="创建时间")
+    started_at = Column(DateTime, nullable=True, comment="开始时间")
+    finished_at = Column(DateTime, nullable=True, comment="结束时间")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment="更新时间（执行中作为心跳）")
+
+    def __repr__(self):
+        return f"<Job(id='{self.id}', job_type='{self.job_type}', status='{self.status}')>"
+
+    @property
+    def is_finished(self) -> bool:
+        """是否已结束"""
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
@@ -45,6 +45,10 @@ class User(Base):
     last_login_at = Column(DateTime, nullable=True, comment="最后登录时间")
     created_at = Column(DateTime, default=datetime.utcnow, comment="创建时间")
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment="更新时间")
+    version = Column(Integer, nullable=False, default=1, server_default="1", comment="版本号（乐观锁）")
+
+    # ORM更新带版本条件：UPDATE ... WHERE id=? AND version=?，并递增版本号
+    __mapper_args__ = {"version_id_col": version}
 
     # 关系
     borrow_records = relationship("BorrowRecord", back_populates="user", lazy="dynamic", foreign_keys="[BorrowRecord.user_id]")
@@ -1,14 +1,21 @@
 """Pydantic模式包"""
-from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserLogin
+from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserLogin, UserPrincipal
 from app.schemas.book import BookCreate, BookUpdate, BookResponse, BookQuery
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
 from app.schemas.borrow import BorrowCreate, BorrowResponse, BorrowQuery, ReturnBook
 from app.schemas.common import Token, TokenData, ResponseModel, PaginatedResponse
+from app.schemas.job import (
+    JobResponse, JobQuery, BookExportJob, BorrowExportJob, BookAnalyticsJob, BorrowAnalyticsJob,
+)
+from app.schemas.change import ChangeEvent, ChangeFeed
+from app.schemas.serializers import RowSerializer
 
 __all__ = [
-    "UserCreate", "UserUpdate", "UserResponse", "UserLogin",
+    "UserCreate", "UserUpdate", "UserResponse", "UserLogin", "UserPrincipal",
     "BookCreate", "BookUpdate", "BookResponse", "BookQuery",
     "CategoryCreate", "CategoryUpdate", "CategoryResponse",
     "BorrowCreate", "BorrowResponse", "BorrowQuery", "ReturnBook",
     "Token", "TokenData", "ResponseModel", "PaginatedResponse",
+    "JobResponse", "JobQuery", "BookExportJob", "BorrowExportJob", "BookAnalyticsJob", "BorrowAnalyticsJob",
+    "ChangeEvent", "ChangeFeed", "RowSerializer",
 ]
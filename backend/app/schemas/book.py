@@ -1,10 +1,11 @@
 """图书Pydantic模式"""
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, AliasChoices, field_validator
 from decimal import Decimal
 
 from app.schemas.common import BaseQuery
+from app.utils.isbn import normalize_isbn
 
 
 class BookCreate(BaseModel):
@@ -28,6 +29,8 @@ class BookCreate(BaseModel):
     def isbn_not_empty(cls, v: str) -> str:
         if not v or not v.strip():
             raise ValueError("ISBN不能为空")
+        if normalize_isbn(v) is None:
+            raise ValueError("ISBN格式或校验位错误")
         return v.strip()
 
     @field_validator("title")
@@ -55,11 +58,21 @@ class BookUpdate(BaseModel):
     location: Optional[str] = Field(None, max_length=100, description="馆藏位置")
     status: Optional[str] = Field(None, description="状态")
 
+    @field_validator("isbn")
+    @classmethod
+    def isbn_valid(cls, v: Optional[str]) -> Optional[str]:
+        if v is None:
+            return v
+        if normalize_isbn(v) is None:
+            raise ValueError("ISBN格式或校验位错误")
+        return v.strip()
+
 
 class BookResponse(BaseModel):
     """图书响应"""
     id: int
     isbn: str
+    isbn13: Optional[str] = None
     title: str
     author: str
     publisher: Optional[str]
@@ -75,6 +88,7 @@ class BookResponse(BaseModel):
     location: Optional[str]
     created_at: datetime
     updated_at: datetime
+    version: int = 1
 
     # 扩展字段
     category_name: Optional[str] = None
@@ -83,6 +97,26 @@ class BookResponse(BaseModel):
         from_attributes = True
 
 
+class BookSearchHit(BaseModel):
+    """搜索结果条目（索引文档只包含部分图书字段）"""
+    id: int
+    isbn: str
+    isbn13: Optional[str] = None
+    title: str
+    author: str
+    publisher: Optional[str] = None
+    category_id: Optional[int] = None
+    category_name: Optional[str] = None
+    summary: Optional[str] = None
+    cover_url: Optional[str] = None
+    status: Optional[str] = None
+    available_stock: Optional[int] = None
+    borrow_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+    score: Optional[float] = Field(None, validation_alias=AliasChoices("_score", "score"))
+    highlights: Optional[dict] = None
+
+
 class BookQuery(BaseQuery):
     """图书查询参数"""
     keyword: Optional[str] = Field(None, description="关键词搜索")
@@ -32,6 +32,7 @@ class CategoryResponse(BaseModel):
     is_active: bool
     created_at: object  # datetime
     updated_at: object  # datetime
+    version: int = 1
 
     class Config:
         from_attributes = True
@@ -0,0 +1,20 @@
+"""增量变更订阅Pydantic模式"""
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field
+
+
+class ChangeEvent(BaseModel):
+    """单条变更"""
+    entity: str = Field(..., description="实体类型: book/category/loan")
+    id: int
+    op: str = Field(..., description="操作: create/update/delete（delete为墓碑，不带数据）")
+    updated_at: datetime
+    data: Optional[Dict[str, Any]] = None
+
+
+class ChangeFeed(BaseModel):
+    """变更分页"""
+    changes: List[ChangeEvent]
+    cursor: Optional[str] = Field(None, description="下次请求的since参数")
+    has_more: bool = False
@@ -20,6 +20,9 @@ class TokenData(BaseModel):
     user_id: Optional[int] = None
     username: Optional[str] = None
     role: Optional[str] = None
+    jti: Optional[str] = None
+    iat: Optional[float] = None
+    exp: Optional[float] = None
 
 
 class StatusEnum(str, Enum):
@@ -66,6 +69,12 @@ class PaginatedResponse(BaseModel, Generic[T]):
         }
 
 
+class SearchResponse(PaginatedResponse[T], Generic[T]):
+    """搜索响应（附带实际提供结果的后端）"""
+    backend: str = "elasticsearch"
+    hedged: bool = False
+
+
 class BaseQuery(BaseModel):
     """基础查询参数"""
     page: int = Field(1, ge=1, description="页码")
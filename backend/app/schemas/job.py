@@ -0,0 +1,68 @@
+"""后台任务Pydantic模式"""
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field
+
+from app.schemas.common import BaseQuery
+
+
+class JobResponse(BaseModel):
+    """任务响应"""
+    id: str
+    job_type: str
+    status: str
+    params: Optional[Dict[str, Any]] = None
+    progress: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_by: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    # 扩展字段
+    download_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobQuery(BaseQuery):
+    """任务查询参数"""
+    job_type: Optional[str] = Field(None, description="任务类型")
+    status: Optional[str] = Field(None, description="状态")
+
+
+class BookExportJob(BaseModel):
+    """图书导出任务请求"""
+    format: str = Field("xlsx", pattern="^(xlsx|csv)$", description="导出格式")
+    fields: Optional[List[str]] = Field(None, description="导出字段（列名），默认全部")
+    category_id: Optional[int] = Field(None, description="分类ID")
+    status: Optional[str] = Field(None, description="图书状态")
+
+
+class BorrowExportJob(BaseModel):
+    """借阅记录导出任务请求"""
+    format: str = Field("xlsx", pattern="^(xlsx|csv)$", description="导出格式")
+    fields: Optional[List[str]] = Field(None, description="导出字段（列名），默认全部")
+    user_id: Optional[int] = Field(None, description="用户ID")
+    status: Optional[str] = Field(None, description="借阅状态")
+    start_date: Optional[datetime] = Field(None, description="开始日期")
+    end_date: Optional[datetime] = Field(None, description="结束日期")
+
+
+class BookAnalyticsJob(BaseModel):
+    """图书目录分析导出任务请求"""
+    format: str = Field("parquet", pattern="^(parquet|arrow)$", description="导出格式")
+    category_id: Optional[int] = Field(None, description="分类ID")
+    status: Optional[str] = Field(None, description="图书状态")
+
+
+class BorrowAnalyticsJob(BaseModel):
+    """借阅历史分析导出任务请求（按借出月份分区）"""
+    format: str = Field("parquet", pattern="^(parquet|arrow)$", description="导出格式")
+    user_id: Optional[int] = Field(None, description="用户ID")
+    status: Optional[str] = Field(None, description="借阅状态")
+    start_date: Optional[datetime] = Field(None, description="开始日期")
+    end_date: Optional[datetime] = Field(None, description="结束日期")
@@ -0,0 +1,65 @@
+"""响应序列化器（列表接口由查询行直接生成JSON字节）"""
+from decimal import Decimal
+from typing import Any, Dict, Optional, Sequence, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    """orjson不支持的类型：Decimal按字符串输出（与pydantic一致）"""
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def json_dumps(content: Any) -> bytes:
+    """编码为JSON字节（datetime/Enum由orjson原生处理）"""
+    return orjson.dumps(content, default=_default)
+
+
+class RowSerializer:
+    """按响应模式预先编译的行序列化器
+
+    创建时确定字段顺序、各字段对应的查询列以及需要转换类型的字段；
+    列表接口按这些列查询，结果行直接组装为dict后由orjson编码，
+    跳过ORM对象构建、关系懒加载和pydantic逐字段校验。
+    输出与pydantic序列化一致：Decimal字段为字符串，float字段为数值。
+    """
+
+    def __init__(self, schema: Type[BaseModel], model, **sources):
+        """sources：模型上不存在的字段（如关联表的名称）对应的列"""
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+        self.columns = []
+        for name in self.fields:
+            column = sources.get(name, getattr(model, name, None))
+            if column is None:
+                raise ValueError(f"{schema.__name__}.{name} 没有对应的查询列")
+            self.columns.append(column.label(name))
+        self._float_fields = tuple(
+            name for name, field in schema.model_fields.items()
+            if field.annotation in (float, Optional[float])
+        )
+
+    def items(self, rows: Sequence[Any]) -> list:
+        """查询行转为响应字典"""
+        fields = self.fields
+        items = [dict(zip(fields, row)) for row in rows]
+        for name in self._float_fields:
+            for item in items:
+                if item[name] is not None:
+                    item[name] = float(item[name])
+        return items
+
+    def page(self, rows: Sequence[Any], total: int, page: int, page_size: int) -> Response:
+        """分页响应（结构同PaginatedResponse）"""
+        content: Dict[str, Any] = {
+            "items": self.items(rows),
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total + page_size - 1) // page_size,
+        }
+        return Response(content=json_dumps(content), media_type="application/json")
@@ -47,6 +47,19 @@ class UserResponse(BaseModel):
     last_login_at: Optional[datetime]
     created_at: datetime
     updated_at: datetime
+    version: int = 1
+
+    class Config:
+        from_attributes = True
+
+
+class UserPrincipal(BaseModel):
+    """认证主体（鉴权所需的用户字段，可缓存）"""
+    id: int
+    username: str
+    email: str
+    role: UserRole
+    status: UserStatus
 
     class Config:
         from_attributes = True
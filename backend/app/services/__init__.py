@@ -2,5 +2,22 @@
 from app.services.search import SearchService
 from app.services.redis import RedisService
 from app.services.excel import ExcelService
+from app.services.suggest import SuggestService
+from app.services.search_cache import SearchCacheService
+from app.services.principal import PrincipalService
+from app.services.password import PasswordService
+from app.services.revocation import TokenRevocationService
+from app.services.analytics import AnalyticsExportService
+from app.services.jobs import JobService
+from app.services.changes import ChangeFeedService
+from app.services.storage import CoverStorageService
+from app.services.thumbnails import ThumbnailService
+from app.services.conditional import ConditionalRequestService
+from app.services.response_cache import ResponseCacheService
 
-__all__ = ["SearchService", "RedisService", "ExcelService"]
+__all__ = [
+    "SearchService", "RedisService", "ExcelService", "SuggestService", "SearchCacheService",
+    "PrincipalService", "PasswordService", "TokenRevocationService", "AnalyticsExportService",
+    "JobService", "ChangeFeedService", "CoverStorageService",
+    "ThumbnailService", "ConditionalRequestService", "ResponseCacheService",
+]
@@ -0,0 +1,127 @@
+"""增量变更订阅服务"""
+import base64
+import heapq
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.book import Book, Category
+from app.models.borrow import BorrowRecord
+from app.schemas.book import BookResponse
+from app.schemas.category import CategoryResponse
+from app.schemas.borrow import BorrowResponse
+
+EPOCH = datetime(1970, 1, 1)
+
+# (实体名, 模型, 响应模式, 是否软删除)；列表顺序即同一时间戳下的排序
+CHANGE_SOURCES = [
+    ("category", Category, CategoryResponse, True),
+    ("book", Book, BookResponse, True),
+    ("loan", BorrowRecord, BorrowResponse, False),
+]
+CHANGE_ENTITIES = tuple(name for name, *_ in CHANGE_SOURCES)
+
+# 游标位置：(updated_at, 实体序号, 主键)
+Position = Tuple[datetime, int, int]
+
+
+class ChangeFeedService:
+    """增量变更订阅服务
+
+    以各表的updated_at为水位，按 (updated_at, 实体, 主键) 全局排序分页，
+    游标即最后一条变更的位置，消费方保存后可随时续传。
+    只返回updated_at早于 当前时间-CHANGES_SETTLE_SECONDS 的行：应用端在提交前
+    生成updated_at，未提交的事务可能带着更早的时间戳稍后才可见，留出沉淀窗口
+    保证游标推进后不会再出现落在其之前的变更（要求事务在窗口内提交、各节点时钟同步）。
+    软删除（is_active=False）以墓碑形式返回，不带数据。
+    """
+
+    @staticmethod
+    def encode_cursor(position: Position) -> str:
+        """编码游标"""
+        updated_at, rank, row_id = position
+        micros = (updated_at - EPOCH) // timedelta(microseconds=1)
+        return base64.urlsafe_b64encode(f"{micros}.{rank}.{row_id}".encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Position:
+        """解码游标，格式错误时抛出ValueError"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            micros, rank, row_id = (int(part) for part in raw.split("."))
+        except Exception:
+            raise ValueError("无效的游标")
+        if not 0 <= rank < len(CHANGE_SOURCES):
+            raise ValueError("无效的游标")
+        return EPOCH + timedelta(microseconds=micros), rank, row_id
+
+    @staticmethod
+    def _after(model, rank: int, position: Optional[Position]):
+        """位置之后的过滤条件（同一时间戳下按实体序号、主键续传）"""
+        if position is None:
+            return None
+        updated_at, cursor_rank, row_id = position
+        if rank > cursor_rank:
+            return model.updated_at >= updated_at
+        if rank < cursor_rank:
+            return model.updated_at > updated_at
+        return or_(
+            model.updated_at > updated_at,
+            and_(model.updated_at == updated_at, model.id > row_id)
+        )
+
+    @classmethod
+    def fetch(
+        cls,
+        db: Session,
+        since: Optional[str] = None,
+        limit: int = 500,
+        entities: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """获取游标之后的变更
+
+        每个实体按 (updated_at, id) 走索引各取limit+1行后归并，
+        已追平的消费方每次轮询只是几次空的索引范围扫描。
+        """
+        position = cls.decode_cursor(since) if since else None
+        settled_before = datetime.utcnow() - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS)
+
+        streams = []
+        for rank, (entity, model, _, _) in enumerate(CHANGE_SOURCES):
+            if entities and entity not in entities:
+                continue
+            query = db.query(model).filter(model.updated_at < settled_before)
+            condition = cls._after(model, rank, position)
+            if condition is not None:
+                query = query.filter(condition)
+            rows = query.order_by(model.updated_at, model.id).limit(limit + 1).all()
+            streams.append([(row.updated_at, rank, row.id, row) for row in rows])
+
+        merged = list(heapq.merge(*streams, key=lambda item: item[:3]))
+        page = merged[:limit]
+
+        changes = []
+        for updated_at, rank, row_id, row in page:
+            entity, _, schema, soft_delete = CHANGE_SOURCES[rank]
+            if soft_delete and not row.is_active:
+                op, data = "delete", None
+            else:
+                is_new = position is None or (row.created_at is not None and row.created_at > position[0])
+                op = "create" if is_new else "update"
+                data = schema.model_validate(row).model_dump(mode="json")
+            changes.append({
+                "entity": entity,
+                "id": row_id,
+                "op": op,
+                "updated_at": updated_at,
+                "data": data,
+            })
+
+        if page:
+            cursor = cls.encode_cursor(page[-1][:3])
+        else:
+            cursor = since
+        return {"changes": changes, "cursor": cursor, "has_more": len(merged) > limit}
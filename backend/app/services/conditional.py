@@ -0,0 +1,203 @@
+"""条件请求服务（ETag/Last-Modified与304、If-Match与412）"""
+import json
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Dict, Any, Union, Set
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.config import settings
+from app.services.redis import RedisService
+from app.services.metrics import MetricsService
+from app.utils.constants import CACHE_KEY_ETAG
+
+# 版本戳：{"etag": 强ETag, "last_modified": HTTP日期}
+Stamp = Dict[str, str]
+
+
+def cache_control(resource: str) -> str:
+    """各资源的Cache-Control策略
+
+    图书（库存随借还变化）与用户只允许私有缓存且每次协商；
+    分类变动很少，允许浏览器直接复用CATEGORY_CACHE_MAX_AGE秒，过期后再协商。
+    """
+    if resource in ("category", "categories"):
+        return f"private, max-age={settings.CATEGORY_CACHE_MAX_AGE}"
+    return "private, no-cache"
+
+
+class ConditionalRequestService:
+    """条件请求服务
+
+    单个资源的ETag为 "<主键>.<版本号>"（内嵌关联字段时追加其哈希），列表由响应内容哈希计算。
+    版本戳缓存在Redis `etag:{资源}:{键}`，携带If-None-Match/If-Modified-Since的请求
+    先比对版本戳，命中直接返回304，不查询数据库；资源写操作后调用invalidate。
+    更新请求可携带If-Match（取自GET的ETag），版本不符返回412。
+    """
+
+    @staticmethod
+    def version_etag(resource_id: int, version: int, *embedded: Any) -> str:
+        """按版本号生成强ETag"""
+        tag = f"{resource_id}.{version}"
+        if embedded:
+            raw = "|".join("" if part is None else str(part) for part in embedded)
+            tag += "." + hashlib.md5(raw.encode("utf-8")).hexdigest()[:8]
+        return f'"{tag}"'
+
+    @staticmethod
+    def content_etag(content: Any) -> str:
+        """按响应内容计算强ETag（列表使用）"""
+        raw = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+        return f'"{hashlib.md5(raw.encode("utf-8")).hexdigest()}"'
+
+    @staticmethod
+    def http_date(value: Union[datetime, str, None]) -> Optional[str]:
+        """转换为HTTP日期（数据库时间为UTC）"""
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+    @classmethod
+    def make_stamp(cls, etag: str, updated_at: Union[datetime, str, None] = None) -> Stamp:
+        """生成版本戳"""
+        stamp = {"etag": etag}
+        last_modified = cls.http_date(updated_at)
+        if last_modified:
+            stamp["last_modified"] = last_modified
+        return stamp
+
+    @staticmethod
+    def is_conditional(request: Request) -> bool:
+        """请求是否带有条件头"""
+        return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+    @staticmethod
+    def is_not_modified(request: Request, stamp: Stamp) -> bool:
+        """判断客户端缓存是否仍然有效
+
+        If-None-Match优先（弱比较），没有时才比较If-Modified-Since（精确到秒）。
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            etag = stamp["etag"]
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return any(tag.removeprefix("W/") == etag for tag in tags)
+
+        if_modified_since = request.headers.get("if-modified-since")
+        last_modified = stamp.get("last_modified")
+        if if_modified_since and last_modified:
+            try:
+                return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def _headers(stamp: Stamp, resource: str) -> Dict[str, str]:
+        headers = {"ETag": stamp["etag"], "Cache-Control": cache_control(resource)}
+        if stamp.get("last_modified"):
+            headers["Last-Modified"] = stamp["last_modified"]
+        return headers
+
+    @classmethod
+    def not_modified(cls, stamp: Stamp, resource: str) -> Response:
+        """304响应"""
+        MetricsService.incr(f"conditional.not_modified.{resource}")
+        return Response(status_code=304, headers=cls._headers(stamp, resource))
+
+    @classmethod
+    def apply(cls, response: Response, stamp: Stamp, resource: str) -> None:
+        """为完整响应设置ETag/Last-Modified/Cache-Control"""
+        MetricsService.incr(f"conditional.full.{resource}")
+        response.headers.update(cls._headers(stamp, resource))
+
+    @classmethod
+    def conclude(cls, request: Request, response: Response, stamp: Stamp, resource: str) -> Optional[Response]:
+        """完整加载资源后调用：客户端缓存仍有效时返回304，否则设置缓存头并返回None"""
+        if cls.is_not_modified(request, stamp):
+            return cls.not_modified(stamp, resource)
+        cls.apply(response, stamp, resource)
+        return None
+
+    @staticmethod
+    def precondition_failed() -> HTTPException:
+        """412：资源已被其他请求修改"""
+        return HTTPException(status_code=412, detail="数据已被修改，请刷新后重试")
+
+    @classmethod
+    def expected_versions(cls, request: Request, resource_id: int) -> Optional[Set[int]]:
+        """解析If-Match中该资源的版本号，无If-Match或为*时返回None
+
+        If-Match使用强比较：弱ETag、格式不符或属于其他资源的ETag都不匹配，全部不匹配时返回412。
+        """
+        if_match = request.headers.get("if-match")
+        if if_match is None or if_match.strip() == "*":
+            return None
+        versions = set()
+        for tag in if_match.split(","):
+            tag = tag.strip()
+            if not (len(tag) > 2 and tag[0] == tag[-1] == '"'):
+                continue
+            parts = tag[1:-1].split(".")
+            if len(parts) >= 2 and parts[0] == str(resource_id) and parts[1].isdigit():
+                versions.add(int(parts[1]))
+        if not versions:
+            raise cls.precondition_failed()
+        return versions
+
+    @classmethod
+    def check_version(cls, version: int, expected: Optional[Set[int]]) -> None:
+        """校验当前版本号是否满足If-Match"""
+        if expected is not None and version not in expected:
+            raise cls.precondition_failed()
+
+    @classmethod
+    def commit(cls, db: Session, expected: Optional[Set[int]]) -> None:
+        """提交版本化更新
+
+        UPDATE带 WHERE version=? 条件，读取后被并发修改时影响行数为0，
+        SQLAlchemy抛出StaleDataError：有If-Match时返回412，否则返回409。
+        """
+        try:
+            db.commit()
+        except StaleDataError:
+            db.rollback()
+            if expected is not None:
+                raise cls.precondition_failed()
+            raise HTTPException(status_code=409, detail="数据已被其他请求修改，请重试")
+
+    @staticmethod
+    def _key(resource: str, key: Any) -> str:
+        return f"{CACHE_KEY_ETAG}{resource}:{key}"
+
+    @classmethod
+    async def check(cls, request: Request, resource: str, key: Any) -> Optional[Response]:
+        """按缓存的版本戳应答条件请求，无法确定时返回None（继续正常处理）"""
+        if not cls.is_conditional(request):
+            return None
+        stamp = await RedisService.get(cls._key(resource, key))
+        if stamp and cls.is_not_modified(request, stamp):
+            return cls.not_modified(stamp, resource)
+        return None
+
+    @classmethod
+    async def save(cls, resource: str, key: Any, stamp: Stamp) -> None:
+        """缓存版本戳"""
+        await RedisService.set(cls._key(resource, key), stamp, expire=settings.CONDITIONAL_STAMP_TTL)
+
+    @classmethod
+    async def invalidate(cls, resource: str, key: Any = "*") -> None:
+        """使版本戳失效，key为*时清除该资源的全部版本戳"""
+        if key == "*":
+            await RedisService.delete_pattern(cls._key(resource, "*"))
+        else:
+            await RedisService.delete(cls._key(resource, key))
@@ -0,0 +1,450 @@
+"""内嵌搜索引擎（无Elasticsearch部署及ES故障时的降级方案）"""
+import os
+import re
+import math
+import bisect
+import pickle
+import tempfile
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+import numpy as np
+
+
+# 字段及权重，与ES multi_match保持一致
+FIELD_BOOSTS = {
+    "title": 3.0,
+    "author": 2.0,
+    "summary": 1.0,
+    "isbn": 1.0,
+}
+
+# 文档中保留的字段（与ES _source一致，不含补全字段）
+STORED_FIELDS = (
+    "id", "isbn", "isbn13", "title", "author", "publisher", "category_id", "category_name",
+    "summary", "status", "available_stock", "borrow_count", "created_at",
+)
+
+# 存储字段在文档元组中的下标
+_FIELD_INDEX = {field: index for index, field in enumerate(STORED_FIELDS)}
+_TITLE, _AUTHOR, _BORROW_COUNT = _FIELD_INDEX["title"], _FIELD_INDEX["author"], _FIELD_INDEX["borrow_count"]
+
+SNAPSHOT_VERSION = 3
+
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_WORD_RE = re.compile(r"[0-9a-z]+")
+_ISBN_CHARS_RE = re.compile(r"[^0-9x]")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """分词：中文按二元组切分，英文数字按单词切分"""
+    if not text:
+        return []
+    text = text.lower()
+    tokens: List[str] = []
+    for match in _CJK_RE.finditer(text):
+        segment = match.group()
+        if len(segment) == 1:
+            tokens.append(segment)
+        else:
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    tokens.extend(_WORD_RE.findall(_CJK_RE.sub(" ", text)))
+    return tokens
+
+
+def tokenize_isbn(isbn: Optional[str]) -> List[str]:
+    """ISBN分词：原始分段加去除分隔符后的整体"""
+    if not isbn:
+        return []
+    tokens = tokenize(isbn)
+    compact = _ISBN_CHARS_RE.sub("", isbn.lower())
+    if compact and compact not in tokens:
+        tokens.append(compact)
+    return tokens
+
+
+class EmbeddedSearchEngine:
+    """内存倒排索引 + BM25评分
+
+    每个字段独立维护倒排表和文档长度，评分采用best_fields语义：
+    取各字段(BM25 * 权重)中的最大值。
+    倒排表为紧凑数组（每个词一个array('I')，交替存放文档ID与词频），字段长度、分类、状态、
+    借阅次数按文档ID下标存放在数组中，评分、过滤与排序由numpy向量化完成；
+    存储字段按STORED_FIELDS顺序存为元组，返回结果时再组装为字典。
+    简介只索引前FIELD_MAX_TOKENS个词，查询时跳过简介中的高频词。
+    容量：以简介80~300字的数据实测，30万本常驻内存约1.3GB（约4KB/本），查询耗时约0.3ms，
+    100万本约需4GB；索引由每个worker各持一份，内存按worker数成倍增加。
+    因此单进程建议不超过约30万本，百万级目录请使用Elasticsearch（内嵌索引仅作降级）。
+    """
+
+    K1 = 1.2
+    B = 0.75
+    # 字段最多索引的词数（简介很长，二元组数量远多于书名/作者）
+    FIELD_MAX_TOKENS = {"summary": 128}
+    # 简介中文档频率超过该比例（且不少于SUMMARY_MIN_SKIP_DF）的词查询时跳过，这类词idf很低
+    SUMMARY_MAX_DF_RATIO = 0.05
+    SUMMARY_MIN_SKIP_DF = 1000
+    # 单次写入的建议键不超过该数量时逐个插入，否则追加后整体排序（归并两段有序序列）
+    SUGGEST_INSORT_LIMIT = 64
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        # field -> term -> array('I')[doc_id, tf, doc_id, tf, ...]
+        self._postings: Dict[str, Dict[str, array]] = {f: {} for f in FIELD_BOOSTS}
+        # field -> 按文档ID下标的字段长度（0表示没有该字段）
+        self._lengths: Dict[str, array] = {f: array("I") for f in FIELD_BOOSTS}
+        self._field_docs: Dict[str, int] = {f: 0 for f in FIELD_BOOSTS}
+        self._total_lengths: Dict[str, int] = {f: 0 for f in FIELD_BOOSTS}
+        # 按文档ID下标的过滤/排序属性（0表示无）
+        self._categories = array("I")
+        self._statuses = array("B")
+        self._borrow_counts = array("I")
+        self._status_codes: Dict[str, int] = {}
+        self._docs: Dict[int, Tuple[Any, ...]] = {}
+        # 搜索建议用的有序(书名/作者, doc_id)列表，写入时增量维护
+        self._suggest_keys: List[Tuple[str, int]] = []
+        # 锁外重建建议键期间的增量写入：(是否新增, 键)
+        self._suggest_log: Optional[List[Tuple[bool, Tuple[str, int]]]] = None
+        # 快照时间，用于启动后增量追平
+        self.synced_at: Optional[datetime] = None
+
+    @property
+    def size(self) -> int:
+        """已索引文档数"""
+        return len(self._docs)
+
+    @classmethod
+    def _field_tokens(cls, field: str, value: Any) -> List[str]:
+        if field == "isbn":
+            return tokenize_isbn(value)
+        tokens = tokenize(value)
+        limit = cls.FIELD_MAX_TOKENS.get(field)
+        return tokens[:limit] if limit else tokens
+
+    @staticmethod
+    def _suggest_entries(doc_id: int, row: Tuple[Any, ...]) -> List[Tuple[str, int]]:
+        return [(value.lower(), doc_id) for value in (row[_TITLE], row[_AUTHOR]) if value]
+
+    def _ensure_capacity(self, doc_id: int) -> None:
+        """按文档ID扩容下标数组（按1.5倍增长）"""
+        if doc_id < len(self._categories):
+            return
+        grow = max(doc_id + 1, len(self._categories) * 3 // 2) - len(self._categories)
+        for values in (self._categories, self._statuses, self._borrow_counts, *self._lengths.values()):
+            values.frombytes(bytes(grow * values.itemsize))
+
+    def _status_code(self, status: Optional[str]) -> int:
+        if not status:
+            return 0
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self._status_codes) + 1
+        return code
+
+    def _add_suggest_keys(self, keys: List[Tuple[str, int]]) -> None:
+        if len(keys) <= self.SUGGEST_INSORT_LIMIT:
+            for key in keys:
+                bisect.insort(self._suggest_keys, key)
+        else:
+            # 原列表与新键各为一段有序序列，Timsort按归并处理
+            self._suggest_keys.extend(sorted(keys))
+            self._suggest_keys.sort()
+        if self._suggest_log is not None:
+            self._suggest_log.extend((True, key) for key in keys)
+
+    @staticmethod
+    def _discard_key(keys: List[Tuple[str, int]], key: Tuple[str, int]) -> None:
+        index = bisect.bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            del keys[index]
+
+    def _index(self, doc: Dict[str, Any], suggest: bool) -> List[Tuple[str, int]]:
+        """写入单个文档（调用方持有锁），返回需加入建议列表的键"""
+        doc_id = int(doc["id"])
+        row = tuple(doc.get(key) for key in STORED_FIELDS)
+        self._remove(doc_id, suggest)
+        self._docs[doc_id] = row
+        self._ensure_capacity(doc_id)
+        self._categories[doc_id] = doc.get("category_id") or 0
+        self._statuses[doc_id] = self._status_code(doc.get("status"))
+        self._borrow_counts[doc_id] = doc.get("borrow_count") or 0
+        for field in FIELD_BOOSTS:
+            tokens = self._field_tokens(field, doc.get(field))
+            if not tokens:
+                continue
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            postings = self._postings[field]
+            for token, tf in counts.items():
+                entry = postings.get(token)
+                if entry is None:
+                    entry = postings[token] = array("I")
+                entry.append(doc_id)
+                entry.append(tf)
+            self._lengths[field][doc_id] = len(tokens)
+            self._field_docs[field] += 1
+            self._total_lengths[field] += len(tokens)
+        return self._suggest_entries(doc_id, row) if suggest else []
+
+    def index_doc(self, doc: Dict[str, Any], suggest: bool = True) -> None:
+        """索引（或更新）单个文档
+
+        suggest为False时不维护建议键（全量加载时使用，结束后调用rebuild_suggest）。
+        """
+        with self._lock:
+            keys = self._index(doc, suggest)
+            if keys:
+                self._add_suggest_keys(keys)
+
+    def bulk_index(self, docs: Iterable[Dict[str, Any]], suggest: bool = True) -> int:
+        """批量索引，建议键在整批写入后一次性合并"""
+        count = 0
+        keys: List[Tuple[str, int]] = []
+        for doc in docs:
+            with self._lock:
+                keys.extend(self._index(doc, suggest))
+            count += 1
+        if keys:
+            with self._lock:
+                self._add_suggest_keys(keys)
+        return count
+
+    def delete_doc(self, doc_id: int) -> None:
+        """删除文档"""
+        with self._lock:
+            self._remove(int(doc_id), True)
+
+    def _remove(self, doc_id: int, suggest: bool) -> None:
+        old = self._docs.pop(doc_id, None)
+        if old is None:
+            return
+        if suggest:
+            for key in self._suggest_entries(doc_id, old):
+                self._discard_key(self._suggest_keys, key)
+                if self._suggest_log is not None:
+                    self._suggest_log.append((False, key))
+        for field in FIELD_BOOSTS:
+            length = self._lengths[field][doc_id]
+            if not length:
+                continue
+            self._lengths[field][doc_id] = 0
+            self._field_docs[field] -= 1
+            self._total_lengths[field] -= length
+            postings = self._postings[field]
+            for token in set(self._field_tokens(field, old[_FIELD_INDEX[field]])):
+                entry = postings.get(token)
+                if entry is None:
+                    continue
+                try:
+                    index = entry[::2].index(doc_id)
+                except ValueError:
+                    continue
+                del entry[2 * index:2 * index + 2]
+                if not entry:
+                    del postings[token]
+
+    def rebuild_suggest(self) -> None:
+        """重建建议键（全量加载后调用）
+
+        在锁外排序，期间的增量写入记录在_suggest_log中，替换前重放，不会丢失；
+        重建完成前建议查询使用旧列表，并校验键与文档当前字段一致。
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                rows = list(self._docs.items())
+                self._suggest_log = []
+            keys = sorted(key for doc_id, row in rows for key in self._suggest_entries(doc_id, row))
+            with self._lock:
+                for added, key in self._suggest_log:
+                    if added:
+                        bisect.insort(keys, key)
+                    else:
+                        self._discard_key(keys, key)
+                self._suggest_keys = keys
+                self._suggest_log = None
+
+    def clear(self) -> None:
+        """清空索引"""
+        with self._lock:
+            self.__init__()
+
+    def _query_tokens(self, keyword: str) -> List[str]:
+        tokens = tokenize(keyword)
+        compact = _ISBN_CHARS_RE.sub("", keyword.lower())
+        if len(compact) >= 10 and compact not in tokens:
+            tokens.append(compact)
+        # 去重保序
+        return list(dict.fromkeys(tokens))
+
+    def _score(self, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """best_fields BM25评分，返回(文档ID数组, 得分数组)，调用方持有锁"""
+        total_docs = len(self._docs)
+        summary_df_limit = max(self.SUMMARY_MIN_SKIP_DF, self.SUMMARY_MAX_DF_RATIO * total_docs)
+        field_ids: List[np.ndarray] = []
+        field_scores: List[np.ndarray] = []
+        for field, boost in FIELD_BOOSTS.items():
+            field_docs = self._field_docs[field]
+            if not field_docs:
+                continue
+            avg_length = self._total_lengths[field] / field_docs
+            lengths = np.frombuffer(self._lengths[field], dtype=np.uint32)
+            postings = self._postings[field]
+            token_ids: List[np.ndarray] = []
+            token_scores: List[np.ndarray] = []
+            for token in tokens:
+                entry = postings.get(token)
+                if entry is None:
+                    continue
+                df = len(entry) // 2
+                if field == "summary" and df > summary_df_limit:
+                    continue
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                pairs = np.frombuffer(entry, dtype=np.uint32).reshape(-1, 2)
+                ids = pairs[:, 0]
+                tf = pairs[:, 1].astype(np.float64)
+                norm = self.K1 * (1 - self.B + self.B * lengths[ids] / avg_length)
+                token_ids.append(ids)
+                token_scores.append(idf * tf * (self.K1 + 1) / (tf + norm))
+            if not token_ids:
+                continue
+            # 同一字段内各词得分按文档求和
+            unique_ids, inverse = np.unique(np.concatenate(token_ids), return_inverse=True)
+            field_ids.append(unique_ids)
+            field_scores.append(np.bincount(inverse, weights=np.concatenate(token_scores)) * boost)
+
+        if not field_ids:
+            return np.empty(0, dtype=np.uint32), np.empty(0)
+        # 各字段取最大值
+        ids = np.concatenate(field_ids)
+        scores = np.concatenate(field_scores)
+        order = np.argsort(ids, kind="stable")
+        ids, scores = ids[order], scores[order]
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        return ids[starts], np.maximum.reduceat(scores, starts)
+
+    def search(
+        self,
+        keyword: str,
+        category_id: Optional[int] = None,
+        status: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 10
+    ) -> Dict[str, Any]:
+        """搜索，返回结构与SearchService.search一致"""
+        tokens = self._query_tokens(keyword)
+        if not tokens:
+            return {"hits": [], "total": 0}
+
+        with self._lock:
+            ids, scores = self._score(tokens)
+            if category_id:
+                mask = np.frombuffer(self._categories, dtype=np.uint32)[ids] == category_id
+                ids, scores = ids[mask], scores[mask]
+            if status:
+                code = self._status_codes.get(status)
+                if code is None:
+                    ids, scores = ids[:0], scores[:0]
+                else:
+                    mask = np.frombuffer(self._statuses, dtype=np.uint8)[ids] == code
+                    ids, scores = ids[mask], scores[mask]
+            total = len(ids)
+
+            # 排序：相关度 > 借阅次数 > 文档ID（新书在前，与创建时间顺序一致）
+            window = page * page_size
+            if total > window:
+                # 先按得分取前window名（含并列），再对少量候选完整排序
+                threshold = np.partition(scores, total - window)[total - window]
+                keep = scores >= threshold
+                ids, scores = ids[keep], scores[keep]
+            borrow_counts = np.frombuffer(self._borrow_counts, dtype=np.uint32)[ids]
+            order = np.lexsort((-ids.astype(np.int64), -borrow_counts.astype(np.int64), -scores))
+            hits = []
+            for index in order[(page - 1) * page_size:window]:
+                hit = dict(zip(STORED_FIELDS, self._docs[int(ids[index])]))
+                hit["_score"] = round(float(scores[index]), 6)
+                hits.append(hit)
+
+        return {"hits": hits, "total": total}
+
+    def suggest(self, prefix: str, limit: int = 10, max_scan: int = 1000) -> List[str]:
+        """搜索建议：书名或作者以prefix开头的图书，按借阅次数排序"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+
+        with self._lock:
+            keys = self._suggest_keys
+            matched: Dict[int, Tuple[Any, ...]] = {}
+            start = bisect.bisect_left(keys, (prefix,))
+            for key, doc_id in keys[start:start + max_scan]:
+                if not key.startswith(prefix):
+                    break
+                row = self._docs.get(doc_id)
+                # 全量加载后重建完成前，列表中可能有已删除或已改名的旧键
+                if row is None or (key, doc_id) not in self._suggest_entries(doc_id, row):
+                    continue
+                matched[doc_id] = row
+
+        ranked = sorted(matched.values(), key=lambda row: -(row[_BORROW_COUNT] or 0))
+        titles: List[str] = []
+        for row in ranked:
+            title = row[_TITLE]
+            if title and title not in titles:
+                titles.append(title)
+        return titles[:limit]
+
+    def save_snapshot(self, path: str) -> None:
+        """保存快照（先写本进程独有的临时文件再原子替换，多个worker同时保存互不影响）"""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f, self._lock:
+                state = {
+                    "version": SNAPSHOT_VERSION,
+                    "synced_at": self.synced_at,
+                    "docs": self._docs,
+                    "postings": self._postings,
+                    "lengths": self._lengths,
+                    "field_docs": self._field_docs,
+                    "total_lengths": self._total_lengths,
+                    "categories": self._categories,
+                    "statuses": self._statuses,
+                    "borrow_counts": self._borrow_counts,
+                    "status_codes": self._status_codes,
+                }
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load_snapshot(self, path: str) -> bool:
+        """加载快照，文件不存在或版本不符时返回False
+
+        建议键不在快照中，加载（及增量追平）后调用rebuild_suggest。
+        """
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != SNAPSHOT_VERSION:
+            return False
+        with self._lock:
+            self._docs = state["docs"]
+            self._postings = state["postings"]
+            self._lengths = state["lengths"]
+            self._field_docs = state["field_docs"]
+            self._total_lengths = state["total_lengths"]
+            self._categories = state["categories"]
+            self._statuses = state["statuses"]
+            self._borrow_counts = state["borrow_counts"]
+            self._status_codes = state["status_codes"]
+            self._suggest_keys = []
+            self.synced_at = state["synced_at"]
+        return True
@@ -1,16 +1,90 @@
 """Excel导入导出服务"""
 import io
+import os
+import csv
+import tempfile
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple, BinaryIO, Callable, Iterator, Sequence
 from decimal import Decimal
 
+import numpy as np
 import pandas as pd
 from fastapi import UploadFile
-from sqlalchemy.orm import Session
+from openpyxl import Workbook, load_workbook
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import insert, or_, select
+from sqlalchemy.orm import Session, joinedload
 
+from app.config import settings
+from app.database import SessionLocal
 from app.models.book import Book, Category
 from app.models.user import User
-from app.schemas.book import BookCreate
+from app.models.borrow import BorrowRecord
+from app.services.search import SearchService
+from app.utils.isbn import SEPARATOR_RE
+
+MAX_IMPORT_ERRORS = 100  # 最多返回的错误条数
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+    "zip": "application/zip",
+}
+
+_ISBN13_WEIGHTS = np.array([1, 3] * 6)
+_ISBN10_WEIGHTS = np.arange(10, 0, -1)
+# ISBN-10转13时前缀978的加权和为 9*1 + 7*3 + 8*1
+_ISBN978_SUM = 38
+_ISBN10_TO_13_WEIGHTS = np.array([3, 1] * 4 + [3])
+
+
+def _clean_text(series: pd.Series) -> pd.Series:
+    """转为字符串并去除首尾空白，空字符串视为缺失"""
+    series = series.astype("string").str.strip()
+    return series.mask(series == "")
+
+
+def _detect_encoding(head: bytes) -> str:
+    """识别CSV编码：UTF-8（含BOM）或GBK（Excel中文版默认另存格式）"""
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # 仅在末尾截断了多字节字符时仍视为UTF-8
+        if e.start < len(head) - 3:
+            return "gb18030"
+    return "utf-8-sig"
+
+
+def _digits(values: pd.Series, width: int) -> np.ndarray:
+    """定长ASCII字符串转为 (n, width) 的字符编码矩阵"""
+    return np.frombuffer("".join(values).encode("ascii"), dtype=np.uint8).reshape(-1, width).astype(np.int64)
+
+
+def _normalize_isbn_column(raw: pd.Series) -> pd.Series:
+    """向量化的normalize_isbn：标准化为ISBN-13，格式或校验位错误时为缺失值"""
+    cleaned = raw.str.replace(SEPARATOR_RE, "", regex=True).str.upper()
+    result = pd.Series(pd.NA, index=raw.index, dtype="string")
+
+    is13 = cleaned.str.fullmatch(r"97[89]\d{10}").fillna(False).astype(bool)
+    if is13.any():
+        values = cleaned[is13]
+        digits = _digits(values, 13) - 48
+        valid = (10 - digits[:, :12] @ _ISBN13_WEIGHTS % 10) % 10 == digits[:, 12]
+        result[values.index[valid]] = values[valid]
+
+    is10 = cleaned.str.fullmatch(r"\d{9}[\dX]").fillna(False).astype(bool)
+    if is10.any():
+        values = cleaned[is10]
+        codes = _digits(values, 10)
+        digits = codes - 48
+        digits[:, 9] = np.where(codes[:, 9] == ord("X"), 10, digits[:, 9])
+        valid = digits @ _ISBN10_WEIGHTS % 11 == 0
+        check = (10 - (_ISBN978_SUM + digits[valid, :9] @ _ISBN10_TO_13_WEIGHTS) % 10) % 10
+        converted = "978" + values[valid].str[:9] + pd.Series(check, index=values.index[valid]).astype(str)
+        result[converted.index] = converted
+    return result
 
 
 class ExcelService:
@@ -47,6 +121,21 @@ class ExcelService:
         "馆藏位置": "location",
     }
 
+    # 借阅记录导出字段
+    EXPORT_BORROW_FIELDS = {
+        "借阅ID": "id",
+        "用户": "user_name",
+        "图书": "book_title",
+        "ISBN": "book_isbn",
+        "借出日期": "borrow_date",
+        "应还日期": "due_date",
+        "归还日期": "return_date",
+        "状态": "status",
+        "续借次数": "renew_count",
+        "逾期天数": "overdue_days",
+        "罚款金额": "fine_amount",
+    }
+
     @classmethod
     async def import_books(
         cls,
@@ -55,155 +144,269 @@ class ExcelService:
         category_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """导入图书"""
-        content = await file.read()
-        df = pd.read_excel(io.BytesIO(content))
-
-        # 标准化列名
-        df.columns = df.columns.str.strip()
-
-        # 验证必要字段
-        required_fields = ["ISBN", "书名", "作者"]
-        for field in required_fields:
-            if field not in df.columns:
-                raise ValueError(f"缺少必要字段: {field}")
-
-        # 数据转换与验证
-        books_data = []
-        errors = []
-
-        for idx, row in df.iterrows():
-            row_num = idx + 2  # Excel行号（包含表头）
+        return await run_in_threadpool(cls.import_file, file.file, file.filename or "", db, category_id)
 
+    @classmethod
+    def import_file(
+        cls,
+        fileobj: BinaryIO,
+        filename: str,
+        db: Session,
+        category_id: Optional[int] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """流式导入图书（xlsx/csv）
+
+        逐行读取文件，每IMPORT_CHUNK_SIZE行校验、插入并提交一次，内存占用与文件大小无关。
+        跨批次的重复ISBN在后一批次中按"已存在"报告。
+
+        Args:
+            progress: 每批完成后回调，参数为累计的 rows/success_count/error_count
+        """
+        rows = cls._iter_rows(fileobj, filename)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError("文件内容为空")
+        header = ["" if value is None else str(value).strip() for value in header]
+        cls._check_columns(header)
+
+        summary = {"rows": 0, "success_count": 0, "error_count": 0, "errors": []}
+        chunk_size = settings.IMPORT_CHUNK_SIZE
+        chunk, row_numbers = [], []
+
+        def flush() -> None:
+            df = cls._rename_columns(pd.DataFrame(chunk, columns=header, index=row_numbers, dtype=object))
+            records, errors, error_count = cls._prepare_books(df, db, category_id, start_row=0)
+            cls._insert_books(db, records)
+            db.commit()
+            cls._index_books(db, records)
+
+            summary["rows"] += len(chunk)
+            summary["success_count"] += len(records)
+            summary["error_count"] += error_count
+            summary["errors"].extend(errors[:MAX_IMPORT_ERRORS - len(summary["errors"])])
+            chunk.clear()
+            row_numbers.clear()
+            if progress is not None:
+                progress({k: summary[k] for k in ("rows", "success_count", "error_count")})
+
+        width = len(header)
+        for row_num, row in enumerate(rows, start=2):  # Excel行号（包含表头）
+            if not any(value is not None and str(value).strip() != "" for value in row):
+                continue
+            row = tuple(row[:width])
+            chunk.append(row + (None,) * (width - len(row)))
+            row_numbers.append(row_num)
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+
+        return summary
+
+    @staticmethod
+    def _iter_rows(fileobj: BinaryIO, filename: str) -> Iterator[Sequence[Any]]:
+        """逐行读取文件，第一行为表头"""
+        suffix = os.path.splitext(filename)[1].lower()
+        if suffix == ".csv":
+            head = fileobj.read(65536)
+            fileobj.seek(0)
+            text = io.TextIOWrapper(fileobj, encoding=_detect_encoding(head), newline="")
             try:
-                # 必填字段验证
-                if pd.isna(row["ISBN"]) or str(row["ISBN"]).strip() == "":
-                    errors.append(f"第{row_num}行: ISBN不能为空")
-                    continue
-
-                if pd.isna(row["书名"]) or str(row["书名"]).strip() == "":
-                    errors.append(f"第{row_num}行: 书名不能为空")
-                    continue
-
-                if pd.isna(row["作者"]) or str(row["作者"]).strip() == "":
-                    errors.append(f"第{row_num}行: 作者不能为空")
-                    continue
-
-                # 检查ISBN唯一性
-                isbn = str(row["ISBN"]).strip()
-                if db.query(Book).filter(Book.isbn == isbn).first():
-                    errors.append(f"第{row_num}行: ISBN '{isbn}' 已存在")
-                    continue
-
-                # 处理分类
-                book_category_id = category_id
-                if "分类名称" in df.columns and pd.notna(row.get("分类名称")):
-                    category_name = str(row["分类名称"]).strip()
-                    category = db.query(Category).filter(
-                        Category.name == category_name,
-                        Category.is_active == True
-                    ).first()
-                    if category:
-                        book_category_id = category.id
-
-                # 处理价格
-                price = 0.0
-                if "价格" in df.columns and pd.notna(row.get("价格")):
-                    try:
-                        price = float(str(row["价格"]).replace(",", ""))
-                    except (ValueError, TypeError):
-                        pass
-
-                # 处理库存
-                total_stock = 1
-                if "库存数量" in df.columns and pd.notna(row.get("库存数量")):
-                    try:
-                        total_stock = int(str(row["库存数量"]).replace(",", ""))
-                    except (ValueError, TypeError):
-                        pass
-
-                book = BookCreate(
-                    isbn=isbn,
-                    title=str(row["书名"]).strip(),
-                    author=str(row["作者"]).strip(),
-                    publisher=str(row["publisher"]).strip() if pd.notna(row.get("出版社")) else None,
-                    publish_date=str(row["publish_date"]).strip() if pd.notna(row.get("出版日期")) else None,
-                    price=Decimal(str(price)),
-                    category_id=book_category_id,
-                    summary=str(row["summary"]).strip() if pd.notna(row.get("简介")) else None,
-                    total_stock=total_stock,
-                    location=str(row["location"]).strip() if pd.notna(row.get("馆藏位置")) else None,
-                )
-                books_data.append(book)
-
-            except Exception as e:
-                errors.append(f"第{row_num}行: 处理失败 - {str(e)}")
-
-        # 批量保存
-        if books_data:
-            books = []
-            for book_data in books_data:
-                book = Book(
-                    isbn=book_data.isbn,
-                    title=book_data.title,
-                    author=book_data.author,
-                    publisher=book_data.publisher,
-                    publish_date=book_data.publish_date,
-                    price=book_data.price,
-                    category_id=book_data.category_id,
-                    summary=book_data.summary,
-                    total_stock=book_data.total_stock,
-                    available_stock=book_data.total_stock,
-                    location=book_data.location,
-                )
-                db.add(book)
-                books.append(book)
+                yield from csv.reader(text)
+            finally:
+                text.detach()
+        elif suffix in (".xlsx", ".xlsm"):
+            # 只读模式按需解析工作表XML，不构建完整的单元格对象树
+            workbook = load_workbook(fileobj, read_only=True, data_only=True)
+            try:
+                yield from workbook.active.iter_rows(values_only=True)
+            finally:
+                workbook.close()
+        else:
+            raise ValueError("仅支持xlsx和csv文件")
 
-            db.commit()
-            for book in books:
-                db.refresh(book)
+    @classmethod
+    def _check_columns(cls, columns: List[str]) -> None:
+        """验证必要字段"""
+        for item in cls.IMPORT_TEMPLATE:
+            if item["required"] and item["header"] not in columns:
+                raise ValueError(f"缺少必要字段: {item['header']}")
 
-        return {
-            "success_count": len(books_data),
-            "error_count": len(errors),
-            "errors": errors[:100],  # 最多返回100条错误
-        }
+    @classmethod
+    def _rename_columns(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """列名转为字段名，缺失的可选列补空"""
+        df.columns = df.columns.astype(str).str.strip()
+        cls._check_columns(df.columns.tolist())
+
+        headers = {item["header"]: item["field"] for item in cls.IMPORT_TEMPLATE}
+        df = df[[column for column in df.columns if column in headers]].rename(columns=headers)
+        for field in headers.values():
+            if field not in df.columns:
+                df[field] = pd.NA
+        return df
 
     @classmethod
-    def export_books(
+    def _prepare_books(
         cls,
-        books: List[Book],
-        fields: Optional[List[str]] = None
-    ) -> io.BytesIO:
-        """导出图书"""
-        if fields is None:
-            fields = list(cls.EXPORT_FIELDS.keys())
-
-        data = []
-        for book in books:
-            row = {}
-            for header, field in cls.EXPORT_FIELDS.items():
-                if header in fields:
-                    value = getattr(book, field, None)
-                    if field == "category_name":
-                        value = book.category.name if book.category else None
-                    elif isinstance(value, Decimal):
-                        value = float(value)
-                    elif isinstance(value, datetime):
-                        value = value.strftime("%Y-%m-%d %H:%M:%S")
-                    row[header] = value
-            data.append(row)
-
-        df = pd.DataFrame(data)
-
-        # 按字段顺序排列
-        df = df[fields]
-
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="图书列表")
+        df: pd.DataFrame,
+        db: Session,
+        category_id: Optional[int] = None,
+        start_row: int = 2
+    ) -> Tuple[List[Dict[str, Any]], List[str], int]:
+        """向量化校验与转换
+
+        Args:
+            df: 已转换为字段名的数据，index为从0开始的数据行序号
+            start_row: index为0的数据行在Excel中的行号（包含表头）
+
+        Returns:
+            (待插入记录, 错误信息(最多MAX_IMPORT_ERRORS条), 错误总数)
+        """
+        text = {field: _clean_text(df[field]) for field in ("isbn", "title", "author", "publisher",
+                                                            "publish_date", "category_name",
+                                                            "summary", "location")}
+        error = pd.Series(None, index=df.index, dtype=object)
+
+        def flag(mask: pd.Series, message) -> None:
+            mask = mask & error.isna()
+            if mask.any():
+                error[mask] = message if isinstance(message, str) else message[mask]
+
+        # 必填字段验证
+        flag(text["isbn"].isna(), "ISBN不能为空")
+        flag(text["title"].isna(), "书名不能为空")
+        flag(text["author"].isna(), "作者不能为空")
+
+        # ISBN校验位（按标准化ISBN-13比较）
+        isbn = text["isbn"].str.replace(r"\.0$", "", regex=True)  # 纯数字ISBN被Excel读成浮点数
+        isbn13 = _normalize_isbn_column(isbn)
+        flag(isbn13.isna(), "ISBN '" + isbn + "' 格式或校验位错误")
+
+        # 长度限制
+        for item in cls.IMPORT_TEMPLATE:
+            max_length = item.get("max_length")
+            if max_length and item["field"] in text:
+                flag(text[item["field"]].str.len() > max_length,
+                     f"{item['header']}超过{max_length}个字符")
+
+        # 价格与库存（无法解析时使用默认值）
+        price = pd.to_numeric(_clean_text(df["price"]).str.replace(",", ""), errors="coerce").fillna(0.0)
+        total_stock = pd.to_numeric(_clean_text(df["total_stock"]).str.replace(",", ""), errors="coerce")
+        total_stock = total_stock.where(total_stock % 1 == 0).fillna(1).astype("int64")
+        flag(price < 0, "价格不能为负数")
+        flag(total_stock < 0, "库存数量不能为负数")
+
+        # 文件内重复（与首次出现的行比较）
+        valid = error.isna()
+        keys = isbn13[valid]
+        row_numbers = pd.Series(df.index + start_row, index=df.index)[valid]
+        first_row = row_numbers.groupby(keys).transform("first")
+        flag((first_row != row_numbers).reindex(df.index, fill_value=False),
+             "ISBN '" + isbn + "' 与第" + first_row.astype(str).reindex(df.index) + "行重复")
+
+        # 数据库中已存在
+        valid = error.isna()
+        existing13, existing_raw = cls._existing_isbns(db, isbn13[valid].tolist(), isbn[valid].tolist())
+        flag(isbn13.isin(existing13) | isbn.isin(existing_raw), "ISBN '" + isbn + "' 已存在")
+
+        # 处理分类（名称一次查询）
+        book_category_id = pd.Series(category_id, index=df.index, dtype=object)
+        names = text["category_name"].dropna().unique().tolist()
+        if names:
+            categories = dict(
+                db.query(Category.name, Category.id).filter(
+                    Category.name.in_(names),
+                    Category.is_active == True
+                ).all()
+            )
+            matched = text["category_name"].map(categories).astype("Int64")
+            book_category_id = matched.astype(object).where(matched.notna(), book_category_id)
+
+        valid = error.isna()
+        books = pd.DataFrame({
+            "isbn": isbn,
+            "isbn13": isbn13,
+            "title": text["title"],
+            "author": text["author"],
+            "publisher": text["publisher"],
+            "publish_date": text["publish_date"],
+            "price": price.round(2),
+            "category_id": book_category_id,
+            "summary": text["summary"],
+            "total_stock": total_stock,
+            "available_stock": total_stock,
+            "location": text["location"],
+        })[valid]
+        books = books.astype(object).where(books.notna(), None)
+        records = books.to_dict("records")
+
+        failed = error[~valid]
+        errors = [
+            f"第{row_num}行: {message}"
+            for row_num, message in zip(failed.index[:MAX_IMPORT_ERRORS] + start_row, failed[:MAX_IMPORT_ERRORS])
+        ]
+        return records, errors, len(failed)
+
+    @staticmethod
+    def _insert_books(db: Session, records: List[Dict[str, Any]]) -> None:
+        """分批executemany插入（使用Core语句，空值分布不同的行也能合并为一批）"""
+        chunk_size = settings.IMPORT_CHUNK_SIZE
+        for offset in range(0, len(records), chunk_size):
+            db.execute(insert(Book.__table__), records[offset:offset + chunk_size])
+
+    @staticmethod
+    def _index_books(db: Session, records: List[Dict[str, Any]]) -> None:
+        """按ISBN-13回查本批已提交的图书并同步到搜索索引（Core插入不返回ORM对象）"""
+        chunk_size = settings.IMPORT_CHUNK_SIZE
+        for offset in range(0, len(records), chunk_size):
+            isbn13s = [record["isbn13"] for record in records[offset:offset + chunk_size]]
+            books = db.query(Book).options(joinedload(Book.category)).filter(
+                Book.isbn13.in_(isbn13s)
+            ).all()
+            SearchService.bulk_index_books(books)
+
+    @staticmethod
+    def _existing_isbns(db: Session, isbn13s: List[str], isbns: List[str]) -> Tuple[Set[str], Set[str]]:
+        """查询数据库中已存在的ISBN（每批一次查询）"""
+        existing13: Set[str] = set()
+        existing_raw: Set[str] = set()
+        chunk_size = settings.IMPORT_CHUNK_SIZE
+        for offset in range(0, len(isbn13s), chunk_size):
+            rows = db.query(Book.isbn13, Book.isbn).filter(or_(
+                Book.isbn13.in_(isbn13s[offset:offset + chunk_size]),
+                Book.isbn.in_(isbns[offset:offset + chunk_size])
+            )).all()
+            for value13, raw in rows:
+                if value13:
+                    existing13.add(value13)
+                existing_raw.add(raw)
+        return existing13, existing_raw
 
-        output.seek(0)
-        return output
+    @classmethod
+    def export_books(
+        cls,
+        fields: Optional[List[str]] = None,
+        file_format: str = "xlsx",
+        category_id: Optional[int] = None,
+        status: Optional[str] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Iterator[bytes]:
+        """导出图书（服务端游标逐批读取，流式输出）"""
+        headers = cls.select_fields(cls.EXPORT_FIELDS, fields)
+        columns = {
+            header: (Category.name if field == "category_name" else getattr(Book, field)).label(header)
+            for header, field in cls.EXPORT_FIELDS.items()
+        }
+        stmt = select(*[columns[h] for h in headers]).select_from(Book).outerjoin(
+            Category, Book.category_id == Category.id
+        ).where(Book.is_active == True)
+        if category_id:
+            stmt = stmt.where(Book.category_id == category_id)
+        if status:
+            stmt = stmt.where(Book.status == status)
+        rows = cls._stream_rows(stmt.order_by(Book.id), progress=progress)
+        return cls._write(rows, headers, file_format, "图书列表")
 
     @classmethod
     def export_template(cls) -> io.BytesIO:
@@ -227,7 +430,7 @@ class ExcelService:
         # 添加示例Sheet
         example_data = []
         example_data.append({
-            "ISBN": "978-7-111-12345-6",
+            "ISBN": "978-7-5366-9293-0",
             "书名": "示例图书",
             "作者": "示例作者",
             "出版社": "示例出版社",
@@ -249,31 +452,109 @@ class ExcelService:
     @classmethod
     def export_borrow_records(
         cls,
-        records: List,
-        fields: Optional[List[str]] = None
-    ) -> io.BytesIO:
-        """导出借阅记录"""
-        data = []
-        for record in records:
-            row = {
-                "借阅ID": record.id,
-                "用户": record.user.username if record.user else "",
-                "图书": record.book.title if record.book else "",
-                "ISBN": record.book.isbn if record.book else "",
-                "借出日期": record.borrow_date.strftime("%Y-%m-%d") if record.borrow_date else "",
-                "应还日期": record.due_date.strftime("%Y-%m-%d") if record.due_date else "",
-                "归还日期": record.return_date.strftime("%Y-%m-%d") if record.return_date else "",
-                "状态": record.status,
-                "续借次数": record.renew_count,
-                "逾期天数": record.overdue_days,
-                "罚款金额": float(record.fine_amount) if record.fine_amount else 0,
-            }
-            data.append(row)
-
-        df = pd.DataFrame(data)
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="借阅记录")
+        fields: Optional[List[str]] = None,
+        file_format: str = "xlsx",
+        user_id: Optional[int] = None,
+        status: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Iterator[bytes]:
+        """导出借阅记录（服务端游标逐批读取，流式输出）"""
+        headers = cls.select_fields(cls.EXPORT_BORROW_FIELDS, fields)
+        joined = {
+            "user_name": User.username,
+            "book_title": Book.title,
+            "book_isbn": Book.isbn,
+        }
+        columns = {
+            header: (joined[field] if field in joined else getattr(BorrowRecord, field)).label(header)
+            for header, field in cls.EXPORT_BORROW_FIELDS.items()
+        }
+        stmt = select(*[columns[h] for h in headers]).select_from(BorrowRecord).outerjoin(
+            User, BorrowRecord.user_id == User.id
+        ).outerjoin(Book, BorrowRecord.book_id == Book.id)
+        if user_id:
+            stmt = stmt.where(BorrowRecord.user_id == user_id)
+        if status:
+            stmt = stmt.where(BorrowRecord.status == status)
+        if start_date:
+            stmt = stmt.where(BorrowRecord.borrow_date >= start_date)
+        if end_date:
+            stmt = stmt.where(BorrowRecord.borrow_date <= end_date)
+        rows = cls._stream_rows(stmt.order_by(BorrowRecord.id), date_only=True, progress=progress)
+        return cls._write(rows, headers, file_format, "借阅记录")
+
+    @staticmethod
+    def select_fields(available: Dict[str, str], fields: Optional[List[str]]) -> List[str]:
+        """校验导出字段，保持调用方给定的顺序"""
+        if not fields:
+            return list(available.keys())
+        unknown = [field for field in fields if field not in available]
+        if unknown:
+            raise ValueError(f"未知导出字段: {', '.join(unknown)}")
+        return fields
+
+    @staticmethod
+    def _stream_rows(
+        stmt,
+        date_only: bool = False,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Iterator[tuple]:
+        """使用服务端游标按批读取（MySQL下为SSCursor，不在客户端缓存整个结果集）
+
+        导出以流式响应返回，生成器会在请求依赖释放后继续执行，因此自行管理Session。
+        """
+        date_format = "%Y-%m-%d" if date_only else "%Y-%m-%d %H:%M:%S"
+        with SessionLocal() as db:
+            result = db.execute(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+            count = 0
+            for count, row in enumerate(result, start=1):
+                if progress is not None and count % settings.EXPORT_BATCH_SIZE == 0:
+                    progress({"rows": count})
+                yield tuple(
+                    float(value) if isinstance(value, Decimal)
+                    else value.strftime(date_format) if isinstance(value, datetime)
+                    else value
+                    for value in row
+                )
+        if progress is not None:
+            progress({"rows": count})
 
-        output.seek(0)
-        return output
+    @classmethod
+    def _write(cls, rows: Iterator[tuple], headers: List[str], file_format: str, sheet_name: str) -> Iterator[bytes]:
+        if file_format == "csv":
+            return cls._write_csv(rows, headers)
+        if file_format == "xlsx":
+            return cls._write_xlsx(rows, headers, sheet_name)
+        raise ValueError("仅支持xlsx和csv格式")
+
+    @staticmethod
+    def _write_csv(rows: Iterator[tuple], headers: List[str]) -> Iterator[bytes]:
+        """逐批生成CSV（带BOM，Excel可直接打开）"""
+        buffer = io.StringIO()
+        buffer.write("\ufeff")
+        writer = csv.writer(buffer)
+        writer.writerow(headers)
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if count % settings.EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _write_xlsx(rows: Iterator[tuple], headers: List[str], sheet_name: str) -> Iterator[bytes]:
+        """write-only模式写入临时文件（行数据随写随落盘），完成后分块输出"""
+        with tempfile.TemporaryFile() as output:
+            workbook = Workbook(write_only=True)
+            worksheet = workbook.create_sheet(sheet_name)
+            worksheet.append(headers)
+            for row in rows:
+                worksheet.append(row)
+            workbook.save(output)
+
+            output.seek(0)
+            while chunk := output.read(EXPORT_CHUNK_BYTES):
+                yield chunk
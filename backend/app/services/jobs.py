@@ -0,0 +1,365 @@
+"""后台任务服务（进程内线程池执行，任务记录持久化到MySQL）"""
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import threading
+import traceback
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, Set
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.book import Book
+from app.models.job import Job, JobStatus
+from app.services.excel import ExcelService
+from app.services.analytics import AnalyticsExportService
+from app.services.redis import RedisService
+from app.services.search import SearchService
+from app.services.search_cache import SearchCacheService
+from app.services.response_cache import ResponseCacheService
+from app.services.thumbnails import ThumbnailService
+
+
+class JobCancelled(Exception):
+    """任务被取消"""
+
+
+class JobContext:
+    """任务执行上下文：进度上报、取消检查、工作目录"""
+
+    def __init__(self, job_id: str, workdir: str):
+        self.job_id = job_id
+        self.workdir = workdir
+        self.progress: Dict[str, Any] = {}
+        self._last_flush = 0.0
+
+    def report(self, progress: Dict[str, Any], force: bool = False) -> None:
+        """上报进度并检查取消请求
+
+        写库按JOB_PROGRESS_INTERVAL节流（同时作为执行心跳），
+        同进程内的取消请求无需等待写库即可生效。
+        """
+        self.progress = dict(progress)
+        if self.job_id in JobService._cancelled:
+            raise JobCancelled()
+
+        now = time.monotonic()
+        if not force and now - self._last_flush < settings.JOB_PROGRESS_INTERVAL:
+            return
+        self._last_flush = now
+        # 进度写入失败不影响任务本身
+        try:
+            with SessionLocal() as db:
+                db.query(Job).filter(Job.id == self.job_id).update(
+                    {"progress": self.progress, "updated_at": datetime.utcnow()}
+                )
+                db.commit()
+                cancel_requested = db.query(Job.cancel_requested).filter(Job.id == self.job_id).scalar()
+        except Exception as e:
+            print(f"Job {self.job_id} progress warning: {e}")
+            return
+        if cancel_requested:
+            raise JobCancelled()
+
+
+class JobService:
+    """后台任务服务
+
+    任务提交后写入jobs表并放入本进程线程池；执行前以条件更新
+    (status=pending -> running) 抢占，多进程部署下同一任务只会执行一次。
+    进程重启后，排队中的任务重新入队，心跳超时的执行中任务标记为失败。
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _handlers: Dict[str, Callable[[JobContext, Dict[str, Any]], Optional[Dict[str, Any]]]] = {}
+    _cancelled: Set[str] = set()
+    _lock = threading.Lock()
+
+    @classmethod
+    def register(cls, job_type: str):
+        """注册任务处理函数（装饰器）"""
+        def decorator(func):
+            cls._handlers[job_type] = func
+            return func
+        return decorator
+
+    @classmethod
+    def get_executor(cls) -> ThreadPoolExecutor:
+        """获取任务线程池"""
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=settings.JOB_WORKERS, thread_name_prefix="job")
+            return cls._executor
+
+    @staticmethod
+    def workdir(job_id: str) -> str:
+        """任务工作目录（上传文件与结果文件）"""
+        return os.path.join(settings.JOB_DIR, job_id)
+
+    @classmethod
+    def run_async(cls, coro) -> Any:
+        """在工作线程中调用异步服务（在主事件循环上执行）"""
+        if cls._loop is None or cls._loop.is_closed():
+            coro.close()
+            return None
+        return asyncio.run_coroutine_threadsafe(coro, cls._loop).result(timeout=10)
+
+    @classmethod
+    def new_id(cls) -> str:
+        """生成任务ID"""
+        return uuid.uuid4().hex
+
+    @classmethod
+    def submit(
+        cls,
+        db: Session,
+        job_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None,
+        job_id: Optional[str] = None
+    ) -> Job:
+        """提交任务"""
+        if job_type not in cls._handlers:
+            raise ValueError(f"未知任务类型: {job_type}")
+
+        job = Job(
+            id=job_id or cls.new_id(),
+            job_type=job_type,
+            status=JobStatus.PENDING.value,
+            params=params or {},
+            created_by=user_id,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        cls.get_executor().submit(cls._run, job.id)
+        return job
+
+    @classmethod
+    def cancel(cls, db: Session, job: Job) -> Job:
+        """取消任务：排队中直接取消，执行中在下次上报进度时中止"""
+        now = datetime.utcnow()
+        cancelled = db.query(Job).filter(
+            Job.id == job.id, Job.status == JobStatus.PENDING.value
+        ).update({"status": JobStatus.CANCELLED.value, "cancel_requested": True, "finished_at": now})
+        if not cancelled:
+            db.query(Job).filter(
+                Job.id == job.id, Job.status == JobStatus.RUNNING.value
+            ).update({"cancel_requested": True})
+            cls._cancelled.add(job.id)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @classmethod
+    def _finish(cls, job_id: str, values: Dict[str, Any]) -> None:
+        values["finished_at"] = datetime.utcnow()
+        with SessionLocal() as db:
+            db.query(Job).filter(Job.id == job_id).update(values)
+            db.commit()
+
+    @classmethod
+    def _run(cls, job_id: str) -> None:
+        """执行任务（工作线程）"""
+        with SessionLocal() as db:
+            claimed = db.query(Job).filter(
+                Job.id == job_id, Job.status == JobStatus.PENDING.value
+            ).update({"status": JobStatus.RUNNING.value, "started_at": datetime.utcnow()})
+            db.commit()
+            if not claimed:
+                return
+            job = db.query(Job).filter(Job.id == job_id).first()
+            job_type, params = job.job_type, dict(job.params or {})
+
+        context = JobContext(job_id, cls.workdir(job_id))
+        os.makedirs(context.workdir, exist_ok=True)
+        try:
+            result = cls._handlers[job_type](context, params) or {}
+            cls._finish(job_id, {
+                "status": JobStatus.SUCCEEDED.value,
+                "progress": context.progress,
+                "result_file": result.pop("result_file", None),
+                "result": result,
+            })
+        except JobCancelled:
+            cls._finish(job_id, {"status": JobStatus.CANCELLED.value, "progress": context.progress})
+        except Exception as e:
+            print(f"Job {job_id} ({job_type}) failed: {e}")
+            traceback.print_exc()
+            cls._finish(job_id, {
+                "status": JobStatus.FAILED.value,
+                "progress": context.progress,
+                "error": str(e)[:1000] or e.__class__.__name__,
+            })
+        finally:
+            cls._cancelled.discard(job_id)
+
+    @classmethod
+    def recover(cls) -> Dict[str, int]:
+        """启动恢复：心跳超时的执行中任务标记失败，排队中的任务重新入队，清理过期结果文件"""
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+        with SessionLocal() as db:
+            failed = db.query(Job).filter(
+                Job.status == JobStatus.RUNNING.value, Job.updated_at < stale_before
+            ).update({
+                "status": JobStatus.FAILED.value,
+                "error": "任务中断（服务重启）",
+                "finished_at": datetime.utcnow(),
+            })
+            db.commit()
+            pending = [job_id for (job_id,) in db.query(Job.id).filter(Job.status == JobStatus.PENDING.value)]
+
+        for job_id in pending:
+            cls.get_executor().submit(cls._run, job_id)
+
+        removed = 0
+        if os.path.isdir(settings.JOB_DIR):
+            expire_before = time.time() - settings.JOB_RESULT_TTL_HOURS * 3600
+            for name in os.listdir(settings.JOB_DIR):
+                path = os.path.join(settings.JOB_DIR, name)
+                if os.path.isdir(path) and os.path.getmtime(path) < expire_before:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+        return {"failed": failed, "requeued": len(pending), "removed": removed}
+
+    @classmethod
+    def start(cls) -> Dict[str, int]:
+        """启动任务服务（需在事件循环中调用）"""
+        cls._loop = asyncio.get_running_loop()
+        os.makedirs(settings.JOB_DIR, exist_ok=True)
+        return cls.recover()
+
+    @classmethod
+    def stop(cls) -> None:
+        """停止任务服务：不再执行排队任务，执行中的任务由下次启动时按心跳超时处理"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+        cls._loop = None
+
+
+# ==================== 任务处理函数 ====================
+
+@JobService.register("import_books")
+def import_books_job(context: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    """导入图书"""
+    path = os.path.join(context.workdir, params["input_file"])
+    with open(path, "rb") as f, SessionLocal() as db:
+        result = ExcelService.import_file(
+            f, params["input_file"], db, params.get("category_id"), progress=context.report
+        )
+    os.remove(path)
+
+    if result["success_count"]:
+        JobService.run_async(RedisService.delete_pattern("books:*"))
+        JobService.run_async(ResponseCacheService.invalidate("books"))
+        JobService.run_async(SearchCacheService.bump_version())
+    return result
+
+
+def _export_to_file(context: JobContext, content, file_format: str) -> Dict[str, Any]:
+    path = os.path.join(context.workdir, f"result.{file_format}")
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in content:
+            f.write(chunk)
+            size += len(chunk)
+    return {"rows": context.progress.get("rows", 0), "size": size, "result_file": path}
+
+
+@JobService.register("export_books")
+def export_books_job(context: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    """导出图书"""
+    file_format = params.get("format", "xlsx")
+    content = ExcelService.export_books(
+        params.get("fields"), file_format, params.get("category_id"), params.get("status"),
+        progress=context.report
+    )
+    return _export_to_file(context, content, file_format)
+
+
+@JobService.register("export_borrows")
+def export_borrows_job(context: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    """导出借阅记录"""
+    file_format = params.get("format", "xlsx")
+    start_date = params.get("start_date")
+    end_date = params.get("end_date")
+    content = ExcelService.export_borrow_records(
+        params.get("fields"), file_format, params.get("user_id"), params.get("status"),
+        datetime.fromisoformat(start_date) if start_date else None,
+        datetime.fromisoformat(end_date) if end_date else None,
+        progress=context.report
+    )
+    return _export_to_file(context, content, file_format)
+
+
+@JobService.register("analytics_books")
+def analytics_books_job(context: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    """导出图书目录（Parquet/Arrow）"""
+    file_format = params.get("format", "parquet")
+    path = os.path.join(context.workdir, f"result.{file_format}")
+    result = AnalyticsExportService.export_books(
+        path, file_format, params.get("category_id"), params.get("status"), progress=context.report
+    )
+    return {"rows": context.progress.get("rows", 0), "size": os.path.getsize(path), "result_file": path, **result}
+
+
+@JobService.register("analytics_borrows")
+def analytics_borrows_job(context: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    """导出借阅历史（Parquet/Arrow，按月分区，打包为zip）"""
+    start_date = params.get("start_date")
+    end_date = params.get("end_date")
+    dataset_dir = os.path.join(context.workdir, "borrow_records")
+    result = AnalyticsExportService.export_borrow_records(
+        dataset_dir, params.get("format", "parquet"), params.get("user_id"), params.get("status"),
+        datetime.fromisoformat(start_date) if start_date else None,
+        datetime.fromisoformat(end_date) if end_date else None,
+        progress=context.report
+    )
+    path = os.path.join(context.workdir, "result.zip")
+    size = AnalyticsExportService.zip_dir(dataset_dir, path)
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    return {"rows": context.progress.get("rows", 0), "size": size, "result_file": path, **result}
+
+
+@JobService.register("reindex")
+def reindex_job(context: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    """重建搜索索引（Elasticsearch与内嵌索引）"""
+    batch_size = settings.IMPORT_CHUNK_SIZE
+    with SessionLocal() as db:
+        total = db.query(Book).filter(Book.is_active == True).count()
+        query = db.query(Book).options(joinedload(Book.category)).filter(
+            Book.is_active == True
+        ).order_by(Book.id)
+
+        batch = []
+        indexed = 0
+        for book in query.yield_per(batch_size):
+            batch.append(book)
+            if len(batch) >= batch_size:
+                SearchService.bulk_index_books(batch, suggest=False)
+                indexed += len(batch)
+                batch = []
+                context.report({"rows": indexed, "total": total})
+        if batch:
+            SearchService.bulk_index_books(batch, suggest=False)
+            indexed += len(batch)
+        context.report({"rows": indexed, "total": total}, force=True)
+
+    if SearchService.embedded_enabled():
+        SearchService.rebuild_embedded_suggest()
+        SearchService.save_embedded_snapshot()
+    return {"indexed": indexed}
+
+
+@JobService.register("cover_thumbnails")
+def cover_thumbnails_job(context: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    """为已有封面补齐缩略图"""
+    return ThumbnailService.backfill(force=bool(params.get("force")), progress=context.report)
@@ -0,0 +1,93 @@
+"""进程内指标服务（计数器与延迟直方图）"""
+import bisect
+import threading
+from collections import deque
+from typing import Dict, Optional, Any
+
+
+class LatencyHistogram:
+    """延迟直方图：固定分桶计数 + 最近样本用于分位数估计"""
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self, sample_size: int = 1000):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.samples = deque(maxlen=sample_size)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        """记录一次耗时（毫秒）"""
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, value_ms)] += 1
+        self.samples.append(value_ms)
+        self.count += 1
+        self.total_ms += value_ms
+
+    def percentile(self, q: float) -> Optional[float]:
+        """最近样本的分位数，无样本时返回None"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(int(q * len(ordered)), len(ordered) - 1)
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出统计"""
+        buckets = {}
+        for bound, count in zip(self.BUCKETS_MS, self.counts):
+            buckets[f"le_{bound}ms"] = count
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": buckets,
+        }
+
+
+class MetricsService:
+    """指标服务"""
+
+    _counters: Dict[str, int] = {}
+    _histograms: Dict[str, LatencyHistogram] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def incr(cls, name: str, amount: int = 1) -> None:
+        """计数器递增"""
+        with cls._lock:
+            cls._counters[name] = cls._counters.get(name, 0) + amount
+
+    @classmethod
+    def get_counter(cls, name: str) -> int:
+        """获取计数器"""
+        return cls._counters.get(name, 0)
+
+    @classmethod
+    def observe(cls, name: str, value_ms: float) -> None:
+        """记录耗时"""
+        with cls._lock:
+            histogram = cls._histograms.get(name)
+            if histogram is None:
+                histogram = cls._histograms[name] = LatencyHistogram()
+            histogram.observe(value_ms)
+
+    @classmethod
+    def percentile(cls, name: str, q: float) -> Optional[float]:
+        """获取耗时分位数"""
+        with cls._lock:
+            histogram = cls._histograms.get(name)
+            return histogram.percentile(q) if histogram else None
+
+    @classmethod
+    def snapshot(cls, prefix: str = "") -> Dict[str, Any]:
+        """导出指定前缀的全部指标"""
+        with cls._lock:
+            return {
+                "counters": {k: v for k, v in cls._counters.items() if k.startswith(prefix)},
+                "histograms": {
+                    k: h.snapshot() for k, h in cls._histograms.items() if k.startswith(prefix)
+                },
+            }
@@ -0,0 +1,108 @@
+"""密码哈希服务（bcrypt计算放入独立线程池，避免阻塞事件循环）"""
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any
+
+import bcrypt
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.metrics import MetricsService
+
+
+class PasswordService:
+    """密码哈希服务
+
+    bcrypt运算在大小固定的线程池中执行（bcrypt释放GIL，可并行），
+    排队任务超过PASSWORD_QUEUE_LIMIT时直接返回503，防止登录洪峰
+    堆积占满内存和拖慢其他接口。
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _pending = 0
+    _running = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_executor(cls) -> ThreadPoolExecutor:
+        """获取哈希线程池"""
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="bcrypt"
+            )
+        return cls._executor
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """线程池状态"""
+        return {
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "queue_limit": settings.PASSWORD_QUEUE_LIMIT,
+            "pending": cls._pending,
+            "running": cls._running,
+        }
+
+    @classmethod
+    async def _run(cls, name: str, func, *args):
+        with cls._lock:
+            if cls._pending >= settings.PASSWORD_QUEUE_LIMIT:
+                MetricsService.incr("password.rejected")
+                raise HTTPException(status_code=503, detail="服务繁忙，请稍后重试")
+            cls._pending += 1
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with cls._lock:
+                cls._running += 1
+            try:
+                return func(*args)
+            finally:
+                with cls._lock:
+                    cls._running -= 1
+                MetricsService.observe("password.queue_wait", (started - submitted) * 1000)
+                MetricsService.observe(f"password.{name}", (time.perf_counter() - started) * 1000)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(cls.get_executor(), task)
+        finally:
+            with cls._lock:
+                cls._pending -= 1
+
+    @staticmethod
+    def hash_sync(password: str) -> str:
+        """同步计算哈希"""
+        salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    @staticmethod
+    def verify_sync(plain_password: str, hashed_password: str) -> bool:
+        """同步校验密码"""
+        return bcrypt.checkpw(
+            plain_password.encode('utf-8'),
+            hashed_password.encode('utf-8')
+        )
+
+    @classmethod
+    async def hash(cls, password: str) -> str:
+        """计算密码哈希"""
+        return await cls._run("hash", cls.hash_sync, password)
+
+    @classmethod
+    async def verify(cls, plain_password: str, hashed_password: str) -> bool:
+        """校验密码"""
+        return await cls._run("verify", cls.verify_sync, plain_password, hashed_password)
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        """哈希强度与当前配置不一致时需要重新哈希"""
+        try:
+            rounds = int(hashed_password.split("$")[2])
+        except (IndexError, ValueError):
+            return True
+        return rounds != settings.BCRYPT_ROUNDS
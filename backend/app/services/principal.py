@@ -0,0 +1,71 @@
+"""用户主体缓存服务"""
+import time
+import threading
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.user import User
+from app.schemas.user import UserPrincipal
+from app.services.redis import RedisService
+from app.utils.constants import CACHE_KEY_USER
+
+
+class PrincipalService:
+    """用户主体缓存
+
+    查找顺序：进程内缓存(短TTL) -> Redis `user:{id}` -> MySQL。
+    用户信息、状态、角色、密码变更或删除时调用invalidate；
+    其他工作进程的本地缓存最多在PRINCIPAL_CACHE_TTL秒后失效。
+    """
+
+    _local: Dict[int, Tuple[UserPrincipal, float]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_local(cls, user_id: int) -> Optional[UserPrincipal]:
+        with cls._lock:
+            cached = cls._local.get(user_id)
+            if cached is None:
+                return None
+            if cached[1] <= time.monotonic():
+                del cls._local[user_id]
+                return None
+            return cached[0]
+
+    @classmethod
+    def _set_local(cls, principal: UserPrincipal) -> None:
+        if settings.PRINCIPAL_CACHE_TTL <= 0:
+            return
+        with cls._lock:
+            cls._local[principal.id] = (principal, time.monotonic() + settings.PRINCIPAL_CACHE_TTL)
+
+    @classmethod
+    async def get(cls, user_id: int, db: Session) -> Optional[UserPrincipal]:
+        """获取用户主体，用户不存在时返回None"""
+        principal = cls._get_local(user_id)
+        if principal is not None:
+            return principal
+
+        cache_key = f"{CACHE_KEY_USER}{user_id}"
+        cached_data = await RedisService.get(cache_key)
+        if cached_data:
+            principal = UserPrincipal.model_validate(cached_data)
+            cls._set_local(principal)
+            return principal
+
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            return None
+        principal = UserPrincipal.model_validate(user)
+        cls._set_local(principal)
+        await RedisService.set(cache_key, principal.model_dump(mode="json"), expire=settings.PRINCIPAL_REDIS_TTL)
+        return principal
+
+    @classmethod
+    async def invalidate(cls, user_id: int) -> None:
+        """使用户主体缓存失效"""
+        with cls._lock:
+            cls._local.pop(user_id, None)
+        await RedisService.delete(f"{CACHE_KEY_USER}{user_id}")
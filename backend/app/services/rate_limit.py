@@ -0,0 +1,136 @@
+"""限流服务（令牌桶，Redis Lua原子执行，Redis不可用时退化为进程内限流）"""
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.redis import RedisService
+from app.services.metrics import MetricsService
+from app.utils.constants import CACHE_KEY_RATE_LIMIT
+
+# 令牌桶脚本：KEYS[1]=桶Key，ARGV[1]=每秒补充令牌数，ARGV[2]=桶容量
+# 返回 {是否放行, 需等待秒数}，时间取Redis服务器时间，多实例共享同一时钟
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry_after)}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """限流规则：period秒内最多limit次请求（令牌桶容量为limit）"""
+    limit: int
+    period: int
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.period
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """解析"次数/秒数"格式，如 10/60"""
+        limit, _, period = value.partition("/")
+        return cls(limit=int(limit), period=int(period or 1))
+
+
+class RateLimitService:
+    """限流服务
+
+    令牌桶状态保存在Redis中，检查与扣减在一个Lua脚本内原子完成，
+    每次检查只有一次网络往返。Redis出错后在RATE_LIMIT_REDIS_RETRY秒内
+    直接使用进程内令牌桶（仅对当前进程生效），避免每个请求都等待连接失败。
+    """
+
+    _script = None
+    _redis_retry_at = 0.0
+    _local_buckets: Dict[str, List[float]] = {}
+    _limits: Optional[Dict[str, RateLimit]] = None
+
+    @classmethod
+    def get_limits(cls) -> Dict[str, RateLimit]:
+        """各路由分组的限流规则"""
+        if cls._limits is None:
+            cls._limits = {
+                "auth": RateLimit.parse(settings.RATE_LIMIT_AUTH),
+                "write": RateLimit.parse(settings.RATE_LIMIT_WRITE),
+                "read": RateLimit.parse(settings.RATE_LIMIT_READ),
+            }
+        return cls._limits
+
+    @classmethod
+    async def _check_redis(cls, key: str, limit: RateLimit) -> Tuple[bool, float]:
+        if cls._script is None:
+            client = await RedisService.get_client()
+            cls._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        allowed, retry_after = await cls._script(keys=[key], args=[limit.rate, limit.limit])
+        return bool(int(allowed)), float(retry_after)
+
+    @classmethod
+    def _check_local(cls, key: str, limit: RateLimit) -> Tuple[bool, float]:
+        now = time.monotonic()
+        bucket = cls._local_buckets.get(key)
+        if bucket is None:
+            if len(cls._local_buckets) >= settings.RATE_LIMIT_LOCAL_MAX_KEYS:
+                cls._prune_local(now)
+            bucket = cls._local_buckets[key] = [float(limit.limit), now]
+        tokens = min(limit.limit, bucket[0] + (now - bucket[1]) * limit.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return True, 0.0
+        bucket[0] = tokens
+        return False, (1 - tokens) / limit.rate
+
+    @classmethod
+    def _prune_local(cls, now: float) -> None:
+        """清理已回满的令牌桶（回满后与新建桶等价）"""
+        limits = cls.get_limits()
+        for key, (tokens, ts) in list(cls._local_buckets.items()):
+            limit = limits.get(key.split(":", 1)[0])
+            if limit is None or tokens + (now - ts) * limit.rate >= limit.limit:
+                del cls._local_buckets[key]
+        # 仍然超限说明存在大量活跃Key，整体清空以限制内存
+        if len(cls._local_buckets) >= settings.RATE_LIMIT_LOCAL_MAX_KEYS:
+            cls._local_buckets.clear()
+
+    @classmethod
+    async def check(cls, group: str, identity: str) -> Tuple[bool, int]:
+        """检查并扣减令牌
+
+        Returns:
+            (是否放行, Retry-After秒数)
+        """
+        limit = cls.get_limits()[group]
+        key = f"{group}:{identity}"
+
+        if time.monotonic() >= cls._redis_retry_at:
+            try:
+                allowed, retry_after = await cls._check_redis(f"{CACHE_KEY_RATE_LIMIT}{key}", limit)
+            except Exception:
+                cls._redis_retry_at = time.monotonic() + settings.RATE_LIMIT_REDIS_RETRY
+                MetricsService.incr("rate_limit.redis_error")
+                allowed, retry_after = cls._check_local(key, limit)
+        else:
+            allowed, retry_after = cls._check_local(key, limit)
+
+        if not allowed:
+            MetricsService.incr(f"rate_limit.rejected.{group}")
+        return allowed, max(1, math.ceil(retry_after))
@@ -1,6 +1,6 @@
 """Redis缓存服务"""
 import json
-from typing import Optional, Any
+from typing import Optional, Any, List
 from datetime import timedelta
 import redis.asyncio as redis
 from app.config import settings
@@ -43,6 +43,16 @@ class RedisService:
         except Exception:
             return None
 
+    @classmethod
+    async def mget(cls, keys: List[str]) -> List[Optional[Any]]:
+        """批量获取缓存（一次往返），出错时返回空列表"""
+        try:
+            client = await cls.get_client()
+            values = await client.mget(keys)
+            return [json.loads(value) if value else None for value in values]
+        except Exception:
+            return []
+
     @classmethod
     async def set(
         cls,
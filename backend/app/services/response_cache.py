@@ -0,0 +1,54 @@
+"""整响应缓存服务（按标签版本号失效）"""
+import hashlib
+from typing import Optional, Any, Dict, List, Sequence
+
+from app.services.redis import RedisService
+from app.services.metrics import MetricsService
+from app.utils.constants import CACHE_KEY_RESPONSE, CACHE_KEY_RESPONSE_TAG
+
+
+class ResponseCacheService:
+    """整响应缓存
+
+    缓存的是完整HTTP响应（状态码、响应头、响应体），由ResponseCacheMiddleware读写。
+    每个缓存路由声明若干标签（如 books、book:{id}、categories），每个标签有一个版本号；
+    缓存Key包含请求特征与这些标签的当前版本号，写操作调用invalidate递增版本号，
+    相关缓存全部失效（O(1)），旧版本的Key依靠TTL自然过期。
+    版本号在执行请求前读取，请求执行期间发生的写操作只会让本次结果写入旧版本Key，不会被读到。
+    """
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{CACHE_KEY_RESPONSE_TAG}{tag}"
+
+    @classmethod
+    async def tag_versions(cls, tags: Sequence[str]) -> Optional[List[int]]:
+        """读取各标签当前版本号（一次往返），Redis不可用时返回None"""
+        values = await RedisService.mget([cls._tag_key(tag) for tag in tags])
+        if len(values) != len(tags):
+            return None
+        return [int(value) if value else 0 for value in values]
+
+    @staticmethod
+    def make_key(method: str, path: str, query: str, role: str, versions: Sequence[int]) -> str:
+        """生成缓存Key"""
+        raw = f"{method}|{path}|{query}|{role}|{'.'.join(map(str, versions))}"
+        return f"{CACHE_KEY_RESPONSE}{hashlib.md5(raw.encode('utf-8')).hexdigest()}"
+
+    @classmethod
+    async def get(cls, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的响应并记录命中情况"""
+        entry = await RedisService.get(key)
+        MetricsService.incr("response_cache.miss" if entry is None else "response_cache.hit")
+        return entry
+
+    @classmethod
+    async def set(cls, key: str, entry: Dict[str, Any], ttl: int) -> bool:
+        """写入缓存的响应"""
+        return await RedisService.set(key, entry, expire=ttl)
+
+    @classmethod
+    async def invalidate(cls, *tags: str) -> None:
+        """递增标签版本号，使带这些标签的缓存响应失效（写操作后调用）"""
+        for tag in tags:
+            await RedisService.incr(cls._tag_key(tag))
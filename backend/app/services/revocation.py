@@ -0,0 +1,212 @@
+"""Token吊销服务（Redis吊销列表 + 进程内Bloom过滤器）"""
+import asyncio
+import hashlib
+import json
+import math
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+from app.schemas.common import TokenData
+from app.services.redis import RedisService
+from app.services.metrics import MetricsService
+from app.utils.constants import (
+    CACHE_KEY_REVOKED_JTIS,
+    CACHE_KEY_REVOKED_USERS,
+    REVOCATION_CHANNEL,
+)
+
+
+class BloomFilter:
+    """Bloom过滤器（双重哈希生成k个位置）"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        """加入元素"""
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class TokenRevocationService:
+    """Token吊销服务
+
+    - 单个Token（按jti）：写入Redis有序集合`revoked:jtis`，score为Token过期时间，
+      过期后随清理移除；本进程同时加入Bloom过滤器
+    - 用户全部会话：`revoked:users`哈希记录吊销时间点，签发时间早于该时间点的Token失效
+    变更通过pub/sub广播到各工作进程，并定期从Redis全量重建以清除过期项、
+    补齐断线期间遗漏的消息。Bloom未命中（绝大多数请求）时无需访问Redis；
+    命中时再到Redis确认，Redis不可用时按已吊销处理。
+    """
+
+    _bloom: Optional[BloomFilter] = None
+    _user_cutoffs: Dict[int, float] = {}
+    _listener: Optional[asyncio.Task] = None
+
+    @classmethod
+    def _new_bloom(cls, expected: int = 0) -> BloomFilter:
+        return BloomFilter(
+            max(settings.REVOCATION_BLOOM_CAPACITY, expected * 2),
+            settings.REVOCATION_BLOOM_ERROR_RATE
+        )
+
+    @classmethod
+    def get_bloom(cls) -> BloomFilter:
+        """获取Bloom过滤器"""
+        if cls._bloom is None:
+            cls._bloom = cls._new_bloom()
+        return cls._bloom
+
+    @classmethod
+    def _apply(cls, message: Dict) -> None:
+        """应用一条吊销消息到本进程"""
+        if message.get("type") == "jti":
+            cls.get_bloom().add(message["jti"])
+        elif message.get("type") == "user":
+            user_id = int(message["user_id"])
+            cls._user_cutoffs[user_id] = max(cls._user_cutoffs.get(user_id, 0.0), float(message["before"]))
+
+    @classmethod
+    async def _publish(cls, message: Dict) -> None:
+        cls._apply(message)
+        try:
+            client = await RedisService.get_client()
+            await client.publish(REVOCATION_CHANNEL, json.dumps(message))
+        except Exception as e:
+            print(f"Token revocation publish warning: {e}")
+
+    @classmethod
+    async def revoke(cls, jti: str, exp: float) -> None:
+        """吊销单个Token"""
+        now = time.time()
+        if exp <= now:
+            return
+        try:
+            client = await RedisService.get_client()
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.zadd(CACHE_KEY_REVOKED_JTIS, {jti: exp})
+                pipe.zremrangebyscore(CACHE_KEY_REVOKED_JTIS, "-inf", now)
+                await pipe.execute()
+        except Exception as e:
+            print(f"Token revocation warning: {e}")
+        MetricsService.incr("revocation.jti")
+        await cls._publish({"type": "jti", "jti": jti})
+
+    @classmethod
+    async def revoke_user(cls, user_id: int) -> None:
+        """吊销用户的全部会话（此前签发的Token均失效）"""
+        before = time.time()
+        try:
+            client = await RedisService.get_client()
+            await client.hset(CACHE_KEY_REVOKED_USERS, str(user_id), before)
+        except Exception as e:
+            print(f"Token revocation warning: {e}")
+        MetricsService.incr("revocation.user")
+        await cls._publish({"type": "user", "user_id": user_id, "before": before})
+
+    @classmethod
+    async def is_revoked(cls, token_data: TokenData) -> bool:
+        """检查Token是否已吊销"""
+        cutoff = cls._user_cutoffs.get(token_data.user_id)
+        if cutoff is not None and (token_data.iat is None or token_data.iat < cutoff):
+            return True
+
+        if token_data.jti is None or token_data.jti not in cls.get_bloom():
+            return False
+
+        # Bloom命中（可能误判），到Redis确认
+        MetricsService.incr("revocation.bloom_hit")
+        try:
+            client = await RedisService.get_client()
+            exp = await client.zscore(CACHE_KEY_REVOKED_JTIS, token_data.jti)
+        except Exception:
+            return True
+        if exp is None:
+            MetricsService.incr("revocation.bloom_false_positive")
+        return exp is not None
+
+    @classmethod
+    async def load(cls) -> int:
+        """从Redis全量重建本地状态，返回已吊销的Token数量"""
+        now = time.time()
+        client = await RedisService.get_client()
+        await client.zremrangebyscore(CACHE_KEY_REVOKED_JTIS, "-inf", now)
+        jtis = await client.zrangebyscore(CACHE_KEY_REVOKED_JTIS, now, "+inf")
+        users = await client.hgetall(CACHE_KEY_REVOKED_USERS)
+
+        bloom = cls._new_bloom(len(jtis))
+        for jti in jtis:
+            bloom.add(jti)
+
+        # 超过Token有效期的用户吊销记录已无意义
+        oldest = now - settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        cutoffs = {}
+        expired = []
+        for user_id, before in users.items():
+            if float(before) > oldest:
+                cutoffs[int(user_id)] = float(before)
+            else:
+                expired.append(user_id)
+        if expired:
+            await client.hdel(CACHE_KEY_REVOKED_USERS, *expired)
+
+        cls._bloom = bloom
+        cls._user_cutoffs = cutoffs
+        return len(jtis)
+
+    @classmethod
+    async def _listen(cls) -> None:
+        """订阅吊销消息，断线后重连并全量重建"""
+        while True:
+            try:
+                client = await RedisService.get_client()
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(REVOCATION_CHANNEL)
+                    await cls.load()
+                    next_refresh = time.monotonic() + settings.REVOCATION_REFRESH_SECONDS
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            cls._apply(json.loads(message["data"]))
+                        if time.monotonic() >= next_refresh:
+                            await cls.load()
+                            next_refresh = time.monotonic() + settings.REVOCATION_REFRESH_SECONDS
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                MetricsService.incr("revocation.listener_error")
+                await asyncio.sleep(settings.REVOCATION_RETRY_SECONDS)
+
+    @classmethod
+    def start(cls) -> None:
+        """启动吊销消息订阅"""
+        if cls._listener is None:
+            cls._listener = asyncio.create_task(cls._listen())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """停止吊销消息订阅"""
+        if cls._listener is not None:
+            cls._listener.cancel()
+            try:
+                await cls._listener
+            except asyncio.CancelledError:
+                pass
+            cls._listener = None
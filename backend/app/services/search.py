@@ -1,13 +1,37 @@
 """Elasticsearch搜索服务"""
+import asyncio
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from elasticsearch import Elasticsearch
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
+
 from app.config import settings
+from app.database import get_db_context
+from app.services.embedded_search import EmbeddedSearchEngine
+from app.services.metrics import MetricsService
 
 
 class SearchService:
-    """Elasticsearch搜索服务"""
+    """搜索服务
+
+    默认使用Elasticsearch；SEARCH_BACKEND=embedded时使用内嵌引擎，
+    EMBEDDED_SEARCH_ENABLED时同步维护内嵌索引，ES不可用时自动降级。
+    内嵌索引每个worker各一份，其他worker的写入由后台任务按updated_at定期追平。
+    """
 
     _client: Optional[Elasticsearch] = None
+    _embedded: Optional[EmbeddedSearchEngine] = None
+    _sync_task: Optional[asyncio.Task] = None
+
+    # 搜索建议补全字段
+    SUGGEST_MAPPING = {
+        "type": "completion",
+        "analyzer": "simple",
+        "preserve_separators": True,
+        "preserve_position_increments": True,
+        "max_input_length": 50
+    }
 
     @classmethod
     def get_client(cls) -> Elasticsearch:
@@ -19,9 +43,141 @@ class SearchService:
             )
         return cls._client
 
+    @classmethod
+    def get_embedded(cls) -> EmbeddedSearchEngine:
+        """获取内嵌搜索引擎"""
+        if cls._embedded is None:
+            cls._embedded = EmbeddedSearchEngine()
+        return cls._embedded
+
+    @classmethod
+    def use_embedded(cls) -> bool:
+        """是否以内嵌引擎作为主搜索后端"""
+        return settings.SEARCH_BACKEND == "embedded"
+
+    @classmethod
+    def embedded_enabled(cls) -> bool:
+        """是否维护内嵌索引"""
+        return cls.use_embedded() or settings.EMBEDDED_SEARCH_ENABLED
+
+    @classmethod
+    def load_embedded(cls, db: Session, batch_size: int = 1000) -> int:
+        """加载内嵌索引：先读快照，再按updated_at增量追平，最后一次性重建建议键"""
+        engine = cls.get_embedded()
+        try:
+            engine.load_snapshot(settings.EMBEDDED_SEARCH_SNAPSHOT)
+        except Exception as e:
+            print(f"Embedded search snapshot warning: {e}")
+            engine.clear()
+
+        started_at = datetime.utcnow()
+        count = cls._apply_embedded_changes(db, engine.synced_at, False, batch_size)
+        engine.rebuild_suggest()
+        engine.synced_at = started_at
+        if count:
+            cls.save_embedded_snapshot()
+        return count
+
+    @classmethod
+    def sync_embedded(cls, db: Session, batch_size: int = 1000) -> int:
+        """按updated_at追平内嵌索引（其他worker的写入），返回处理的图书数
+
+        起点回退EMBEDDED_SEARCH_SYNC_OVERLAP_SECONDS：updated_at在事务内生成，
+        提交晚于上次查询的写入仍能被下次覆盖；重复索引同一文档是幂等的。
+        """
+        engine = cls.get_embedded()
+        if engine.synced_at is None:
+            return 0
+        started_at = datetime.utcnow()
+        since = engine.synced_at - timedelta(seconds=settings.EMBEDDED_SEARCH_SYNC_OVERLAP_SECONDS)
+        count = cls._apply_embedded_changes(db, since, True, batch_size)
+        engine.synced_at = started_at
+        return count
+
+    @classmethod
+    def _apply_embedded_changes(
+        cls,
+        db: Session,
+        since: Optional[datetime],
+        suggest: bool,
+        batch_size: int
+    ) -> int:
+        """将since之后更新的图书写入内嵌索引（已下架的删除），since为空时全量加载"""
+        from app.models.book import Book
+
+        engine = cls.get_embedded()
+        query = db.query(Book).options(joinedload(Book.category))
+        if since is not None:
+            query = query.filter(Book.updated_at >= since)
+        else:
+            query = query.filter(Book.is_active == True)
+
+        count = 0
+        docs = []
+        for book in query.yield_per(batch_size):
+            if book.is_active:
+                docs.append(cls.build_doc(book))
+            else:
+                engine.delete_doc(book.id)
+            count += 1
+            if len(docs) >= batch_size:
+                engine.bulk_index(docs, suggest=suggest)
+                docs = []
+        if docs:
+            engine.bulk_index(docs, suggest=suggest)
+        return count
+
+    @classmethod
+    def _sync_embedded_once(cls) -> int:
+        with get_db_context() as db:
+            return cls.sync_embedded(db)
+
+    @classmethod
+    async def _sync_loop(cls) -> None:
+        """定期追平内嵌索引"""
+        while True:
+            await asyncio.sleep(settings.EMBEDDED_SEARCH_SYNC_SECONDS)
+            try:
+                count = await run_in_threadpool(cls._sync_embedded_once)
+                MetricsService.incr("search.embedded_sync.rows", count)
+            except Exception as e:
+                MetricsService.incr("search.embedded_sync.error")
+                print(f"Embedded search sync warning: {e}")
+
+    @classmethod
+    def start_embedded_sync(cls) -> None:
+        """启动内嵌索引追平任务"""
+        if cls._sync_task is None and cls.embedded_enabled() and settings.EMBEDDED_SEARCH_SYNC_SECONDS > 0:
+            cls._sync_task = asyncio.create_task(cls._sync_loop())
+
+    @classmethod
+    async def stop_embedded_sync(cls) -> None:
+        """停止内嵌索引追平任务"""
+        if cls._sync_task is not None:
+            cls._sync_task.cancel()
+            try:
+                await cls._sync_task
+            except asyncio.CancelledError:
+                pass
+            cls._sync_task = None
+
+    @classmethod
+    def rebuild_embedded_suggest(cls) -> None:
+        """重建内嵌索引的建议键"""
+        if cls._embedded is not None:
+            cls._embedded.rebuild_suggest()
+
+    @classmethod
+    def save_embedded_snapshot(cls) -> None:
+        """保存内嵌索引快照"""
+        if cls._embedded is not None:
+            cls._embedded.save_snapshot(settings.EMBEDDED_SEARCH_SNAPSHOT)
+
     @classmethod
     def init_index(cls) -> None:
         """初始化索引"""
+        if cls.use_embedded():
+            return
         client = cls.get_client()
         if not client.indices.exists(index=settings.ES_INDEX):
             mapping = {
@@ -29,6 +185,7 @@ class SearchService:
                     "properties": {
                         "id": {"type": "integer"},
                         "isbn": {"type": "keyword"},
+                        "isbn13": {"type": "keyword"},
                         "title": {
                             "type": "text",
                             "analyzer": "ik_max_word",
@@ -51,7 +208,8 @@ class SearchService:
                         "status": {"type": "keyword"},
                         "available_stock": {"type": "integer"},
                         "borrow_count": {"type": "integer"},
-                        "created_at": {"type": "date"}
+                        "created_at": {"type": "date"},
+                        "suggest": cls.SUGGEST_MAPPING
                     }
                 },
                 "settings": {
@@ -72,14 +230,24 @@ class SearchService:
                 }
             }
             client.indices.create(index=settings.ES_INDEX, body=mapping)
+        else:
+            # 已有索引补充补全字段（需重建索引后生效）
+            current = client.indices.get_mapping(index=settings.ES_INDEX)
+            properties = current[settings.ES_INDEX]["mappings"].get("properties", {})
+            if "suggest" not in properties:
+                client.indices.put_mapping(
+                    index=settings.ES_INDEX,
+                    body={"properties": {"suggest": cls.SUGGEST_MAPPING}}
+                )
 
     @classmethod
-    def index_book(cls, book) -> None:
-        """索引图书"""
-        client = cls.get_client()
-        doc = {
+    def build_doc(cls, book) -> Dict[str, Any]:
+        """构建索引文档"""
+        suggest_input = [v for v in (book.title, book.author) if v]
+        return {
             "id": book.id,
             "isbn": book.isbn,
+            "isbn13": book.isbn13,
             "title": book.title,
             "author": book.author,
             "publisher": book.publisher,
@@ -90,12 +258,38 @@ class SearchService:
             "available_stock": book.available_stock,
             "borrow_count": book.borrow_count,
             "created_at": book.created_at.isoformat() if book.created_at else None,
+            # 补全字段：书名与作者，按借阅次数加权
+            "suggest": {
+                "input": suggest_input,
+                "weight": max(int(book.borrow_count or 0), 0),
+            },
         }
-        client.index(index=settings.ES_INDEX, id=str(book.id), body=doc)
+
+    @classmethod
+    def index_book(cls, book) -> None:
+        """索引图书"""
+        doc = cls.build_doc(book)
+        if cls.embedded_enabled():
+            cls.get_embedded().index_doc(doc)
+        if cls.use_embedded():
+            return
+
+        client = cls.get_client()
+        try:
+            client.index(index=settings.ES_INDEX, id=str(book.id), body=doc)
+        except Exception as e:
+            if not cls.embedded_enabled():
+                raise
+            print(f"Elasticsearch index warning: {e}")
 
     @classmethod
     def delete_book(cls, book_id: int) -> None:
         """删除图书索引"""
+        if cls.embedded_enabled():
+            cls.get_embedded().delete_doc(book_id)
+        if cls.use_embedded():
+            return
+
         client = cls.get_client()
         try:
             client.delete(index=settings.ES_INDEX, id=str(book_id))
@@ -103,33 +297,33 @@ class SearchService:
             pass
 
     @classmethod
-    def bulk_index_books(cls, books: List) -> None:
-        """批量索引图书"""
+    def bulk_index_books(cls, books: List, suggest: bool = True) -> None:
+        """批量索引图书
+
+        suggest为False时内嵌索引不维护建议键（全量重建时使用，结束后调用rebuild_embedded_suggest）。
+        """
         if not books:
             return
 
+        docs = [cls.build_doc(book) for book in books]
+        if cls.embedded_enabled():
+            cls.get_embedded().bulk_index(docs, suggest=suggest)
+        if cls.use_embedded():
+            return
+
         client = cls.get_client()
         actions = []
-        for book in books:
-            doc = {
-                "id": book.id,
-                "isbn": book.isbn,
-                "title": book.title,
-                "author": book.author,
-                "publisher": book.publisher,
-                "category_id": book.category_id,
-                "category_name": book.category.name if book.category else None,
-                "summary": book.summary,
-                "status": book.status,
-                "available_stock": book.available_stock,
-                "borrow_count": book.borrow_count,
-                "created_at": book.created_at.isoformat() if book.created_at else None,
-            }
-            actions.append({"index": {"_index": settings.ES_INDEX, "_id": str(book.id)}})
+        for doc in docs:
+            actions.append({"index": {"_index": settings.ES_INDEX, "_id": str(doc["id"])}})
             actions.append(doc)
 
         if actions:
-            client.bulk(body=actions)
+            try:
+                client.bulk(body=actions)
+            except Exception as e:
+                if not cls.embedded_enabled():
+                    raise
+                print(f"Elasticsearch bulk index warning: {e}")
 
     @classmethod
     def search(
@@ -138,10 +332,41 @@ class SearchService:
         category_id: Optional[int] = None,
         status: Optional[str] = None,
         page: int = 1,
-        page_size: int = 10
+        page_size: int = 10,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """搜索图书（timeout为本次ES请求的超时秒数，默认ES_TIMEOUT）"""
+        if cls.use_embedded():
+            result = cls.get_embedded().search(keyword, category_id, status, page, page_size)
+            result["backend"] = "embedded"
+            return result
+
+        try:
+            result = cls._search_es(keyword, category_id, status, page, page_size, timeout)
+            result["backend"] = "elasticsearch"
+            return result
+        except Exception as e:
+            if not cls.embedded_enabled() or cls.get_embedded().size == 0:
+                raise
+            print(f"Elasticsearch search failed, using embedded engine: {e}")
+            result = cls.get_embedded().search(keyword, category_id, status, page, page_size)
+            result["backend"] = "embedded"
+            return result
+
+    @classmethod
+    def _search_es(
+        cls,
+        keyword: str,
+        category_id: Optional[int] = None,
+        status: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 10,
+        timeout: Optional[float] = None
     ) -> Dict[str, Any]:
-        """搜索图书"""
+        """Elasticsearch搜索"""
         client = cls.get_client()
+        if timeout is not None:
+            client = client.options(request_timeout=timeout)
 
         # 构建查询
         must = [
@@ -201,20 +426,42 @@ class SearchService:
 
     @classmethod
     def suggest(cls, prefix: str, limit: int = 10) -> List[str]:
-        """搜索建议"""
+        """搜索建议（completion suggester，按借阅次数排序）"""
+        if cls.use_embedded():
+            return cls.get_embedded().suggest(prefix, limit)
+
+        try:
+            return cls._suggest_es(prefix, limit)
+        except Exception:
+            if not cls.embedded_enabled() or cls.get_embedded().size == 0:
+                raise
+            return cls.get_embedded().suggest(prefix, limit)
+
+    @classmethod
+    def _suggest_es(cls, prefix: str, limit: int = 10) -> List[str]:
+        """Elasticsearch补全建议"""
         client = cls.get_client()
 
         query = {
-            "query": {
-                "multi_match": {
-                    "query": prefix,
-                    "fields": ["title", "author"],
-                    "type": "phrase_prefix"
+            "suggest": {
+                "title_suggest": {
+                    "prefix": prefix,
+                    "completion": {
+                        "field": "suggest",
+                        "size": limit,
+                        "skip_duplicates": True
+                    }
                 }
             },
-            "size": limit,
             "_source": ["title"]
         }
 
         result = client.search(index=settings.ES_INDEX, body=query)
-        return [hit["_source"]["title"] for hit in result["hits"]["hits"]]
+        options = result["suggest"]["title_suggest"][0]["options"]
+
+        titles = []
+        for option in options:
+            title = option["_source"].get("title")
+            if title and title not in titles:
+                titles.append(title)
+        return titles
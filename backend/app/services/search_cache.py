@@ -0,0 +1,91 @@
+"""搜索结果缓存服务（全局目录版本号失效）"""
+import hashlib
+from typing import Optional, Any, Dict
+
+from app.config import settings
+from app.services.redis import RedisService
+from app.services.metrics import MetricsService
+from app.utils.constants import CACHE_KEY_SEARCH, CACHE_KEY_SEARCH_VERSION
+
+
+class SearchCacheService:
+    """搜索结果缓存
+
+    缓存Key包含全局目录版本号，图书写操作只需递增版本号即可使全部
+    已缓存搜索结果失效（O(1)），旧版本的Key依靠TTL自然过期。
+    """
+
+    @staticmethod
+    def normalize_keyword(keyword: str) -> str:
+        """标准化关键词：去首尾空白、合并空白、转小写"""
+        return " ".join(keyword.split()).lower()
+
+    @staticmethod
+    def query_class(
+        category_id: Optional[int] = None,
+        status: Optional[str] = None,
+        page: int = 1
+    ) -> str:
+        """查询分类，用于统计各类查询的命中率"""
+        parts = ["keyword"]
+        if category_id:
+            parts.append("category")
+        if status:
+            parts.append("status")
+        name = "+".join(parts)
+        return f"{name}:first_page" if page == 1 else f"{name}:deep_page"
+
+    @classmethod
+    def make_key(
+        cls,
+        version: int,
+        keyword: str,
+        category_id: Optional[int] = None,
+        status: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 10
+    ) -> str:
+        """生成缓存Key"""
+        raw = f"{cls.normalize_keyword(keyword)}|{category_id or ''}|{status or ''}|{page}|{page_size}"
+        digest = hashlib.md5(raw.encode("utf-8")).hexdigest()
+        return f"{CACHE_KEY_SEARCH}v{version}:{digest}"
+
+    @classmethod
+    async def get_version(cls) -> int:
+        """获取当前目录版本号"""
+        version = await RedisService.get(CACHE_KEY_SEARCH_VERSION)
+        return int(version) if version else 0
+
+    @classmethod
+    async def bump_version(cls) -> int:
+        """递增目录版本号（图书写操作后调用）"""
+        return await RedisService.incr(CACHE_KEY_SEARCH_VERSION)
+
+    @classmethod
+    async def get(cls, key: str, query_class: str) -> Optional[Dict[str, Any]]:
+        """读取缓存并记录命中情况"""
+        data = await RedisService.get(key)
+        if data is None:
+            MetricsService.incr(f"search.cache.miss.{query_class}")
+        else:
+            MetricsService.incr(f"search.cache.hit.{query_class}")
+        return data
+
+    @classmethod
+    async def set(cls, key: str, value: Dict[str, Any]) -> bool:
+        """写入缓存"""
+        return await RedisService.set(key, value, expire=settings.SEARCH_CACHE_TTL)
+
+    @classmethod
+    def hit_rates(cls) -> Dict[str, Dict[str, Any]]:
+        """各查询分类的命中率"""
+        counters = MetricsService.snapshot("search.cache.")["counters"]
+        stats: Dict[str, Dict[str, Any]] = {}
+        for name, count in counters.items():
+            _, _, outcome, query_class = name.split(".", 3)
+            entry = stats.setdefault(query_class, {"hit": 0, "miss": 0})
+            entry[outcome] = count
+        for entry in stats.values():
+            total = entry["hit"] + entry["miss"]
+            entry["hit_rate"] = round(entry["hit"] / total, 4) if total else 0.0
+        return stats
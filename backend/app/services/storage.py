@@ -0,0 +1,125 @@
+"""封面文件存储服务（流式写入、按内容哈希去重）"""
+import os
+import uuid
+import hashlib
+from typing import Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+
+COVER_DIR = "covers"
+
+# 文件头签名 -> 规范扩展名
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+EXTENSION_ALIASES = {".jpeg": ".jpg"}
+
+
+def normalize_extension(ext: str) -> str:
+    """规范化扩展名（补齐点号、小写、jpeg统一为jpg）"""
+    ext = "." + ext.strip().lstrip(".").lower()
+    return EXTENSION_ALIASES.get(ext, ext)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """根据文件头识别图片类型，返回规范扩展名"""
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return None
+
+
+class CoverStorageService:
+    """封面存储服务
+
+    上传内容分块读取、边写临时文件边计算SHA-256，写完后以哈希命名
+    原子移动到 covers/<前2位>/<哈希>.<ext>；相同图片（如同一封面的不同版本图书）
+    只保存一份。类型按文件头识别，大小在读取过程中校验，超限立即中止。
+    """
+
+    @staticmethod
+    def cover_dir() -> str:
+        """封面根目录"""
+        return os.path.join(settings.UPLOAD_DIR, COVER_DIR)
+
+    @classmethod
+    def relative_path(cls, digest: str, ext: str) -> str:
+        """封面相对UPLOAD_DIR的路径"""
+        return f"{COVER_DIR}/{digest[:2]}/{digest}{ext}"
+
+    @staticmethod
+    def _unsupported() -> HTTPException:
+        return HTTPException(
+            status_code=400,
+            detail=f"仅支持以下图片格式: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+        )
+
+    @staticmethod
+    def _too_large() -> HTTPException:
+        return HTTPException(
+            status_code=413,
+            detail=f"文件大小不能超过{settings.MAX_COVER_SIZE // 1024 // 1024}MB"
+        )
+
+    @classmethod
+    async def _stream_to_temp(cls, file: UploadFile, temp_path: str) -> Tuple[str, str, int]:
+        """分块写入临时文件，返回 (哈希, 实际类型扩展名, 大小)"""
+        digest = hashlib.sha256()
+        size = 0
+        image_ext = None
+        async with aiofiles.open(temp_path, "wb") as out:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if image_ext is None:
+                    image_ext = sniff_image_type(chunk)
+                    if image_ext is None:
+                        raise HTTPException(status_code=400, detail="文件内容不是有效的图片")
+                size += len(chunk)
+                if size > settings.MAX_COVER_SIZE:
+                    raise cls._too_large()
+                digest.update(chunk)
+                await out.write(chunk)
+        if image_ext is None:
+            raise HTTPException(status_code=400, detail="文件内容为空")
+        return digest.hexdigest(), image_ext, size
+
+    @classmethod
+    async def save_cover(cls, file: UploadFile) -> str:
+        """保存封面，返回相对UPLOAD_DIR的路径
+
+        文件名扩展名与实际内容类型都需在ALLOWED_EXTENSIONS内，按实际类型保存。
+        """
+        allowed = {normalize_extension(ext) for ext in settings.ALLOWED_EXTENSIONS}
+        claimed_ext = os.path.splitext(file.filename or "")[1]
+        if not claimed_ext or normalize_extension(claimed_ext) not in allowed:
+            raise cls._unsupported()
+        if file.size is not None and file.size > settings.MAX_COVER_SIZE:
+            raise cls._too_large()
+
+        temp_dir = os.path.join(cls.cover_dir(), "tmp")
+        await aiofiles.os.makedirs(temp_dir, exist_ok=True)
+        temp_path = os.path.join(temp_dir, uuid.uuid4().hex)
+        try:
+            digest, image_ext, _ = await cls._stream_to_temp(file, temp_path)
+            if image_ext not in allowed:
+                raise cls._unsupported()
+
+            relative_path = cls.relative_path(digest, image_ext)
+            final_path = os.path.join(settings.UPLOAD_DIR, relative_path)
+            if await aiofiles.os.path.exists(final_path):
+                return relative_path
+            await aiofiles.os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            await aiofiles.os.replace(temp_path, final_path)
+            return relative_path
+        finally:
+            if await aiofiles.os.path.exists(temp_path):
+                await aiofiles.os.remove(temp_path)
@@ -0,0 +1,161 @@
+"""搜索建议服务（本地前缀树 + Elasticsearch补全）"""
+import time
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import get_db_context
+from app.models.book import Book
+from app.services.search import SearchService
+
+
+class _TrieNode:
+    """前缀树节点"""
+
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # 该前缀下热度最高的书名 [(borrow_count, title)]，按热度降序
+        self.top: List[Tuple[int, str]] = []
+
+
+class PrefixTrie:
+    """前缀树，每个节点预存Top-K结果，查询复杂度只与前缀长度相关"""
+
+    def __init__(self, top_k: int = 10):
+        self.top_k = top_k
+        self.root = _TrieNode()
+        self.size = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """标准化：去首尾空白并转小写"""
+        return text.strip().lower()
+
+    def insert(self, key: str, title: str, score: int) -> None:
+        """插入一个键（书名或作者），指向书名"""
+        key = self.normalize(key)
+        if not key:
+            return
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            self._push_top(node, title, score)
+        self.size += 1
+
+    def _push_top(self, node: _TrieNode, title: str, score: int) -> None:
+        """维护节点Top-K列表"""
+        for _, existing in node.top:
+            if existing == title:
+                return
+        if len(node.top) >= self.top_k and score <= node.top[-1][0]:
+            return
+        node.top.append((score, title))
+        node.top.sort(key=lambda item: -item[0])
+        del node.top[self.top_k:]
+
+    def search(self, prefix: str, limit: int = 10) -> Optional[List[str]]:
+        """查找前缀，前缀不存在时返回None"""
+        prefix = self.normalize(prefix)
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return [title for _, title in node.top[:limit]]
+
+
+class SuggestService:
+    """搜索建议服务
+
+    热门书名（按借阅次数Top-N）常驻本地前缀树，常见前缀无需访问ES；
+    本地结果不足时回退到ES completion suggester。
+    """
+
+    _trie: Optional[PrefixTrie] = None
+    _loaded_at: float = 0.0
+    _refreshing: bool = False
+    _lock = threading.Lock()
+
+    @classmethod
+    def refresh(cls, db: Session) -> int:
+        """从数据库加载热门书名重建前缀树"""
+        rows = db.query(Book.title, Book.author, Book.borrow_count).filter(
+            Book.is_active == True
+        ).order_by(Book.borrow_count.desc()).limit(settings.SUGGEST_TRIE_SIZE).all()
+
+        trie = PrefixTrie(top_k=settings.SUGGEST_MAX_LIMIT)
+        for title, author, borrow_count in rows:
+            score = borrow_count or 0
+            trie.insert(title, title, score)
+            if author:
+                trie.insert(author, title, score)
+
+        with cls._lock:
+            cls._trie = trie
+            cls._loaded_at = time.monotonic()
+        return len(rows)
+
+    @classmethod
+    def schedule_refresh(cls) -> bool:
+        """在线程池中后台刷新前缀树，请求不等待
+
+        同一时刻只允许一个刷新在进行，刷新期间继续使用旧前缀树。
+        返回是否发起了新的刷新。
+        """
+        with cls._lock:
+            if cls._refreshing:
+                return False
+            cls._refreshing = True
+        asyncio.get_running_loop().run_in_executor(None, cls._refresh_in_background)
+        return True
+
+    @classmethod
+    def _refresh_in_background(cls) -> None:
+        """后台刷新（使用独立Session）"""
+        try:
+            with get_db_context() as db:
+                cls.refresh(db)
+        except Exception as e:
+            print(f"Suggest trie refresh warning: {e}")
+        finally:
+            with cls._lock:
+                cls._refreshing = False
+
+    @classmethod
+    def is_stale(cls) -> bool:
+        """前缀树是否需要刷新"""
+        if cls._trie is None:
+            return True
+        return time.monotonic() - cls._loaded_at > settings.SUGGEST_REFRESH_SECONDS
+
+    @classmethod
+    def local_suggest(cls, prefix: str, limit: int = 10) -> Optional[List[str]]:
+        """仅查询本地前缀树"""
+        trie = cls._trie
+        if trie is None:
+            return None
+        return trie.search(prefix, limit)
+
+    @classmethod
+    def suggest(cls, prefix: str, limit: int = 10) -> Dict[str, object]:
+        """获取搜索建议"""
+        local = cls.local_suggest(prefix, limit)
+        if local is not None and len(local) >= limit:
+            return {"items": local, "source": "local"}
+
+        try:
+            remote = SearchService.suggest(prefix, limit)
+        except Exception:
+            return {"items": local or [], "source": "local"}
+
+        # 合并：本地热门结果在前，ES结果补足
+        items = list(local or [])
+        for title in remote:
+            if title not in items:
+                items.append(title)
+        return {"items": items[:limit], "source": "elasticsearch"}
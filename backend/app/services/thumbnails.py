@@ -0,0 +1,159 @@
+"""封面缩略图服务（CPU密集的缩放/编码放入进程池）"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, Callable, List, Set
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.book import Book
+from app.services.metrics import MetricsService
+from app.utils.images import render_thumbnails, variant_path
+
+UPLOAD_URL_PREFIX = "/uploads/"
+
+
+class ThumbnailService:
+    """封面缩略图服务
+
+    上传封面后将各尺寸（THUMBNAIL_SIZES，WebP）的生成提交到进程池，不等待结果；
+    缩略图与原图同目录存放，通过 /uploads/<原图路径>?size=<尺寸名> 访问，
+    尚未生成时回退到原图。子进程使用spawn方式启动，不继承主进程的线程与连接。
+    """
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _pending: Set[str] = set()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_executor(cls) -> ProcessPoolExecutor:
+        """获取进程池"""
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=settings.THUMBNAIL_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return cls._executor
+
+    @staticmethod
+    def source_path(relative_path: str) -> str:
+        """原图在磁盘上的路径"""
+        return os.path.join(settings.UPLOAD_DIR, relative_path)
+
+    @classmethod
+    def has_variants(cls, relative_path: str) -> bool:
+        """是否已生成全部尺寸"""
+        source = cls.source_path(relative_path)
+        return all(os.path.exists(variant_path(source, size)) for size in settings.THUMBNAIL_SIZES)
+
+    @classmethod
+    def _submit(cls, relative_path: str) -> Future:
+        return cls.get_executor().submit(
+            render_thumbnails,
+            cls.source_path(relative_path),
+            dict(settings.THUMBNAIL_SIZES),
+            settings.THUMBNAIL_QUALITY
+        )
+
+    @classmethod
+    def _on_done(cls, relative_path: str, future: Future) -> None:
+        # 回调在进程池的管理线程中执行，与事件循环并发修改_pending
+        with cls._lock:
+            cls._pending.discard(relative_path)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            MetricsService.incr("thumbnail.failed")
+            print(f"Thumbnail warning ({relative_path}): {error}")
+        else:
+            MetricsService.incr("thumbnail.generated")
+
+    @classmethod
+    def enqueue(cls, relative_path: str) -> bool:
+        """提交缩略图生成（不等待），已生成或已在队列中时返回False"""
+        if cls.has_variants(relative_path):
+            return False
+        with cls._lock:
+            if relative_path in cls._pending:
+                return False
+            cls._pending.add(relative_path)
+        try:
+            future = cls._submit(relative_path)
+        except Exception as e:
+            with cls._lock:
+                cls._pending.discard(relative_path)
+            print(f"Thumbnail warning ({relative_path}): {e}")
+            return False
+        future.add_done_callback(lambda f: cls._on_done(relative_path, f))
+        return True
+
+    @classmethod
+    def backfill(
+        cls,
+        force: bool = False,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, int]:
+        """为已有封面补齐缩略图（阻塞执行，供后台任务/命令行调用）
+
+        同时在途的任务数限制为进程数的2倍，避免一次性提交全部封面。
+        """
+        with SessionLocal() as db:
+            urls = [
+                url for (url,) in db.query(Book.cover_url).filter(
+                    Book.cover_url.like(f"{UPLOAD_URL_PREFIX}%")
+                ).distinct()
+            ]
+
+        paths: List[str] = []
+        missing = 0
+        for url in urls:
+            relative_path = url[len(UPLOAD_URL_PREFIX):]
+            if not os.path.exists(cls.source_path(relative_path)):
+                missing += 1
+            elif force or not cls.has_variants(relative_path):
+                paths.append(relative_path)
+
+        stats = {"total": len(urls), "generated": 0, "failed": 0, "missing": missing,
+                 "skipped": len(urls) - missing - len(paths)}
+        in_flight: Dict[Future, str] = {}
+        window = settings.THUMBNAIL_WORKERS * 2
+        queue = iter(paths)
+        while True:
+            for relative_path in queue:
+                in_flight[cls._submit(relative_path)] = relative_path
+                if len(in_flight) >= window:
+                    break
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                relative_path = in_flight.pop(future)
+                if future.exception() is None:
+                    stats["generated"] += 1
+                else:
+                    stats["failed"] += 1
+                    print(f"Thumbnail warning ({relative_path}): {future.exception()}")
+            if progress is not None:
+                progress({"rows": stats["generated"] + stats["failed"], "total": len(paths)})
+        return stats
+
+    @classmethod
+    def stop(cls) -> None:
+        """关闭进程池（未开始的任务取消，下次可通过回填补齐）"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+        with cls._lock:
+            cls._pending.clear()
+
+
+if __name__ == "__main__":
+    # 回填命令：python -m app.services.thumbnails [--force]
+    import sys
+    import app.models  # noqa: F401
+
+    print(ThumbnailService.backfill(force="--force" in sys.argv))
+    ThumbnailService.stop()
@@ -11,6 +11,7 @@ from app.utils.constants import (
     USER_ROLE_LIBRARIAN,
     USER_ROLE_USER,
 )
+from app.utils.isbn import normalize_isbn, isbn10_to_13, isbn13_to_10
 
 __all__ = [
     "BOOK_STATUS_AVAILABLE",
@@ -23,4 +24,7 @@ __all__ = [
     "USER_ROLE_ADMIN",
     "USER_ROLE_LIBRARIAN",
     "USER_ROLE_USER",
+    "normalize_isbn",
+    "isbn10_to_13",
+    "isbn13_to_10",
 ]
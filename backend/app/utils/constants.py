@@ -34,6 +34,18 @@ CACHE_EXPIRE_LONG = 3600  # 1小时
 
 # 缓存Key前缀
 CACHE_KEY_BOOK = "book:"
+CACHE_KEY_BOOK_ISBN = "book:isbn:"
 CACHE_KEY_USER = "user:"
 CACHE_KEY_CATEGORY = "category:"
 CACHE_KEY_STATS = "stats:"
+CACHE_KEY_SEARCH = "search:"
+CACHE_KEY_SEARCH_VERSION = "search:version"
+CACHE_KEY_ETAG = "etag:"
+CACHE_KEY_RESPONSE = "resp:"
+CACHE_KEY_RESPONSE_TAG = "resp:tag:"
+CACHE_KEY_RATE_LIMIT = "ratelimit:"
+CACHE_KEY_REVOKED_JTIS = "revoked:jtis"
+CACHE_KEY_REVOKED_USERS = "revoked:users"
+
+# Pub/Sub频道
+REVOCATION_CHANNEL = "revocation"
@@ -0,0 +1,44 @@
+"""图片处理工具（缩略图生成在进程池子进程中执行，本模块不依赖应用配置）"""
+import os
+from typing import Dict, List
+
+from PIL import Image, ImageOps
+
+THUMBNAIL_EXTENSION = ".webp"
+
+
+def variant_path(path: str, size: str) -> str:
+    """缩略图路径：与原图同目录，<原文件名>_<尺寸名>.webp"""
+    root, _ = os.path.splitext(path)
+    return f"{root}_{size}{THUMBNAIL_EXTENSION}"
+
+
+def render_thumbnails(source: str, sizes: Dict[str, int], quality: int = 80) -> List[str]:
+    """按宽度生成各尺寸缩略图（不放大），返回写入的文件路径
+
+    JPEG先按最大尺寸缩放解码（draft），大图解码时间和内存都成倍减少；
+    从大到小依次缩放，写临时文件后原子替换（临时文件名带进程号，
+    上传触发的生成与回填任务同时处理同一封面时互不覆盖）。
+    """
+    written = []
+    largest = max(sizes.values())
+    with Image.open(source) as original:
+        original.draft("RGB", (largest, largest))
+        img = ImageOps.exif_transpose(original)
+        if img.mode not in ("RGB", "RGBA"):
+            has_alpha = img.mode in ("LA", "PA") or "transparency" in img.info
+            img = img.convert("RGBA" if has_alpha else "RGB")
+
+        for name, width in sorted(sizes.items(), key=lambda item: -item[1]):
+            img.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+            target = variant_path(source, name)
+            temp = f"{target}.{os.getpid()}.tmp"
+            try:
+                img.save(temp, "WEBP", quality=quality, method=4)
+                os.replace(temp, target)
+            except BaseException:
+                if os.path.exists(temp):
+                    os.remove(temp)
+                raise
+            written.append(target)
+    return written
@@ -0,0 +1,69 @@
+"""ISBN工具：标准化、校验与ISBN-10/13互转"""
+import re
+from typing import Optional
+
+SEPARATOR_RE = re.compile(r"[\s\-\u2010-\u2015_.]")
+
+
+def clean_isbn(raw: str) -> str:
+    """去除分隔符并转大写（978-7-111-12345-6 -> 9787111123456）"""
+    return SEPARATOR_RE.sub("", str(raw)).upper()
+
+
+def isbn10_check_digit(first9: str) -> str:
+    """计算ISBN-10校验位"""
+    total = sum((10 - i) * int(d) for i, d in enumerate(first9))
+    check = (11 - total % 11) % 11
+    return "X" if check == 10 else str(check)
+
+
+def isbn13_check_digit(first12: str) -> str:
+    """计算ISBN-13校验位"""
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def is_valid_isbn10(isbn: str) -> bool:
+    """校验ISBN-10"""
+    return (
+        len(isbn) == 10
+        and isbn[:9].isdigit()
+        and (isbn[9].isdigit() or isbn[9] == "X")
+        and isbn10_check_digit(isbn[:9]) == isbn[9]
+    )
+
+
+def is_valid_isbn13(isbn: str) -> bool:
+    """校验ISBN-13"""
+    return (
+        len(isbn) == 13
+        and isbn.isdigit()
+        and isbn[:3] in ("978", "979")
+        and isbn13_check_digit(isbn[:12]) == isbn[12]
+    )
+
+
+def isbn10_to_13(isbn10: str) -> str:
+    """ISBN-10转ISBN-13"""
+    first12 = "978" + isbn10[:9]
+    return first12 + isbn13_check_digit(first12)
+
+
+def isbn13_to_10(isbn13: str) -> Optional[str]:
+    """ISBN-13转ISBN-10（仅978前缀可转换）"""
+    if not isbn13.startswith("978"):
+        return None
+    first9 = isbn13[3:12]
+    return first9 + isbn10_check_digit(first9)
+
+
+def normalize_isbn(raw: Optional[str]) -> Optional[str]:
+    """标准化为ISBN-13，格式或校验位错误时返回None"""
+    if not raw:
+        return None
+    isbn = clean_isbn(raw)
+    if is_valid_isbn13(isbn):
+        return isbn
+    if is_valid_isbn10(isbn):
+        return isbn10_to_13(isbn)
+    return None
@@ -0,0 +1,71 @@
+"""上传文件静态服务"""
+import os
+import re
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Scope
+
+from app.config import settings
+from app.utils.images import variant_path, THUMBNAIL_EXTENSION
+
+# 按内容哈希命名的文件：<sha256>[_<尺寸名>].<ext>
+CONTENT_ADDRESSED_RE = re.compile(r"^(?P<digest>[0-9a-f]{64})(?:_(?P<size>[a-z]+))?\.[a-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class UploadStaticFiles(StaticFiles):
+    """上传文件静态服务
+
+    - 支持 ?size=<尺寸名> 返回封面缩略图，缩略图尚未生成时回退到原图
+    - 按内容哈希命名的文件（及其缩略图）内容永不变化：强ETag取自哈希，
+      Cache-Control为一年且immutable，浏览器和代理重复访问无需回源
+    - 其他文件（旧版按时间戳命名的上传）缓存UPLOAD_CACHE_MAX_AGE秒，过期后按ETag协商
+    - 回退到原图的缩略图请求不缓存，缩略图生成后即可拿到
+    Range/If-Range与If-None-Match/If-Modified-Since由Starlette处理。
+    """
+
+    @staticmethod
+    def _requested_size(scope: Scope) -> Optional[str]:
+        size = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("size", [None])[0]
+        return None if size == "original" else size
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        size = self._requested_size(scope)
+        if size:
+            if size not in settings.THUMBNAIL_SIZES:
+                raise HTTPException(status_code=400, detail=f"未知尺寸: {size}")
+            try:
+                return await super().get_response(variant_path(path, size), scope)
+            except HTTPException as exc:
+                if exc.status_code != 404:
+                    raise
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        filename = os.path.basename(full_path)
+        headers = {"cache-control": f"public, max-age={settings.UPLOAD_CACHE_MAX_AGE}"}
+        match = CONTENT_ADDRESSED_RE.match(filename)
+        if match is not None:
+            size = match.group("size")
+            headers["etag"] = f'"{match.group("digest")}-{size}"' if size else f'"{match.group("digest")}"'
+            headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        size = self._requested_size(scope)
+        if size and not filename.endswith(f"_{size}{THUMBNAIL_EXTENSION}"):
+            # 请求缩略图但回退到了原图
+            headers["cache-control"] = "no-cache"
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response